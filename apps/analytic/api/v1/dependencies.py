@@ -1,8 +1,12 @@
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 
+from apps.analytic.cache import claim_flow_cache
+from apps.analytic.flow_index import claim_flow_index
+from apps.analytic.junctions import junction_index
 from apps.analytic.query import AnalyticElkQry
 from apps.analytic.repository import AnalyticRepo
+from apps.analytic.stats import ClaimStatsQry, claim_stats_rollups
 from config.settings.services.elk import get_read_es_client
 
 
@@ -10,13 +14,20 @@ async def get_analytic_log_elk_query(db: AsyncElasticsearch = Depends(get_read_e
     """
     Database coupling is isolated to the query layer.
     """
-    return AnalyticElkQry(db)
+    return AnalyticElkQry(
+        db, cache=claim_flow_cache, flow_index=claim_flow_index, junctions=junction_index
+    )
+
+
+async def get_claim_stats_query(db: AsyncElasticsearch = Depends(get_read_es_client)):
+    return ClaimStatsQry(db, rollups=claim_stats_rollups)
 
 
 async def get_analytic_log_repo(
     elk_qry: AnalyticElkQry = Depends(get_analytic_log_elk_query),
+    stats_qry: ClaimStatsQry = Depends(get_claim_stats_query),
 ) -> AnalyticRepo:
     """
     Dependency function to get the repository with query layer injection.
     """
-    return AnalyticRepo(elk_qry)
+    return AnalyticRepo(elk_qry, stats_qry)
@@ -1,8 +1,17 @@
+from datetime import date, datetime, timezone
+from typing import AsyncIterator
+
+import orjson
 from fastapi import Depends, APIRouter, HTTPException, status, Query
-from starlette.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from starlette.responses import StreamingResponse
 
+from config.settings.integrations_config import AnalyticConfig
 from config.settings.services.log import setup_logging
+from shared.enums import ModelTagChoices, StreamFormatChoices
 from .dependencies import get_analytic_log_repo
+from .schemas import ClaimFlowBatchRequestSchema, ClaimFlowBatchResponseSchema
+from ...query import FLOW_FIELD_BY_PARAM
 from ...repository import AnalyticRepo
 
 logger = setup_logging()
@@ -46,11 +55,251 @@ async def get_claim_flow(
         else:
             result = await repo.get_claim_flow_by_claim_id(claim_id)
 
-        return JSONResponse(status_code=status.HTTP_200_OK, content=result)
+        return ORJSONResponse(status_code=status.HTTP_200_OK, content=result)
+
+    except Exception as e:
+        logger.exception("Error retrieving claim flow", extra={"data": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
+
+
+@v1_router.post(
+    "/claims/flow/batch",
+    response_model=ClaimFlowBatchResponseSchema,
+    summary="Claim flows for many claims",
+    description=(
+        "Retrieve the flows of many claims in two Elasticsearch round trips. "
+        'Results and per-claim errors are keyed by input id, e.g. "eclaim_id:123".'
+    ),
+)
+async def get_claim_flows(
+    body: ClaimFlowBatchRequestSchema,
+    repo: AnalyticRepo = Depends(get_analytic_log_repo),
+):
+    ids = [
+        *(("eclaim_id", eclaim_id) for eclaim_id in body.eclaim_ids),
+        *(("document_id", document_id) for document_id in body.document_ids),
+        *(("claim_id", claim_id) for claim_id in body.claim_ids),
+    ]
+    if not ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must provide at least one of eclaim_ids, document_ids or claim_ids",
+        )
+    if len(ids) > AnalyticConfig.ANALYTIC_FLOW_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {AnalyticConfig.ANALYTIC_FLOW_BATCH_MAX_SIZE} ids are allowed per batch",
+        )
+
+    try:
+        results, errors = await repo.get_claim_flows(ids)
+        return ORJSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"results": results, "errors": errors},
+        )
+
+    except Exception as e:
+        logger.exception("Error retrieving claim flows", extra={"data": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
+
+
+STREAM_FLUSH_BYTES = 64 * 1024
+
+
+async def _encode_flow_stream(
+    first_entry: dict | None, entries: AsyncIterator[dict], stream_format: StreamFormatChoices
+) -> AsyncIterator[bytes]:
+    """Serialize entries as NDJSON or one JSON array, flushing every ~64 KiB."""
+    ndjson = stream_format == StreamFormatChoices.NDJSON
+    buffer = bytearray() if ndjson else bytearray(b"[")
+    entry = first_entry
+    first = True
+    try:
+        while entry is not None:
+            if ndjson:
+                buffer += orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+            else:
+                if not first:
+                    buffer += b","
+                buffer += orjson.dumps(entry)
+            first = False
+            if len(buffer) >= STREAM_FLUSH_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+            entry = await anext(entries, None)
+    except Exception as e:
+        # Headers are already sent: all we can do is cut the body short,
+        # which leaves a JSON array unterminated.
+        logger.exception("Error streaming claim flow", extra={"data": str(e)})
+        raise
+    finally:
+        await entries.aclose()
+    if not ndjson:
+        buffer += b"]"
+    if buffer:
+        yield bytes(buffer)
+
+
+@v1_router.get(
+    "/claims/flow/stream",
+    summary="Stream a claim flow",
+    description=(
+        "Stream the whole claim flow, however long, as NDJSON or as a chunked "
+        "JSON array. Pages are read through a point in time, so memory stays "
+        "bounded and results are not truncated. Not cached."
+    ),
+    responses={
+        status.HTTP_200_OK: {
+            "content": {"application/x-ndjson": {}, "application/json": {}},
+        },
+    },
+)
+async def stream_claim_flow(
+    eclaim_id: int | None = Query(None, description="Electronic claim ID"),
+    document_id: int | None = Query(None, description="Document ID"),
+    claim_id: int | None = Query(None, description="Calim ID"),
+    stream_format: StreamFormatChoices = Query(
+        StreamFormatChoices.NDJSON, alias="format", description="Response body format"
+    ),
+    repo: AnalyticRepo = Depends(get_analytic_log_repo),
+):
+    if eclaim_id:
+        param, value = "eclaim_id", eclaim_id
+    elif document_id:
+        param, value = "document_id", document_id
+    elif claim_id:
+        param, value = "claim_id", claim_id
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must provide either eclaim_id or document_id or claim_id in query params",
+        )
 
+    entries = repo.iter_claim_flow(value, FLOW_FIELD_BY_PARAM[param])
+    try:
+        # Resolve the junction and read the first page before answering, so
+        # a failure still gets a 500 instead of a truncated 200.
+        first_entry = await anext(entries, None)
     except Exception as e:
+        await entries.aclose()
         logger.exception("Error retrieving claim flow", extra={"data": str(e)})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e),
         )
+    return StreamingResponse(
+        _encode_flow_stream(first_entry, entries, stream_format),
+        media_type=(
+            "application/x-ndjson"
+            if stream_format == StreamFormatChoices.NDJSON
+            else "application/json"
+        ),
+    )
+
+
+def _validate_window(start: date, end: date | None) -> date:
+    end = end or datetime.now(timezone.utc).date()
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end",
+        )
+    if (end - start).days + 1 > AnalyticConfig.ANALYTIC_STATS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {AnalyticConfig.ANALYTIC_STATS_MAX_DAYS} days are allowed per request",
+        )
+    return end
+
+
+STATS_WINDOW_DESCRIPTION = (
+    "Days are UTC and both bounds are inclusive; end defaults to today. "
+    "Closed days are served from cached rollups, only open days are recomputed."
+)
+
+
+@v1_router.get(
+    "/claims/stats/daily-volume",
+    summary="Daily document volume per model_tag and state",
+    description=STATS_WINDOW_DESCRIPTION,
+)
+async def get_daily_volume(
+    start: date = Query(..., description="First day, YYYY-MM-DD"),
+    end: date | None = Query(None, description="Last day, YYYY-MM-DD"),
+    model_tag: ModelTagChoices | None = Query(None, description="Only this model_tag"),
+    repo: AnalyticRepo = Depends(get_analytic_log_repo),
+):
+    end = _validate_window(start, end)
+    try:
+        result = await repo.get_daily_volume(start, end, model_tag)
+        return ORJSONResponse(status_code=status.HTTP_200_OK, content=result)
+    except Exception as e:
+        logger.exception("Error retrieving daily volume", extra={"data": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
+
+
+@v1_router.get(
+    "/claims/stats/transitions",
+    summary="State transition counts per model_tag",
+    description=(
+        "Changes of state of each claim, document or eclaim, counted on the day "
+        "of the change. " + STATS_WINDOW_DESCRIPTION
+    ),
+)
+async def get_transition_counts(
+    start: date = Query(..., description="First day, YYYY-MM-DD"),
+    end: date | None = Query(None, description="Last day, YYYY-MM-DD"),
+    model_tag: ModelTagChoices | None = Query(None, description="Only this model_tag"),
+    repo: AnalyticRepo = Depends(get_analytic_log_repo),
+):
+    end = _validate_window(start, end)
+    try:
+        result = await repo.get_transition_counts(start, end, model_tag)
+        return ORJSONResponse(status_code=status.HTTP_200_OK, content=result)
+    except Exception as e:
+        logger.exception("Error retrieving transition counts", extra={"data": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
+
+
+@v1_router.get(
+    "/claims/stats/dwell-times",
+    summary="Time spent in each state per model_tag",
+    description=(
+        "Percentiles, in seconds, of the time spent in a state before leaving it, "
+        "within ~10% of the exact value. " + STATS_WINDOW_DESCRIPTION
+    ),
+)
+async def get_dwell_times(
+    start: date = Query(..., description="First day, YYYY-MM-DD"),
+    end: date | None = Query(None, description="Last day, YYYY-MM-DD"),
+    model_tag: ModelTagChoices | None = Query(None, description="Only this model_tag"),
+    percentiles: list[float] = Query([50, 90, 99], description="Percentiles to report"),
+    repo: AnalyticRepo = Depends(get_analytic_log_repo),
+):
+    end = _validate_window(start, end)
+    if any(not 0 < percent <= 100 for percent in percentiles):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="percentiles must be in (0, 100]",
+        )
+    try:
+        result = await repo.get_dwell_times(start, end, percentiles, model_tag)
+        return ORJSONResponse(status_code=status.HTTP_200_OK, content=result)
+    except Exception as e:
+        logger.exception("Error retrieving dwell times", extra={"data": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e),
+        )
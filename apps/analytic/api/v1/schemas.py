@@ -16,3 +16,27 @@ class ClaimFlowSchema(BaseModel):
         alias="_source",
         description="Document source",
     )
+
+
+class ClaimFlowEntrySchema(BaseModel):
+    """A claim flow entry as returned: ``ClaimFlowSchema`` dumped by field name."""
+    id: str = Field(..., description="Document ID")
+    index: str = Field(..., description="Index name")
+    source: dict = Field(..., description="Document source")
+
+
+class ClaimFlowBatchRequestSchema(BaseModel):
+    eclaim_ids: list[int] = Field(default_factory=list, description="Electronic claim IDs")
+    document_ids: list[int] = Field(default_factory=list, description="Document IDs")
+    claim_ids: list[int] = Field(default_factory=list, description="Claim IDs")
+
+
+class ClaimFlowBatchResponseSchema(BaseModel):
+    results: dict[str, list[ClaimFlowEntrySchema]] = Field(
+        ...,
+        description='Claim flows keyed by input id, e.g. "eclaim_id:123"',
+    )
+    errors: dict[str, str] = Field(
+        default_factory=dict,
+        description="Per-claim failures keyed by input id",
+    )
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable
+
+import orjson
+from redis.asyncio import Redis
+
+from config.settings.integrations_config import AnalyticConfig
+from config.settings.services.metrics import counter
+from config.settings.services.redis import redis_manager
+from shared.bulk import BulkEntry
+from shared.cache import LocalTTLCache, SingleFlight
+from shared.enums import ModelTagChoices
+
+logger = logging.getLogger(__name__)
+
+
+HISTORICAL_CLAIM_INDEX = "historical_claim"
+
+# The claim flow field each model tag's ``id`` is looked up by. Junction
+# documents carry all three ids under these same field names.
+FLOW_FIELD_BY_MODEL_TAG = {
+    ModelTagChoices.CLAIM: "health_insured_claim",
+    ModelTagChoices.DOCUMENT: "health_document",
+    ModelTagChoices.E_DAMAGE_REQUEST: "eclaim",
+}
+
+CLAIM_FLOW_MODEL_TAGS = frozenset({*FLOW_FIELD_BY_MODEL_TAG, ModelTagChoices.CLAIM_JUNCTION})
+
+FLOW_CACHE_REQUESTS = counter(
+    "analytic_flow_cache_requests_total",
+    "Claim flow cache lookups by outcome",
+    labelnames=("result",),
+)
+FLOW_CACHE_INVALIDATIONS = counter(
+    "analytic_flow_cache_invalidated_tags_total",
+    "Claim flow cache tags invalidated after ingest",
+)
+
+
+def claim_flow_tag(field_name: str, value) -> str:
+    return f"{field_name}:{value}"
+
+
+def claim_flow_tags(source: dict) -> set[str]:
+    """Tags of every cached claim flow a ``historical_claim`` document can change."""
+    model_tag = source.get("model_tag")
+    if model_tag == ModelTagChoices.CLAIM_JUNCTION:
+        return {
+            claim_flow_tag(field_name, source[field_name])
+            for field_name in FLOW_FIELD_BY_MODEL_TAG.values()
+            if source.get(field_name)
+        }
+
+    field_name = FLOW_FIELD_BY_MODEL_TAG.get(model_tag)
+    if field_name is None or source.get("id") is None:
+        return set()
+    return {claim_flow_tag(field_name, source["id"])}
+
+
+def claim_flow_source(action: dict | BulkEntry, index_name: str = HISTORICAL_CLAIM_INDEX) -> dict | None:
+    """
+    Source of a bulk action that writes a claim flow document into
+    ``index_name``. Serialized bodies are only decoded when they mention a
+    ``model_tag``.
+    """
+    if isinstance(action, BulkEntry):
+        if (
+            action.op_type != "index"
+            or action.meta.get("_index") != index_name
+            or action.body is None
+            or b'"model_tag"' not in action.body
+        ):
+            return None
+        try:
+            source = orjson.loads(action.body)
+        except orjson.JSONDecodeError:
+            return None
+    else:
+        if action.get("_op_type", "index") != "index" or action.get("_index") != index_name:
+            return None
+        source = action.get("_source")
+
+    if not isinstance(source, dict) or source.get("model_tag") not in CLAIM_FLOW_MODEL_TAGS:
+        return None
+    return source
+
+
+class ClaimFlowCache:
+    """
+    Two-level cache for claim flows: a short-lived in-process L1 in front of
+    Redis, keyed by ``field:id``.
+
+    Every entry is tagged with the ids of the claim, document and eclaim of
+    its junction, so a write touching any of them invalidates all the flows
+    it appears in. Invalidation is repeated after ``invalidation_delay_ms``
+    because a read racing the write can still see the pre-refresh index and
+    cache it again. Other workers drop their L1 entries through Redis
+    pub/sub; without Redis, L1 entries simply expire.
+    """
+
+    KEY_PREFIX = "claim_flow:v1:"
+    TAG_PREFIX = "claim_flow:v1:tag:"
+    CHANNEL = "claim_flow:v1:invalidate"
+
+    def __init__(
+        self,
+        enabled: bool,
+        ttl: int,
+        local_ttl: float,
+        local_max_entries: int,
+        invalidation_delay_ms: int,
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.invalidation_delay = invalidation_delay_ms / 1000
+        self.local = LocalTTLCache(max_entries=local_max_entries, ttl=local_ttl)
+        self.single_flight = SingleFlight()
+        self._listener: asyncio.Task | None = None
+        self._delayed: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _redis() -> Redis | None:
+        return redis_manager.get_client() if redis_manager.is_initialized else None
+
+    async def get_or_load(
+        self,
+        field_name: str,
+        value,
+        loader: Callable[[], Awaitable[tuple[list, set[str]]]],
+    ) -> list:
+        """
+        Return the cached flow, or run ``loader`` once for all concurrent
+        callers. ``loader`` returns the flow and the tags to store it under.
+        """
+        if not self.enabled:
+            result, _ = await loader()
+            return result
+
+        key = claim_flow_tag(field_name, value)
+        result = self.local.get(key)
+        if result is not None:
+            FLOW_CACHE_REQUESTS.labels("local_hit").inc()
+            return result
+
+        return await self.single_flight.do(key, lambda: self._fill(key, loader))
+
+    async def _fill(self, key: str, loader) -> list:
+        cached = await self._redis_get(key)
+        if cached is not None:
+            FLOW_CACHE_REQUESTS.labels("redis_hit").inc()
+            result, tags = cached
+            self.local.set(key, result, tags)
+            return result
+
+        FLOW_CACHE_REQUESTS.labels("miss").inc()
+        result, tags = await loader()
+        tags = {key, *tags}
+        self.local.set(key, result, tags)
+        await self._redis_set(key, result, tags)
+        return result
+
+    async def _redis_get(self, key: str) -> tuple[list, list[str]] | None:
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(self.KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning(f"Claim flow cache read failed: {e}")
+            return None
+        if raw is None:
+            return None
+        payload = orjson.loads(raw)
+        return payload["result"], payload["tags"]
+
+    async def _redis_set(self, key: str, result: list, tags: set[str]) -> None:
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.set(
+                    self.KEY_PREFIX + key,
+                    orjson.dumps({"result": result, "tags": sorted(tags)}),
+                    ex=self.ttl,
+                )
+                for tag in tags:
+                    # Tag sets outlive every key they list.
+                    pipe.sadd(self.TAG_PREFIX + tag, key)
+                    pipe.expire(self.TAG_PREFIX + tag, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Claim flow cache write failed: {e}")
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        tags = set(tags)
+        if not self.enabled or not tags:
+            return
+
+        FLOW_CACHE_INVALIDATIONS.inc(len(tags))
+        await self._invalidate(tags)
+        if self.invalidation_delay > 0:
+            task = asyncio.create_task(self._invalidate_later(tags))
+            self._delayed.add(task)
+            task.add_done_callback(self._delayed.discard)
+
+    async def _invalidate_later(self, tags: set[str]) -> None:
+        await asyncio.sleep(self.invalidation_delay)
+        await self._invalidate(tags)
+
+    async def _invalidate(self, tags: set[str]) -> None:
+        self.local.invalidate_tags(tags)
+
+        client = self._redis()
+        if client is None:
+            return
+        tag_keys = [self.TAG_PREFIX + tag for tag in tags]
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for tag_key in tag_keys:
+                    pipe.smembers(tag_key)
+                members = await pipe.execute()
+
+            keys = {self.KEY_PREFIX + member.decode() for found in members for member in found}
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.delete(*keys, *tag_keys)
+                pipe.publish(self.CHANNEL, orjson.dumps(sorted(tags)))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Claim flow cache invalidation failed: {e}")
+
+    def start(self) -> None:
+        if self.enabled and self._listener is None and redis_manager.is_initialized:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis().pubsub() as pubsub:
+                    await pubsub.subscribe(self.CHANNEL)
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            self.local.invalidate_tags(orjson.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Messages may have been missed while disconnected.
+                logger.warning(f"Claim flow cache invalidation listener failed: {e}")
+                self.local.clear()
+                await asyncio.sleep(1)
+
+    async def stop(self) -> None:
+        tasks = [*self._delayed]
+        if self._listener is not None:
+            tasks.append(self._listener)
+            self._listener = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+claim_flow_cache = ClaimFlowCache(
+    enabled=AnalyticConfig.ANALYTIC_FLOW_CACHE_ENABLED,
+    ttl=AnalyticConfig.ANALYTIC_FLOW_CACHE_TTL,
+    local_ttl=AnalyticConfig.ANALYTIC_FLOW_CACHE_LOCAL_TTL,
+    local_max_entries=AnalyticConfig.ANALYTIC_FLOW_CACHE_LOCAL_MAX_ENTRIES,
+    invalidation_delay_ms=AnalyticConfig.ANALYTIC_FLOW_CACHE_INVALIDATION_DELAY_MS,
+)
@@ -0,0 +1,176 @@
+"""
+Maintenance commands for the analytic read models.
+
+    python -m apps.analytic.commands backfill-flow-index [--batch-size 1000]
+    python -m apps.analytic.commands reindex-routed --dest historical_claim_v2
+        [--key-field claim_key] [--routing-field health_insured_claim] [--batch-size 1000]
+"""
+import argparse
+import asyncio
+
+from elasticsearch.helpers import async_scan
+
+from apps.analytic.cache import CLAIM_FLOW_MODEL_TAGS, FLOW_FIELD_BY_MODEL_TAG, HISTORICAL_CLAIM_INDEX
+from apps.analytic.flow_index import claim_flow_index
+from config.settings.services.elk import es_manager
+from config.settings.services.log import setup_logging
+from shared.bulk import BulkEngine
+from shared.enums import ModelTagChoices
+
+logger = setup_logging()
+
+
+async def backfill_flow_index(batch_size: int) -> None:
+    """
+    Build the claim_flow index from every claim flow document already in
+    historical_claim. Safe to re-run and to run while ingest is live: events
+    are deduplicated by ``_id`` when applied.
+    """
+    await es_manager.initialize()
+    try:
+        client = await es_manager.get_write_client()
+        await claim_flow_index.ensure_index(client)
+
+        scanned = failed = 0
+        batch = []
+        async for hit in async_scan(
+            client,
+            index=HISTORICAL_CLAIM_INDEX,
+            query={"query": {"terms": {"model_tag.keyword": sorted(CLAIM_FLOW_MODEL_TAGS)}}},
+            size=batch_size,
+        ):
+            batch.append((hit["_id"], hit["_index"], hit["_source"]))
+            if len(batch) >= batch_size:
+                failed += await claim_flow_index.apply(client, batch)
+                scanned += len(batch)
+                batch = []
+                logger.info(f"Backfilled {scanned} documents into {claim_flow_index.index_name}")
+
+        if batch:
+            failed += await claim_flow_index.apply(client, batch)
+            scanned += len(batch)
+
+        logger.info(
+            f"Backfill of {claim_flow_index.index_name} finished: "
+            f"{scanned} documents scanned, {failed} updates failed"
+        )
+    finally:
+        await es_manager.close()
+
+
+async def _family_keys(client, routing_field: str) -> dict[str, dict]:
+    """``{field: {id: family key}}`` for every id linked by a junction."""
+    family_keys = {field_name: {} for field_name in FLOW_FIELD_BY_MODEL_TAG.values()}
+    async for hit in async_scan(
+        client,
+        index=HISTORICAL_CLAIM_INDEX,
+        query={
+            "query": {"term": {"model_tag.keyword": ModelTagChoices.CLAIM_JUNCTION}},
+            "_source": list(family_keys),
+        },
+    ):
+        source = hit["_source"]
+        key = source.get(routing_field)
+        if not key:
+            continue
+        for field_name, ids in family_keys.items():
+            if source.get(field_name):
+                ids[source[field_name]] = key
+    return family_keys
+
+
+def _family_key(source: dict, routing_field: str, family_keys: dict[str, dict]):
+    model_tag = source.get("model_tag")
+    if model_tag == ModelTagChoices.CLAIM_JUNCTION:
+        return source.get(routing_field)
+    field_name = FLOW_FIELD_BY_MODEL_TAG.get(model_tag)
+    if field_name is None or source.get("id") is None:
+        return None
+    if field_name == routing_field:
+        return source["id"]
+    return family_keys[field_name].get(source["id"])
+
+
+async def reindex_routed(dest: str, key_field: str, routing_field: str, batch_size: int) -> None:
+    """
+    Copy historical_claim into ``dest`` with every claim flow document
+    routed by its claim family key: the ``routing_field`` id of its
+    junction. The key is also written to ``key_field`` so the documents
+    match what the ingest routing rule expects. Documents outside any
+    family keep the default routing, as ingest does for documents without
+    the key.
+
+    Point INGESTOR_ROUTING_RULES and ANALYTIC_FLOW_ROUTING_FIELD at the new
+    index (e.g. by swapping an alias) once it has caught up.
+    """
+    await es_manager.initialize()
+    try:
+        client = await es_manager.get_write_client()
+        if not await client.indices.exists(index=dest):
+            mappings = await client.indices.get_mapping(index=HISTORICAL_CLAIM_INDEX)
+            await client.indices.create(
+                index=dest, mappings=next(iter(mappings.body.values()))["mappings"]
+            )
+            logger.info(f"✓ Created {dest} index")
+
+        family_keys = await _family_keys(client, routing_field)
+        logger.info(
+            f"Loaded family keys of {sum(len(ids) for ids in family_keys.values())} ids"
+        )
+        counts = {"routed": 0, "unrouted": 0}
+
+        async def actions():
+            async for hit in async_scan(client, index=HISTORICAL_CLAIM_INDEX, size=batch_size):
+                source = hit["_source"]
+                key = source.get(key_field) or _family_key(source, routing_field, family_keys)
+                if key:
+                    source[key_field] = key
+                    counts["routed"] += 1
+                else:
+                    counts["unrouted"] += 1
+                yield {
+                    "_op_type": "index",
+                    "_index": dest,
+                    "_id": hit["_id"],
+                    "_routing": str(key) if key else None,
+                    "_source": source,
+                }
+
+        failed = 0
+        async for ok, item in BulkEngine(client).stream(actions()):
+            if not ok:
+                failed += 1
+                logger.error(f"Failed to reindex into {dest}", extra={"data": item})
+
+        logger.info(
+            f"Reindex into {dest} finished: {counts['routed']} routed, "
+            f"{counts['unrouted']} with default routing, {failed} failed"
+        )
+    finally:
+        await es_manager.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m apps.analytic.commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser(
+        "backfill-flow-index", help="Build the claim_flow index from historical_claim"
+    )
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    reindex = commands.add_parser(
+        "reindex-routed", help="Copy historical_claim into an index routed by claim family"
+    )
+    reindex.add_argument("--dest", required=True)
+    reindex.add_argument("--key-field", default="claim_key")
+    reindex.add_argument("--routing-field", default=FLOW_FIELD_BY_MODEL_TAG[ModelTagChoices.CLAIM])
+    reindex.add_argument("--batch-size", type=int, default=1000)
+
+    args = parser.parse_args()
+    if args.command == "backfill-flow-index":
+        asyncio.run(backfill_flow_index(args.batch_size))
+    elif args.command == "reindex-routed":
+        asyncio.run(reindex_routed(args.dest, args.key_field, args.routing_field, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+
+from apps.analytic.cache import FLOW_FIELD_BY_MODEL_TAG, claim_flow_tag
+from config.settings.integrations_config import AnalyticConfig
+from config.settings.services.metrics import counter
+from shared.bulk import BulkEngine
+from shared.enums import ModelTagChoices
+
+logger = logging.getLogger(__name__)
+
+
+FLOW_INDEX_FAILED_UPDATES = counter(
+    "analytic_flow_index_failed_updates_total",
+    "claim_flow documents that could not be updated at ingest time",
+)
+
+# Merges links and inserts events in timestamp order, replacing any event
+# with the same _id so that replays and backfills are idempotent.
+_APPEND_SCRIPT = """
+if (ctx._source.links == null) { ctx._source.links = [:]; }
+if (ctx._source.events == null) { ctx._source.events = []; }
+ctx._source.links.putAll(params.links);
+def events = ctx._source.events;
+for (def event : params.events) {
+  String eventId = event._id;
+  events.removeIf(e -> e._id == eventId);
+  def timestamp = event._source.timestamp;
+  int i = events.size();
+  while (i > 0 && timestamp != null && events[i - 1]._source.timestamp != null
+         && ((Comparable) events[i - 1]._source.timestamp).compareTo(timestamp) > 0) {
+    i--;
+  }
+  events.add(i, event);
+}
+"""
+
+
+def _timestamp_order(event: dict) -> tuple:
+    # Same order as sorting by timestamp ascending: missing values last.
+    timestamp = event["_source"].get("timestamp")
+    return timestamp is None, timestamp or 0
+
+
+class ClaimFlowIndex:
+    """
+    Materialized claim flows, one document per claim, document or eclaim id
+    (``_id`` is ``field:id``, the same key the flow cache uses):
+
+    - ``links``: the ids of its junction, once the junction is ingested
+    - ``events``: its own ``historical_claim`` documents ordered by timestamp
+
+    A flow read is a ``get`` of the requested id plus an ``mget`` of its
+    linked ids, instead of two searches over ``historical_claim``.
+    """
+
+    UPDATE_RETRIES = 3
+
+    MAPPINGS = {
+        "dynamic": False,
+        "properties": {
+            "links": {
+                "properties": {
+                    field_name: {"type": "keyword"}
+                    for field_name in FLOW_FIELD_BY_MODEL_TAG.values()
+                },
+            },
+            "events": {"type": "object", "enabled": False},
+        },
+    }
+
+    def __init__(self, enabled: bool, index_name: str):
+        self.enabled = enabled
+        self.index_name = index_name
+
+    async def ensure_index(self, client: AsyncElasticsearch) -> None:
+        if await client.indices.exists(index=self.index_name):
+            return
+        try:
+            await client.indices.create(index=self.index_name, mappings=self.MAPPINGS)
+            logger.info(f"✓ Created {self.index_name} index")
+        except Exception as e:
+            # Another worker created it first.
+            if "resource_already_exists_exception" not in str(e):
+                raise
+
+    def update_actions(self, docs: Iterable[tuple[str, str, dict]]) -> List[Dict[str, Any]]:
+        """
+        Scripted upserts for ``(_id, _index, _source)`` documents written to
+        ``historical_claim``, one per claim flow document touched.
+        """
+        updates: Dict[str, Dict[str, Any]] = {}
+
+        def update_for(target: str) -> Dict[str, Any]:
+            return updates.setdefault(target, {"links": {}, "events": []})
+
+        for doc_id, index_name, source in docs:
+            model_tag = source.get("model_tag")
+            if model_tag == ModelTagChoices.CLAIM_JUNCTION:
+                links = {
+                    field_name: source[field_name]
+                    for field_name in FLOW_FIELD_BY_MODEL_TAG.values()
+                    if source.get(field_name)
+                }
+                for field_name, value in links.items():
+                    update_for(claim_flow_tag(field_name, value))["links"].update(links)
+                continue
+
+            field_name = FLOW_FIELD_BY_MODEL_TAG.get(model_tag)
+            if field_name is None or source.get("id") is None:
+                continue
+            update_for(claim_flow_tag(field_name, source["id"]))["events"].append(
+                {"_id": doc_id, "_index": index_name, "_source": source}
+            )
+
+        return [
+            {
+                "_op_type": "update",
+                "_index": self.index_name,
+                "_id": target,
+                "retry_on_conflict": self.UPDATE_RETRIES,
+                "scripted_upsert": True,
+                "upsert": {},
+                "script": {"source": _APPEND_SCRIPT, "lang": "painless", "params": params},
+            }
+            for target, params in updates.items()
+        ]
+
+    async def apply(self, client: AsyncElasticsearch, docs: Iterable[tuple[str, str, dict]]) -> int:
+        """
+        Best effort: failures are logged and counted, never raised, since the
+        ``historical_claim`` write already succeeded. Returns the failed count.
+        """
+        actions = self.update_actions(docs)
+        if not actions:
+            return 0
+
+        failed = 0
+        try:
+            async for ok, item in BulkEngine(client).stream(actions):
+                if not ok:
+                    failed += 1
+                    logger.error(
+                        f"Failed to update {self.index_name} document",
+                        extra={"data": item},
+                    )
+        except Exception as e:
+            failed = len(actions)
+            logger.exception(f"Failed to update {self.index_name}", extra={"data": str(e)})
+
+        if failed:
+            FLOW_INDEX_FAILED_UPDATES.inc(failed)
+        return failed
+
+    async def get_flow(
+        self,
+        client: AsyncElasticsearch,
+        field_name: str,
+        value: int,
+        source_includes: Optional[List[str]] = None,
+    ) -> Optional[tuple[List[Dict[str, Any]], set[str]]]:
+        """
+        The ordered flow documents and the ids they were built from, or None
+        when nothing was materialized for this id. ``source_includes``
+        filters the fields of each event's ``_source``.
+        """
+        own_id = claim_flow_tag(field_name, value)
+        if source_includes:
+            source_includes = [
+                "links", "events._id", "events._index",
+                *(f"events._source.{field}" for field in source_includes),
+            ]
+        try:
+            doc = await client.get(
+                index=self.index_name, id=own_id, source_includes=source_includes
+            )
+        except NotFoundError:
+            return None
+
+        links = doc["_source"].get("links") or {}
+        if not links:
+            # Same as the search path: no junction, no flow.
+            return [], {own_id}
+
+        linked_ids = {claim_flow_tag(linked_field, linked) for linked_field, linked in links.items()}
+        events = list(doc["_source"].get("events", [])) if own_id in linked_ids else []
+        other_ids = sorted(linked_ids - {own_id})
+        if other_ids:
+            resp = await client.mget(
+                index=self.index_name, ids=other_ids, source_includes=source_includes
+            )
+            for linked_doc in resp["docs"]:
+                if linked_doc.get("found"):
+                    events.extend(linked_doc["_source"].get("events", []))
+
+        events.sort(key=_timestamp_order)
+        return events, linked_ids | {own_id}
+
+
+claim_flow_index = ClaimFlowIndex(
+    enabled=AnalyticConfig.ANALYTIC_FLOW_INDEX_ENABLED,
+    index_name=AnalyticConfig.ANALYTIC_FLOW_INDEX_NAME,
+)
@@ -0,0 +1,443 @@
+import asyncio
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+from elasticsearch import AsyncElasticsearch
+
+from apps.analytic.cache import FLOW_FIELD_BY_MODEL_TAG, HISTORICAL_CLAIM_INDEX
+from config.settings.integrations_config import AnalyticConfig
+from config.settings.services.elk import es_manager
+from config.settings.services.metrics import counter, gauge
+from shared.enums import ModelTagChoices
+
+logger = logging.getLogger(__name__)
+
+
+JUNCTION_INDEX_LOOKUPS = counter(
+    "analytic_junction_index_lookups_total",
+    "Junction id lookups answered in process, by outcome",
+    labelnames=("result",),
+)
+JUNCTION_INDEX_ENTRIES = gauge(
+    "analytic_junction_index_entries",
+    "Junction ids held by this worker",
+    labelnames=("source",),
+)
+
+# Column order of a junction row; 0 stands for a missing id.
+JUNCTION_FIELDS = tuple(FLOW_FIELD_BY_MODEL_TAG.values())
+
+# Snapshot layout, all little-endian int64: the header, one column per
+# junction field holding the rows, then per field its sorted ids followed
+# by the row each id points to.
+_SNAPSHOT_MAGIC = b"JUNCIDX1"
+_SNAPSHOT_HEADER = struct.Struct(f"<8sqq{len(JUNCTION_FIELDS)}q")
+_SNAPSHOT_NAME = "junctions.idx"
+_NO_WATERMARK = -1
+
+
+def _as_id(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _junction_row(source: dict) -> tuple[int, ...]:
+    return tuple(_as_id(source.get(field_name)) for field_name in JUNCTION_FIELDS)
+
+
+def write_snapshot(path: Path, watermark: Optional[int], junctions: Dict[str, Dict[int, tuple]]) -> None:
+    """
+    Atomically write ``{field: {id: row}}`` as a snapshot. Rows shared by
+    several ids are stored once.
+    """
+    rows: Dict[tuple, int] = {}
+    keys = []
+    for field_name in JUNCTION_FIELDS:
+        ids = array("q")
+        row_numbers = array("q")
+        for value, row in sorted(junctions.get(field_name, {}).items()):
+            ids.append(value)
+            row_numbers.append(rows.setdefault(row, len(rows)))
+        keys.append((ids, row_numbers))
+
+    columns = [array("q", (row[i] for row in rows)) for i in range(len(JUNCTION_FIELDS))]
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_SNAPSHOT_HEADER.pack(
+            _SNAPSHOT_MAGIC,
+            _NO_WATERMARK if watermark is None else watermark,
+            len(rows),
+            *(len(ids) for ids, _ in keys),
+        ))
+        for column in columns:
+            column.tofile(f)
+        for ids, row_numbers in keys:
+            ids.tofile(f)
+            row_numbers.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JunctionSnapshot:
+    """Read-only view of a snapshot file, mapped so workers share its pages."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, watermark, row_count, *key_counts = _SNAPSHOT_HEADER.unpack_from(self._map, 0)
+        if magic != _SNAPSHOT_MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a junction index snapshot")
+
+        self.watermark = None if watermark == _NO_WATERMARK else watermark
+        self._values = memoryview(self._map)[_SNAPSHOT_HEADER.size:].cast("q")
+        self._columns = []
+        offset = 0
+        for _ in JUNCTION_FIELDS:
+            self._columns.append(self._values[offset:offset + row_count])
+            offset += row_count
+        self._keys = {}
+        for field_name, count in zip(JUNCTION_FIELDS, key_counts):
+            self._keys[field_name] = (
+                self._values[offset:offset + count],
+                self._values[offset + count:offset + 2 * count],
+            )
+            offset += 2 * count
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids, _ in self._keys.values())
+
+    def get(self, field_name: str, value: int) -> Optional[tuple[int, ...]]:
+        ids, row_numbers = self._keys[field_name]
+        i = bisect_left(ids, value)
+        if i == len(ids) or ids[i] != value:
+            return None
+        row = row_numbers[i]
+        return tuple(column[row] for column in self._columns)
+
+    def items(self, field_name: str):
+        ids, row_numbers = self._keys[field_name]
+        for value, row in zip(ids, row_numbers):
+            yield value, tuple(column[row] for column in self._columns)
+
+    def is_current(self, path: Path) -> bool:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) == (self.stat.st_ino, self.stat.st_mtime_ns)
+
+    def close(self) -> None:
+        for ids, row_numbers in self._keys.values():
+            ids.release()
+            row_numbers.release()
+        for column in self._columns:
+            column.release()
+        self._values.release()
+        self._map.close()
+
+
+class JunctionIndex:
+    """
+    In-process map between the claim, document and eclaim ids of claim
+    junctions, so a claim flow read can skip the junction search.
+
+    Each worker holds the junctions written since its snapshot in plain
+    dicts, refreshed every ``refresh_interval`` seconds by searching
+    ``timestamp`` from ``refresh_overlap`` seconds before the newest one
+    seen. The overlap picks up junctions that become searchable out of
+    timestamp order, such as spool replays or documents indexed before the
+    last refresh of their shard; later ones are only seen as misses. With
+    ``snapshot_dir`` set, older junctions come from a memory-mapped snapshot
+    file shared by all workers of the host: the worker holding its file lock
+    (re)writes it once the in-memory part reaches ``compact_entries``, and
+    the others remap it.
+
+    A miss is never authoritative, callers fall back to Elasticsearch. A
+    hit can lag a junction update in another worker by one refresh
+    interval. When the in-memory part outgrows ``max_entries`` the index
+    stops answering until the next snapshot, or for good without one.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        snapshot_dir: str,
+        refresh_interval: float,
+        refresh_overlap: float,
+        page_size: int,
+        max_entries: int,
+        compact_entries: int,
+        index_name: str = HISTORICAL_CLAIM_INDEX,
+    ):
+        self.enabled = enabled
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.refresh_interval = refresh_interval
+        self.refresh_overlap_ms = int(refresh_overlap * 1000)
+        self.page_size = page_size
+        self.max_entries = max_entries
+        self.compact_entries = compact_entries
+        self.index_name = index_name
+
+        self.snapshot: Optional[JunctionSnapshot] = None
+        self.recent: Dict[str, Dict[int, tuple]] = {field_name: {} for field_name in JUNCTION_FIELDS}
+        self.watermark: Optional[int] = None
+        self.ready = False
+        self._overflowed = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot_path(self) -> Optional[Path]:
+        return self.snapshot_dir / _SNAPSHOT_NAME if self.snapshot_dir else None
+
+    @property
+    def recent_entries(self) -> int:
+        return sum(len(ids) for ids in self.recent.values())
+
+    def lookup(self, field_name: str, value: int) -> Optional[dict]:
+        """The junction ``_source`` linking ``field_name`` = ``value``, if known."""
+        if not self.ready or self._overflowed or field_name not in self.recent:
+            return None
+
+        value = _as_id(value)
+        row = self.recent[field_name].get(value)
+        if row is None and self.snapshot is not None:
+            row = self.snapshot.get(field_name, value)
+        if row is None:
+            JUNCTION_INDEX_LOOKUPS.labels("miss").inc()
+            return None
+
+        JUNCTION_INDEX_LOOKUPS.labels("hit").inc()
+        source = {"model_tag": ModelTagChoices.CLAIM_JUNCTION}
+        source.update(
+            (linked_field, linked) for linked_field, linked in zip(JUNCTION_FIELDS, row) if linked
+        )
+        return source
+
+    def add(self, source: dict) -> None:
+        """Record a junction written by this worker without waiting for a refresh."""
+        if not self.enabled or source.get("model_tag") != ModelTagChoices.CLAIM_JUNCTION:
+            return
+        self._add_row(_junction_row(source))
+
+    def _add_row(self, row: tuple[int, ...]) -> None:
+        if self._overflowed and self.snapshot_dir is None:
+            return
+        for field_name, value in zip(JUNCTION_FIELDS, row):
+            if value:
+                self.recent[field_name][value] = row
+        if not self._overflowed and self.recent_entries > self.max_entries:
+            self._overflowed = True
+            logger.warning(
+                f"Junction index holds over {self.max_entries} recent ids; "
+                "serving from Elasticsearch until the next snapshot"
+            )
+            if self.snapshot_dir is None:
+                # Nothing will ever fold them away.
+                self.recent = {field_name: {} for field_name in JUNCTION_FIELDS}
+
+    async def _iter_junctions(
+        self, client: AsyncElasticsearch, since: Optional[int]
+    ) -> AsyncIterator[tuple[int, tuple[int, ...]]]:
+        """``(timestamp, row)`` of every junction from ``since`` on, oldest first."""
+        query = {"bool": {"filter": [{"term": {"model_tag.keyword": ModelTagChoices.CLAIM_JUNCTION}}]}}
+        if since is not None:
+            query["bool"]["filter"].append({"range": {"timestamp": {"gte": since}}})
+
+        pit = await client.open_point_in_time(index=self.index_name, keep_alive="1m")
+        pit_id = pit["id"]
+        search_after = None
+        try:
+            while True:
+                resp = await client.search(
+                    pit={"id": pit_id, "keep_alive": "1m"},
+                    query=query,
+                    sort=[{"timestamp": {"order": "asc"}}, {"_shard_doc": "asc"}],
+                    size=self.page_size,
+                    search_after=search_after,
+                    source={"includes": list(JUNCTION_FIELDS)},
+                    track_total_hits=False,
+                )
+                pit_id = resp.get("pit_id", pit_id)
+                hits = resp.get("hits", {}).get("hits", [])
+                for hit in hits:
+                    timestamp = hit["sort"][0]
+                    yield (int(timestamp) if timestamp is not None else None), _junction_row(hit["_source"])
+                if len(hits) < self.page_size:
+                    return
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                await client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.warning(f"Failed to close point in time: {e}")
+
+    async def refresh(self, client: AsyncElasticsearch) -> int:
+        """Pull junctions written since the watermark. Returns how many were read."""
+        # Junctions inside the overlap are read again, which is harmless.
+        since = self.watermark - self.refresh_overlap_ms if self.watermark is not None else None
+        read = 0
+        async for timestamp, row in self._iter_junctions(client, since):
+            self._add_row(row)
+            if timestamp is not None:
+                self.watermark = timestamp if self.watermark is None else max(self.watermark, timestamp)
+            read += 1
+        self._update_gauges()
+        return read
+
+    def _map_snapshot(self) -> bool:
+        """Switch to the snapshot on disk if it changed. Returns True if it did."""
+        path = self.snapshot_path
+        if path is None or not path.exists():
+            return False
+        if self.snapshot is not None and self.snapshot.is_current(path):
+            return False
+
+        snapshot = JunctionSnapshot(path)
+        if self.snapshot is not None:
+            self.snapshot.close()
+        self.snapshot = snapshot
+        # Everything newer than the snapshot is pulled again on the next refresh.
+        self.recent = {field_name: {} for field_name in JUNCTION_FIELDS}
+        self.watermark = snapshot.watermark
+        self._overflowed = False
+        self._update_gauges()
+        return True
+
+    async def _lock(self, blocking: bool):
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.snapshot_dir / "lock", "a")
+        try:
+            if blocking:
+                await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+            else:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BaseException:
+            lock_file.close()
+            if blocking:
+                raise
+            return None
+        return lock_file
+
+    @staticmethod
+    def _unlock(lock_file) -> None:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+    async def _write_snapshot(self, client: AsyncElasticsearch) -> None:
+        """Fold the recent junctions into a new snapshot and switch to it."""
+        junctions: Dict[str, Dict[int, tuple]] = {}
+        for field_name in JUNCTION_FIELDS:
+            merged = dict(self.snapshot.items(field_name)) if self.snapshot is not None else {}
+            merged.update(self.recent[field_name])
+            junctions[field_name] = merged
+
+        await asyncio.to_thread(write_snapshot, self.snapshot_path, self.watermark, junctions)
+        logger.info(
+            f"✓ Junction index snapshot written "
+            f"({sum(len(ids) for ids in junctions.values())} ids)"
+        )
+        self._map_snapshot()
+        await self.refresh(client)
+
+    async def _compact(self, client: AsyncElasticsearch) -> None:
+        lock_file = await self._lock(blocking=False)
+        if lock_file is None:
+            # Another worker is writing one; it is picked up on a later refresh.
+            return
+        try:
+            # Another worker may have written a newer snapshot meanwhile.
+            if self._map_snapshot():
+                await self.refresh(client)
+            if self.recent_entries >= self.compact_entries or self._overflowed:
+                await self._write_snapshot(client)
+        finally:
+            self._unlock(lock_file)
+
+    async def _warm(self, client: AsyncElasticsearch) -> None:
+        started = time.monotonic()
+        if self.snapshot_dir is not None and not self._map_snapshot() and self.snapshot is None:
+            # First start on this host: one worker scans every junction into
+            # the snapshot while the others wait for it.
+            lock_file = await self._lock(blocking=True)
+            try:
+                if not self._map_snapshot():
+                    await self.refresh(client)
+                    await self._write_snapshot(client)
+            finally:
+                self._unlock(lock_file)
+
+        await self.refresh(client)
+        self.ready = True
+        logger.info(
+            f"✓ Junction index ready in {time.monotonic() - started:.1f}s "
+            f"({len(self.snapshot or ())} snapshot ids, {self.recent_entries} recent ids)"
+        )
+
+    async def _run(self) -> None:
+        while not self.ready:
+            try:
+                await self._warm(await es_manager.get_read_client())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Junction index warm-up failed: {e}")
+                await asyncio.sleep(self.refresh_interval)
+
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                client = await es_manager.get_read_client()
+                self._map_snapshot()
+                await self.refresh(client)
+                if self.snapshot_dir is not None and (
+                    self.recent_entries >= self.compact_entries or self._overflowed
+                ):
+                    await self._compact(client)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Junction index refresh failed: {e}")
+
+    def _update_gauges(self) -> None:
+        JUNCTION_INDEX_ENTRIES.labels("recent").set(self.recent_entries)
+        JUNCTION_INDEX_ENTRIES.labels("snapshot").set(len(self.snapshot or ()))
+
+    def start(self) -> None:
+        """Warm up and keep refreshing in the background; lookups miss until warm."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+        self.ready = False
+
+
+junction_index = JunctionIndex(
+    enabled=AnalyticConfig.ANALYTIC_JUNCTION_INDEX_ENABLED,
+    snapshot_dir=AnalyticConfig.ANALYTIC_JUNCTION_INDEX_SNAPSHOT_DIR,
+    refresh_interval=AnalyticConfig.ANALYTIC_JUNCTION_INDEX_REFRESH_INTERVAL,
+    refresh_overlap=AnalyticConfig.ANALYTIC_JUNCTION_INDEX_REFRESH_OVERLAP,
+    page_size=AnalyticConfig.ANALYTIC_JUNCTION_INDEX_PAGE_SIZE,
+    max_entries=AnalyticConfig.ANALYTIC_JUNCTION_INDEX_MAX_ENTRIES,
+    compact_entries=AnalyticConfig.ANALYTIC_JUNCTION_INDEX_COMPACT_ENTRIES,
+)
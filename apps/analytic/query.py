@@ -1,13 +1,86 @@
+import logging
+
 from elasticsearch import AsyncElasticsearch
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
 
 from apps.analytic.api.v1.schemas import ClaimFlowSchema
+from apps.analytic.cache import (
+    FLOW_FIELD_BY_MODEL_TAG,
+    HISTORICAL_CLAIM_INDEX,
+    ClaimFlowCache,
+    claim_flow_tags,
+)
+from apps.analytic.flow_index import ClaimFlowIndex
+from apps.analytic.junctions import JunctionIndex
+from config.settings.integrations_config import AnalyticConfig
 from shared.enums import ModelTagChoices
 
+logger = logging.getLogger(__name__)
+
+# Query parameter name -> junction field it is looked up by.
+FLOW_FIELD_BY_PARAM = {
+    "claim_id": "health_insured_claim",
+    "document_id": "health_document",
+    "eclaim_id": "eclaim",
+}
+
+
+class BackToBackDeduplicator:
+    """
+    Drops documents repeating the previous state of the same model_tag.
+    Only the last state per model_tag is kept, so a flow of any length can
+    be deduplicated page by page.
+
+    Entries are built as plain dicts in the ``ClaimFlowSchema`` dump shape;
+    hits come straight from Elasticsearch, so validating each one through
+    the model only costs CPU.
+    """
+
+    def __init__(self):
+        self._last_state_by_model: Dict[Any, Any] = {}
+
+    def accept(self, doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The serialized flow entry, or None for a back-to-back duplicate."""
+        # _source is missing when the mapping disables it or the search excluded it.
+        source = doc.get("_source") or {}
+        model_tag, state = source.get("model_tag"), source.get("state")
+
+        last_state = self._last_state_by_model.get(model_tag)
+        if last_state is not None and state == last_state:
+            return None
+
+        self._last_state_by_model[model_tag] = state
+        return {"id": doc["_id"], "index": doc["_index"], "source": source}
+
+
 class AnalyticElkQry:
-    def __init__(self, db: AsyncElasticsearch):
+    # Always fetched when _source is filtered: dedup and ordering need them.
+    FLOW_REQUIRED_FIELDS = ("model_tag", "state", "timestamp")
+    FLOW_SORT = [{"timestamp": {"order": "asc"}}]
+    # _shard_doc breaks timestamp ties; it is only available inside a PIT.
+    FLOW_PIT_SORT = [{"timestamp": {"order": "asc"}}, {"_shard_doc": "asc"}]
+
+    def __init__(
+        self,
+        db: AsyncElasticsearch,
+        cache: ClaimFlowCache | None = None,
+        flow_index: ClaimFlowIndex | None = None,
+        junctions: JunctionIndex | None = None,
+    ):
         self.db = db
-        self.index_name = "historical_claim"
+        self.cache = cache
+        self.flow_index = flow_index
+        self.junctions = junctions
+        self.index_name = HISTORICAL_CLAIM_INDEX
+        self.page_size = AnalyticConfig.ANALYTIC_FLOW_PAGE_SIZE
+        self.pit_keep_alive = AnalyticConfig.ANALYTIC_FLOW_PIT_KEEP_ALIVE
+        self.source_includes = (
+            sorted({*AnalyticConfig.ANALYTIC_FLOW_SOURCE_INCLUDES, *self.FLOW_REQUIRED_FIELDS})
+            if AnalyticConfig.ANALYTIC_FLOW_SOURCE_INCLUDES
+            else None
+        )
+        # Junction field whose id every document of a flow is routed by.
+        self.routing_field = AnalyticConfig.ANALYTIC_FLOW_ROUTING_FIELD or None
 
     # Convenience methods for backward compatibility
     async def get_claim_flow_by_claim_id(self, claim_id: int):
@@ -23,38 +96,29 @@ class AnalyticElkQry:
     def _remove_back_to_back_duplicates(
             docs: List[Dict[str, Any]]
     ) -> List[ClaimFlowSchema]:
-        if not docs:
-            return []
-
-        result = []
-        # Track last state for each model_tag
-        last_state_by_model = {}
-
-        for doc in docs:
-            source = doc.get("source", doc)
-            model_tag = source.get("model_tag")
-            state = source.get("state")
-
-            # Get the last state for this model_tag
-            last_state = last_state_by_model.get(model_tag)
-
-            if last_state is None or state != last_state:
-                data = ClaimFlowSchema(**doc).model_dump()
-                result.append(data)
-                last_state_by_model[model_tag] = state
-            # else: skip this document (it's a back-to-back duplicate)
-
-        return result
+        deduplicator = BackToBackDeduplicator()
+        return [
+            data for data in map(deduplicator.accept, docs) if data is not None
+        ]
 
     async def _get_junction_doc(
         self, field_name: str, value: int
     ) -> Optional[Dict[str, Any]]:
+        junction_source = self._lookup_junction(field_name, value)
+        if junction_source is not None:
+            return {"_source": junction_source}
+
         query = _build_term_query_by_field_and_tag(
             field_value=value,
             field_name=field_name,
             model_tag=ModelTagChoices.CLAIM_JUNCTION,
         )
-        resp = await self.db.search(index=self.index_name, query=query, size=1)
+        resp = await self.db.search(
+            index=self.index_name,
+            query=query,
+            size=1,
+            routing=self._routing_by(field_name, value),
+        )
         hits = resp.get("hits", {}).get("hits", [])
         if not hits:
             return None
@@ -63,54 +127,264 @@ class AnalyticElkQry:
     async def get_claim_flow(
         self, value: int, field_name: str = "health_insured_claim"
     ) -> List[ClaimFlowSchema]:
+        if self.cache is None:
+            result, _ = await self._load_claim_flow(value, field_name)
+            return result
+        return await self.cache.get_or_load(
+            field_name, value, lambda: self._load_claim_flow(value, field_name)
+        )
+
+    async def _load_claim_flow(
+        self, value: int, field_name: str
+    ) -> tuple[List[ClaimFlowSchema], set[str]]:
+        """The claim flow plus the cache tags of every id it was built from."""
+        if self.flow_index is not None and self.flow_index.enabled:
+            materialized = await self.flow_index.get_flow(
+                self.db, field_name, value, source_includes=self.source_includes
+            )
+            # Ids missing from the index (e.g. before the backfill) fall back to search.
+            if materialized is not None:
+                docs, tags = materialized
+                return self._remove_back_to_back_duplicates(docs), tags
+
         junction = await self._get_junction_doc(field_name, value)
         if not junction:
-            return []
+            return [], set()
 
         src = junction["_source"]
-        claim_id = src.get("health_insured_claim")
-        document_id = src.get("health_document")
-        damage_request_id = src.get("eclaim")
+        tags = claim_flow_tags(src)
+        flow_search = self._build_flow_search(src)
+        if flow_search is None:
+            return [], tags
+
+        deduplicator = BackToBackDeduplicator()
+        result = []
+        async for hit in self._iter_flow_hits(flow_search, routing=self._flow_routing(src)):
+            data = deduplicator.accept(hit)
+            if data is not None:
+                result.append(data)
+        return result, tags
 
-        # Query 2: Get all related documents in one query
-        should_clauses = []
+    async def iter_claim_flow(
+        self, value: int, field_name: str = "health_insured_claim"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield a claim flow entry by entry, with memory bounded by one page
+        however long the flow is. Bypasses the flow cache.
+        """
+        deduplicator = BackToBackDeduplicator()
 
-        if claim_id:
-            should_clauses.append(
-                _build_term_query_by_field_and_tag(
-                    claim_id, ModelTagChoices.CLAIM
-                )
+        if self.flow_index is not None and self.flow_index.enabled:
+            materialized = await self.flow_index.get_flow(
+                self.db, field_name, value, source_includes=self.source_includes
             )
+            if materialized is not None:
+                for doc in materialized[0]:
+                    data = deduplicator.accept(doc)
+                    if data is not None:
+                        yield data
+                return
 
-        if document_id:
-            should_clauses.append(
-                _build_term_query_by_field_and_tag(
-                    document_id, ModelTagChoices.DOCUMENT
-                )
+        junction = await self._get_junction_doc(field_name, value)
+        flow_search = self._build_flow_search(junction["_source"]) if junction else None
+        if flow_search is None:
+            return
+
+        routing = self._flow_routing(junction["_source"])
+        async for hit in self._iter_flow_hits(flow_search, routing=routing):
+            data = deduplicator.accept(hit)
+            if data is not None:
+                yield data
+
+    async def _iter_flow_hits(
+        self,
+        flow_search: Dict[str, Any],
+        first_page: Optional[List[Dict[str, Any]]] = None,
+        routing: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Every document of a flow, oldest first. A flow that fits in one page
+        costs a single search. Longer flows are re-read from the start
+        through a point in time with ``search_after``, so documents indexed
+        meanwhile cannot shift or duplicate entries across pages.
+        ``routing`` limits every search to the shard holding the flow.
+        """
+        if first_page is None:
+            resp = await self.db.search(
+                index=self.index_name,
+                query=flow_search["query"],
+                sort=flow_search["sort"],
+                size=flow_search["size"],
+                source=flow_search.get("_source"),
+                routing=routing,
             )
+            first_page = resp.get("hits", {}).get("hits", [])
 
-        if damage_request_id:
-            should_clauses.append(
-                _build_term_query_by_field_and_tag(
-                    damage_request_id, ModelTagChoices.E_DAMAGE_REQUEST
+        if len(first_page) < self.page_size:
+            for hit in first_page:
+                yield hit
+            return
+
+        pit = await self.db.open_point_in_time(
+            index=self.index_name, keep_alive=self.pit_keep_alive, routing=routing
+        )
+        pit_id = pit["id"]
+        search_after = None
+        try:
+            while True:
+                resp = await self.db.search(
+                    pit={"id": pit_id, "keep_alive": self.pit_keep_alive},
+                    query=flow_search["query"],
+                    sort=self.FLOW_PIT_SORT,
+                    size=self.page_size,
+                    search_after=search_after,
+                    source=flow_search.get("_source"),
+                    track_total_hits=False,
                 )
+                pit_id = resp.get("pit_id", pit_id)
+                hits = resp.get("hits", {}).get("hits", [])
+                for hit in hits:
+                    yield hit
+                if len(hits) < self.page_size:
+                    return
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                await self.db.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.warning(f"Failed to close point in time: {e}")
+
+    async def get_claim_flows(
+        self, ids: list[tuple[str, int]]
+    ) -> tuple[Dict[str, List[ClaimFlowSchema]], Dict[str, str]]:
+        """
+        Claim flows for many ``(param, id)`` pairs, e.g. ``("eclaim_id", 12)``,
+        in two _msearch round trips: every junction lookup, then every flow
+        query. Junctions known to the in-process index skip the first one.
+        Results and per-claim errors are keyed by ``"param:id"``.
+        """
+        results: Dict[str, List[ClaimFlowSchema]] = {}
+        errors: Dict[str, str] = {}
+        keys = list(dict.fromkeys(ids))
+        if not keys:
+            return results, errors
+
+        junction_sources = {}
+        searches = []
+        for param, value in keys:
+            junction_source = self._lookup_junction(FLOW_FIELD_BY_PARAM[param], value)
+            if junction_source is not None:
+                junction_sources[(param, value)] = junction_source
+                continue
+            searches.append(
+                self._msearch_header(self._routing_by(FLOW_FIELD_BY_PARAM[param], value))
             )
+            searches.append({
+                "query": _build_term_query_by_field_and_tag(
+                    field_value=value,
+                    field_name=FLOW_FIELD_BY_PARAM[param],
+                    model_tag=ModelTagChoices.CLAIM_JUNCTION,
+                ),
+                "size": 1,
+            })
+        if searches:
+            junction_resp = await self.db.msearch(searches=searches)
+            responses = iter(junction_resp["responses"])
+        else:
+            responses = iter(())
 
+        flow_searches = {}
+        flow_routings = {}
+        searches = []
+        for param, value in keys:
+            key = f"{param}:{value}"
+            junction_source = junction_sources.get((param, value))
+            if junction_source is None:
+                resp = next(responses)
+                if "error" in resp:
+                    errors[key] = _msearch_error_reason(resp["error"])
+                    continue
+                hits = resp.get("hits", {}).get("hits", [])
+                junction_source = hits[0]["_source"] if hits else None
+            flow_search = self._build_flow_search(junction_source) if junction_source else None
+            if flow_search is None:
+                results[key] = []
+                continue
+            flow_searches[key] = flow_search
+            flow_routings[key] = self._flow_routing(junction_source)
+            searches.append(self._msearch_header(flow_routings[key]))
+            searches.append(flow_search)
+
+        if not searches:
+            return results, errors
+
+        flow_resp = await self.db.msearch(searches=searches)
+        for key, resp in zip(flow_searches, flow_resp["responses"]):
+            if "error" in resp:
+                errors[key] = _msearch_error_reason(resp["error"])
+                continue
+            docs = resp.get("hits", {}).get("hits", [])
+            if len(docs) < self.page_size:
+                results[key] = self._remove_back_to_back_duplicates(docs)
+                continue
+            # The page is full: read the rest of this flow on its own.
+            flow_search = flow_searches[key]
+            deduplicator = BackToBackDeduplicator()
+            results[key] = [
+                data
+                async for hit in self._iter_flow_hits(
+                    flow_search, first_page=docs, routing=flow_routings[key]
+                )
+                if (data := deduplicator.accept(hit)) is not None
+            ]
+
+        return results, errors
+
+    def _lookup_junction(self, field_name: str, value: int) -> Optional[Dict[str, Any]]:
+        if self.junctions is None or not self.junctions.enabled:
+            return None
+        return self.junctions.lookup(field_name, value)
+
+    def _routing_by(self, field_name: str, value) -> Optional[str]:
+        """Routing of a junction looked up by ``field_name``, known only for the routing field."""
+        return str(value) if self.routing_field is not None and field_name == self.routing_field else None
+
+    def _flow_routing(self, junction_source: dict) -> Optional[str]:
+        if self.routing_field is None or not junction_source.get(self.routing_field):
+            return None
+        return str(junction_source[self.routing_field])
+
+    def _msearch_header(self, routing: Optional[str]) -> Dict[str, Any]:
+        header = {"index": self.index_name}
+        if routing is not None:
+            header["routing"] = routing
+        return header
+
+    def _build_flow_search(self, junction_source: dict) -> Optional[Dict[str, Any]]:
+        """Search body for every document linked by a junction, oldest first."""
+        should_clauses = [
+            _build_term_query_by_field_and_tag(junction_source[field_name], model_tag)
+            for model_tag, field_name in FLOW_FIELD_BY_MODEL_TAG.items()
+            if junction_source.get(field_name)
+        ]
         if not should_clauses:
-            return []
+            return None
 
-        # Single query with sorting
-        query = {"bool": {"should": should_clauses, "minimum_should_match": 1}}
+        flow_search = {
+            "query": {"bool": {"should": should_clauses, "minimum_should_match": 1}},
+            "sort": self.FLOW_SORT,
+            "size": self.page_size,
+        }
+        if self.source_includes:
+            flow_search["_source"] = {"includes": self.source_includes}
+        return flow_search
 
-        resp = await self.db.search(
-            index=self.index_name,
-            query=query,
-            sort=[{"timestamp": {"order": "asc"}}],
-            size=300,
-        )
 
-        docs = resp.get("hits", {}).get("hits", [])
-        return self._remove_back_to_back_duplicates(docs)
+def _msearch_error_reason(error: dict | str) -> str:
+    if isinstance(error, dict):
+        return error.get("reason") or error.get("type") or str(error)
+    return str(error)
+
 
 def _build_term_query_by_field_and_tag(field_value, model_tag, field_name: str = "id"):
     return {
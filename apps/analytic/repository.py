@@ -1,9 +1,14 @@
+from datetime import date
+from typing import AsyncIterator
+
 from apps.analytic.query import AnalyticElkQry
+from apps.analytic.stats import ClaimStatsQry
 
 
 class AnalyticRepo:
-    def __init__(self, elk_qry: AnalyticElkQry):
+    def __init__(self, elk_qry: AnalyticElkQry, stats_qry: ClaimStatsQry | None = None):
         self.elk_qry = elk_qry
+        self.stats_qry = stats_qry
 
     async def get_claim_flow_by_eclaim_id(self, eclaim_id):
         res = await self.elk_qry.get_claim_flow_by_eclaim_id(eclaim_id)
@@ -16,3 +21,24 @@ class AnalyticRepo:
     async def get_claim_flow_by_claim_id(self, claim_id):
         res = await self.elk_qry.get_claim_flow_by_claim_id(claim_id)
         return res
+
+    async def get_claim_flows(self, ids: list[tuple[str, int]]):
+        res = await self.elk_qry.get_claim_flows(ids)
+        return res
+
+    def iter_claim_flow(self, value: int, field_name: str) -> AsyncIterator[dict]:
+        return self.elk_qry.iter_claim_flow(value, field_name)
+
+    async def get_daily_volume(self, start: date, end: date, model_tag: str | None = None):
+        res = await self.stats_qry.daily_volume(start, end, model_tag)
+        return res
+
+    async def get_transition_counts(self, start: date, end: date, model_tag: str | None = None):
+        res = await self.stats_qry.transition_counts(start, end, model_tag)
+        return res
+
+    async def get_dwell_times(
+        self, start: date, end: date, percentiles: list[float], model_tag: str | None = None
+    ):
+        res = await self.stats_qry.dwell_times(start, end, percentiles, model_tag)
+        return res
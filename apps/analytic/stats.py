@@ -0,0 +1,356 @@
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import orjson
+from elasticsearch import AsyncElasticsearch
+
+from apps.analytic.cache import FLOW_FIELD_BY_MODEL_TAG, HISTORICAL_CLAIM_INDEX
+from config.settings.integrations_config import AnalyticConfig
+from config.settings.services.redis import redis_manager
+from shared.cache import LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class LogHistogram:
+    """
+    Histogram over log-spaced buckets, each ``GROWTH`` times wider than the
+    previous one, so percentiles are within 10% of the true value. Bucket
+    counts simply add up, which lets cached per-day histograms be merged
+    into any window.
+    """
+
+    GROWTH = 1.1
+    _LOG_GROWTH = math.log(GROWTH)
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None):
+        self.counts: Dict[int, int] = counts or {}
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, value: float) -> None:
+        # Bucket 0 holds everything up to 1.
+        index = math.ceil(math.log(value) / self._LOG_GROWTH) if value > 1 else 0
+        self.counts[index] = self.counts.get(index, 0) + 1
+
+    def merge(self, other: "LogHistogram") -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given percentile."""
+        total = self.count
+        if not total:
+            return None
+        rank = max(1, math.ceil(total * percent / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return round(self.GROWTH ** index, 3)
+        return None
+
+    def to_dict(self) -> Dict[str, int]:
+        return {str(index): count for index, count in self.counts.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, int]) -> "LogHistogram":
+        return cls({int(index): count for index, count in data.items()})
+
+
+class DayRollupCache:
+    """
+    Rollups of closed days, in process and in Redis when available. A day
+    is closed once ``close_delay`` seconds have passed since its end, which
+    leaves room for late events; closed days are never recomputed until
+    their entry expires.
+    """
+
+    KEY_PREFIX = "claim_stats:v1:"
+
+    def __init__(self, ttl: int, local_max_entries: int, close_delay: int):
+        self.ttl = ttl
+        self.close_delay = close_delay
+        self.local = LocalTTLCache(max_entries=local_max_entries, ttl=ttl)
+
+    def is_closed(self, day: date) -> bool:
+        day_end = datetime.combine(day + timedelta(days=1), datetime.min.time(), timezone.utc)
+        return day_end.timestamp() + self.close_delay <= time.time()
+
+    async def get_many(self, kind: str, days: List[date]) -> Dict[date, Any]:
+        found = {}
+        missing = []
+        for day in days:
+            rollup = self.local.get((kind, day))
+            if rollup is None:
+                missing.append(day)
+            else:
+                found[day] = rollup
+
+        if missing and redis_manager.is_initialized:
+            try:
+                values = await redis_manager.get_client().mget(
+                    [f"{self.KEY_PREFIX}{kind}:{day.isoformat()}" for day in missing]
+                )
+            except Exception as e:
+                logger.warning(f"Claim stats rollup read failed: {e}")
+                values = []
+            for day, raw in zip(missing, values):
+                if raw is not None:
+                    found[day] = orjson.loads(raw)
+                    self.local.set((kind, day), found[day])
+        return found
+
+    async def set(self, kind: str, day: date, rollup: Any) -> None:
+        self.local.set((kind, day), rollup)
+        if not redis_manager.is_initialized:
+            return
+        try:
+            await redis_manager.get_client().set(
+                f"{self.KEY_PREFIX}{kind}:{day.isoformat()}", orjson.dumps(rollup), ex=self.ttl
+            )
+        except Exception as e:
+            logger.warning(f"Claim stats rollup write failed: {e}")
+
+
+def _day_of(millis: int) -> date:
+    return datetime.fromtimestamp(millis / 1000, timezone.utc).date()
+
+
+def _collapse_states(events: List[tuple[int, Any]]) -> List[tuple[int, Any]]:
+    """Keep the first event of every run of the same state."""
+    collapsed = []
+    for timestamp, state in events:
+        if not collapsed or collapsed[-1][1] != state:
+            collapsed.append((timestamp, state))
+    return collapsed
+
+
+class ClaimStatsQry:
+    """
+    State analytics over ``historical_claim`` built from composite
+    aggregations and cached as per-day rollups:
+
+    - volume: documents per day, model_tag and state
+    - transitions: state changes of each claim, document or eclaim, with the
+      time spent in the previous state, attributed to the day of the change
+
+    Transitions come from each entity's events within the window plus
+    ``lookback_days`` before it, capped at ``max_events`` events per entity.
+    Their pages hold fewer entities, so that a page returns at most
+    ``ANALYTIC_STATS_MAX_HITS_PER_PAGE`` events.
+    """
+
+    VOLUME = "volume"
+    TRANSITIONS = "transitions"
+
+    def __init__(self, db: AsyncElasticsearch, rollups: DayRollupCache):
+        self.db = db
+        self.rollups = rollups
+        self.index_name = HISTORICAL_CLAIM_INDEX
+        self.page_size = AnalyticConfig.ANALYTIC_STATS_COMPOSITE_PAGE_SIZE
+        self.max_events = AnalyticConfig.ANALYTIC_STATS_MAX_EVENTS_PER_ENTITY
+        self.transitions_page_size = max(1, min(
+            self.page_size,
+            AnalyticConfig.ANALYTIC_STATS_MAX_HITS_PER_PAGE // self.max_events,
+        ))
+        self.lookback_days = AnalyticConfig.ANALYTIC_STATS_TRANSITIONS_LOOKBACK_DAYS
+
+    async def daily_volume(
+        self, start: date, end: date, model_tag: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        rollups = await self._rollups(self.VOLUME, start, end, self._compute_volume)
+        return [
+            {"date": day.isoformat(), "model_tag": tag, "state": state, "count": count}
+            for day, rows in sorted(rollups.items())
+            for tag, state, count in rows
+            if model_tag is None or tag == model_tag
+        ]
+
+    async def transition_counts(
+        self, start: date, end: date, model_tag: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        rollups = await self._rollups(self.TRANSITIONS, start, end, self._compute_transitions)
+        counts: Dict[tuple, int] = defaultdict(int)
+        for rollup in rollups.values():
+            for tag, from_state, to_state, count in rollup["transitions"]:
+                if model_tag is None or tag == model_tag:
+                    counts[(tag, from_state, to_state)] += count
+        return [
+            {"model_tag": tag, "from_state": from_state, "to_state": to_state, "count": count}
+            for (tag, from_state, to_state), count in sorted(
+                counts.items(), key=lambda item: (-item[1], str(item[0]))
+            )
+        ]
+
+    async def dwell_times(
+        self,
+        start: date,
+        end: date,
+        percentiles: List[float],
+        model_tag: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Seconds spent in each state before leaving it."""
+        rollups = await self._rollups(self.TRANSITIONS, start, end, self._compute_transitions)
+        histograms: Dict[tuple, LogHistogram] = defaultdict(LogHistogram)
+        for rollup in rollups.values():
+            for tag, state, counts in rollup["dwell"]:
+                if model_tag is None or tag == model_tag:
+                    histograms[(tag, state)].merge(LogHistogram.from_dict(counts))
+        return [
+            {
+                "model_tag": tag,
+                "state": state,
+                "count": histogram.count,
+                "percentiles": {
+                    str(percent): histogram.percentile(percent) for percent in percentiles
+                },
+            }
+            for (tag, state), histogram in sorted(histograms.items(), key=lambda item: str(item[0]))
+        ]
+
+    async def _rollups(
+        self,
+        kind: str,
+        start: date,
+        end: date,
+        compute: Callable[[date, date], Awaitable[Dict[date, Any]]],
+    ) -> Dict[date, Any]:
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        rollups = await self.rollups.get_many(
+            kind, [day for day in days if self.rollups.is_closed(day)]
+        )
+        missing = [day for day in days if day not in rollups]
+        if not missing:
+            return rollups
+
+        computed = await compute(missing[0], missing[-1])
+        for day in missing:
+            rollups[day] = computed[day]
+            if self.rollups.is_closed(day):
+                await self.rollups.set(kind, day, computed[day])
+        return rollups
+
+    def _window_query(self, start: date, end: date) -> Dict[str, Any]:
+        return {
+            "bool": {
+                "filter": [
+                    {"terms": {"model_tag.keyword": list(FLOW_FIELD_BY_MODEL_TAG)}},
+                    {
+                        "range": {
+                            "timestamp": {
+                                "gte": start.isoformat(),
+                                "lt": (end + timedelta(days=1)).isoformat(),
+                                "time_zone": "UTC",
+                            }
+                        }
+                    },
+                ]
+            }
+        }
+
+    async def _iter_composite_buckets(
+        self,
+        query: Dict[str, Any],
+        sources: List[Dict[str, Any]],
+        aggs: Optional[Dict[str, Any]] = None,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        page_size = page_size or self.page_size
+        composite: Dict[str, Any] = {"size": page_size, "sources": sources}
+        while True:
+            aggregation: Dict[str, Any] = {"composite": composite}
+            if aggs:
+                aggregation["aggs"] = aggs
+            resp = await self.db.search(
+                index=self.index_name,
+                query=query,
+                size=0,
+                aggregations={"buckets": aggregation},
+                track_total_hits=False,
+            )
+            result = resp["aggregations"]["buckets"]
+            for bucket in result["buckets"]:
+                yield bucket
+            if "after_key" not in result or len(result["buckets"]) < page_size:
+                return
+            composite = {**composite, "after": result["after_key"]}
+
+    async def _compute_volume(self, first: date, last: date) -> Dict[date, Any]:
+        rows: Dict[date, list] = {
+            first + timedelta(days=offset): [] for offset in range((last - first).days + 1)
+        }
+        sources = [
+            {"day": {"date_histogram": {"field": "timestamp", "calendar_interval": "1d", "time_zone": "UTC"}}},
+            {"model_tag": {"terms": {"field": "model_tag.keyword"}}},
+            {"state": {"terms": {"field": "state.keyword", "missing_bucket": True}}},
+        ]
+        async for bucket in self._iter_composite_buckets(self._window_query(first, last), sources):
+            key = bucket["key"]
+            day = _day_of(key["day"])
+            if day in rows:
+                rows[day].append([key["model_tag"], key["state"], bucket["doc_count"]])
+        return rows
+
+    async def _compute_transitions(self, first: date, last: date) -> Dict[date, Any]:
+        transitions: Dict[date, Dict[tuple, int]] = defaultdict(lambda: defaultdict(int))
+        dwell: Dict[date, Dict[tuple, LogHistogram]] = defaultdict(lambda: defaultdict(LogHistogram))
+
+        sources = [
+            {"model_tag": {"terms": {"field": "model_tag.keyword"}}},
+            {"id": {"terms": {"field": "id"}}},
+        ]
+        # The newest events of each entity, so changes inside the window are
+        # kept when an entity has more than max_events in the lookback.
+        aggs = {
+            "events": {
+                "top_hits": {
+                    "size": self.max_events,
+                    "sort": [{"timestamp": {"order": "desc"}}],
+                    "_source": {"includes": ["state"]},
+                }
+            }
+        }
+        query = self._window_query(first - timedelta(days=self.lookback_days), last)
+
+        async for bucket in self._iter_composite_buckets(
+            query, sources, aggs, page_size=self.transitions_page_size
+        ):
+            model_tag = bucket["key"]["model_tag"]
+            events = [
+                (hit["sort"][0], hit["_source"].get("state"))
+                for hit in reversed(bucket["events"]["hits"]["hits"])
+                if hit.get("sort") and hit["sort"][0] is not None
+            ]
+            collapsed = _collapse_states(events)
+            for (entered_at, from_state), (left_at, to_state) in zip(collapsed, collapsed[1:]):
+                day = _day_of(left_at)
+                if first <= day <= last:
+                    transitions[day][(model_tag, from_state, to_state)] += 1
+                    dwell[day][(model_tag, from_state)].add((left_at - entered_at) / 1000)
+
+        return {
+            first + timedelta(days=offset): {
+                "transitions": [
+                    [*key, count] for key, count in transitions[first + timedelta(days=offset)].items()
+                ],
+                "dwell": [
+                    [*key, histogram.to_dict()]
+                    for key, histogram in dwell[first + timedelta(days=offset)].items()
+                ],
+            }
+            for offset in range((last - first).days + 1)
+        }
+
+
+claim_stats_rollups = DayRollupCache(
+    ttl=AnalyticConfig.ANALYTIC_STATS_ROLLUP_TTL,
+    local_max_entries=AnalyticConfig.ANALYTIC_STATS_ROLLUP_LOCAL_MAX_ENTRIES,
+    close_delay=AnalyticConfig.ANALYTIC_STATS_ROLLUP_CLOSE_DELAY,
+)
@@ -0,0 +1,58 @@
+from elasticsearch import AsyncElasticsearch
+
+from apps.analytic.cache import (
+    HISTORICAL_CLAIM_INDEX,
+    ClaimFlowCache,
+    claim_flow_cache,
+    claim_flow_source,
+    claim_flow_tags,
+)
+from apps.analytic.flow_index import ClaimFlowIndex, claim_flow_index
+from apps.analytic.junctions import JunctionIndex, junction_index
+from shared.bulk import BulkEntry
+
+
+class ClaimFlowSync:
+    """
+    Keeps the claim flow read models in step with ingest: documents indexed
+    into ``historical_claim`` are applied to the materialized index first,
+    then their cached flows are dropped. Junctions are also recorded in this
+    worker's junction index right away.
+    """
+
+    def __init__(
+        self,
+        cache: ClaimFlowCache,
+        flow_index: ClaimFlowIndex,
+        junctions: JunctionIndex,
+        index_name: str = HISTORICAL_CLAIM_INDEX,
+    ):
+        self.cache = cache
+        self.flow_index = flow_index
+        self.junctions = junctions
+        self.index_name = index_name
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache.enabled or self.flow_index.enabled or self.junctions.enabled
+
+    def source_of(self, action: dict | BulkEntry) -> dict | None:
+        """The document an index action writes, if it belongs to a claim flow."""
+        if not self.enabled:
+            return None
+        return claim_flow_source(action, self.index_name)
+
+    async def indexed(self, client: AsyncElasticsearch, docs: list[tuple[str, dict]]) -> None:
+        """Call with the ``(_id, _source)`` of documents Elasticsearch acknowledged."""
+        if not docs:
+            return
+        if self.flow_index.enabled:
+            await self.flow_index.apply(
+                client, ((doc_id, self.index_name, source) for doc_id, source in docs)
+            )
+        for _, source in docs:
+            self.junctions.add(source)
+        await self.cache.invalidate(set().union(*(claim_flow_tags(source) for _, source in docs)))
+
+
+claim_flow_sync = ClaimFlowSync(claim_flow_cache, claim_flow_index, junction_index)
@@ -1,16 +1,39 @@
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 
+from apps.analytic.sync import claim_flow_sync
+from apps.ingestor.buffer import ingest_buffer
 from apps.ingestor.query import IngestorElkQry
 from apps.ingestor.repository import IngestorRepo
-from config.settings.services.elk import get_write_es_client
+from apps.ingestor.spool import ingest_spool
+from config.settings.integrations_config import IngestorConfig
+from config.settings.services.elk import get_deferrable_write_es_client, get_write_es_client
+from shared.routing import RoutingRules
 
+# With the spool enabled, an unavailable cluster yields db=None and the
+# query layer spools instead of failing the request.
+write_client_dependency = (
+    get_deferrable_write_es_client
+    if IngestorConfig.INGESTOR_SPOOL_ENABLED
+    else get_write_es_client
+)
 
-async def get_ingestor_elk_query(db: AsyncElasticsearch = Depends(get_write_es_client)) -> IngestorElkQry:
+ingest_routing = RoutingRules(IngestorConfig.INGESTOR_ROUTING_RULES)
+
+
+async def get_ingestor_elk_query(
+    db: AsyncElasticsearch | None = Depends(write_client_dependency),
+) -> IngestorElkQry:
     """
     Database coupling is isolated to the query layer.
     """
-    return IngestorElkQry(db)
+    return IngestorElkQry(
+        db,
+        buffer=ingest_buffer,
+        spool=ingest_spool,
+        flow_sync=claim_flow_sync,
+        routing=ingest_routing,
+    )
 
 
 async def get_ingestor_repo(
@@ -1,7 +1,14 @@
-from fastapi import Depends, APIRouter, HTTPException, status, Response
+from fastapi import Depends, APIRouter, HTTPException, Query, status, Request, Response
 
 from apps.ingestor.repository import IngestorRepo
+from apps.ingestor.spool import ingest_spool, spool_replayer
+from config.settings.integrations_config import IngestorConfig
 from config.settings.services.log import setup_logging
+from shared.exceptions import (
+    IngestOverloadedError,
+    NdjsonLineTooLongError,
+    SpoolFullError,
+)
 from .dependencies import get_ingestor_repo
 from .schemas import BulkInsertSchema, SingleInsertSchema
 
@@ -19,23 +26,102 @@ v1_router = APIRouter(
 
 __all__ = ["v1_router"]
 
+BULK_RESPONSES = {
+    status.HTTP_429_TOO_MANY_REQUESTS: {
+        "description": "Ingest is saturated, retry after the Retry-After delay",
+    },
+    status.HTTP_201_CREATED: {
+        "description": "All documents inserted successfully",
+        "model": BulkInsertSchema,
+    },
+    status.HTTP_202_ACCEPTED: {
+        "description": "Elasticsearch is unavailable, documents were spooled for later indexing",
+        "model": BulkInsertSchema,
+    },
+    status.HTTP_207_MULTI_STATUS: {
+        "description": "Partial success - some documents inserted, some failed",
+        "model": BulkInsertSchema,
+    },
+    status.HTTP_417_EXPECTATION_FAILED: {
+        "description": "All documents failed to insert",
+        "model": BulkInsertSchema,
+    },
+}
+
+
+ROUTING_CONTRACT = (
+    " Indices listed in INGESTOR_ROUTING_RULES are routed by a field of each "
+    "document (e.g. `claim_key`), which producers must set on every claim flow "
+    "document. Documents without it are stored with default routing, as "
+    "`reindex-routed` does, and routed flow reads do not find them."
+)
+
+
+def _overloaded(e: IngestOverloadedError) -> HTTPException:
+    logger.warning("ingest overloaded", extra={"data": str(e)})
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+def _spool_full(e: SpoolFullError) -> HTTPException:
+    logger.error("ingest spool full", extra={"data": str(e)})
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+    )
+
+
+def _set_bulk_status_code(response: Response, result: BulkInsertSchema) -> None:
+    if result.summary.spooled and result.summary.failed == 0:
+        response.status_code = status.HTTP_202_ACCEPTED
+    elif result.summary.failed == 0:
+        response.status_code = status.HTTP_201_CREATED
+    elif result.summary.inserted or result.summary.spooled:
+        # Spooled documents were accepted, like inserted ones.
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    else:
+        response.status_code = status.HTTP_417_EXPECTATION_FAILED
+
+
+@v1_router.get(
+    path="/spool/status",
+    summary="Ingest spool status",
+    description="Replay lag and disk usage of this worker's ingest spool",
+)
+async def spool_status() -> dict:
+    return {**ingest_spool.status(), "replay_last_error": spool_replayer.last_error}
+
 
 @v1_router.post(
     path="/{index_name}/store-doc",
     status_code=status.HTTP_201_CREATED,
     response_model=SingleInsertSchema,
     summary="Create a single doc in index you want",
-    description="Insert a single document into Elasticsearch",
+    description="Insert a single document into Elasticsearch." + ROUTING_CONTRACT,
+    responses={
+        status.HTTP_202_ACCEPTED: {
+            "description": "Elasticsearch is unavailable, the document was spooled for later indexing",
+            "model": SingleInsertSchema,
+        },
+    },
 )
 async def store_doc(
+    response: Response,
     index_name: str,
     log_data: dict,
     repo: IngestorRepo = Depends(get_ingestor_repo),
 ) -> SingleInsertSchema:
     try:
-        response = await repo.insert_doc(log_data, index_name)
-        logger.info("doc inserted successfully", extra={"data": response.model_dump()})
-        return response
+        result = await repo.insert_doc(log_data, index_name)
+        if result.result == "spooled":
+            response.status_code = status.HTTP_202_ACCEPTED
+        logger.info("doc inserted successfully", extra={"data": result.model_dump()})
+        return result
+    except SpoolFullError as e:
+        raise _spool_full(e)
     except Exception as e:
         logger.exception("error inserting doc", extra={"data": str(e)})
         raise HTTPException(
@@ -49,21 +135,8 @@ async def store_doc(
     "/{index_name}/store-docs",
     response_model=BulkInsertSchema,
     summary="Bulk create doc entries",
-    description="Insert multiple log documents into Elasticsearch in bulk",
-    responses={
-        status.HTTP_201_CREATED: {
-            "description": "All documents inserted successfully",
-            "model": BulkInsertSchema,
-        },
-        status.HTTP_207_MULTI_STATUS: {
-            "description": "Partial success - some documents inserted, some failed",
-            "model": BulkInsertSchema,
-        },
-        status.HTTP_417_EXPECTATION_FAILED: {
-            "description": "All documents failed to insert",
-            "model": BulkInsertSchema,
-        },
-    },
+    description="Insert multiple log documents into Elasticsearch in bulk." + ROUTING_CONTRACT,
+    responses=BULK_RESPONSES,
 )
 async def bulk_store_docs(
     response: Response,
@@ -73,21 +146,75 @@ async def bulk_store_docs(
 ) -> BulkInsertSchema:
     try:
         result = await repo.bulk_insert_docs(log_data, index_name)
-
-        if result.summary.failed == 0:
-            response.status_code = status.HTTP_201_CREATED
-        elif result.summary.inserted > 0:
-            response.status_code = status.HTTP_207_MULTI_STATUS
-        else:
-            response.status_code = status.HTTP_417_EXPECTATION_FAILED
+        _set_bulk_status_code(response, result)
 
         logger.info("bulk docs processed", extra={"data": result.model_dump()})
 
         return result
 
+    except IngestOverloadedError as e:
+        raise _overloaded(e)
+    except SpoolFullError as e:
+        raise _spool_full(e)
     except Exception as e:
         logger.exception("error bulk inserting docs", extra={"data": str(e)})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An internal error occurred while bulk creating log entries",
         )
+
+
+@v1_router.post(
+    "/{index_name}/store-docs/ndjson",
+    response_model=BulkInsertSchema,
+    summary="Bulk create doc entries from an NDJSON stream",
+    description=(
+        "Insert newline-delimited JSON documents into Elasticsearch in bulk. "
+        "The body is parsed incrementally (chunked transfer is supported), so "
+        "indexing starts while the upload is still in progress." + ROUTING_CONTRACT
+    ),
+    responses={
+        **BULK_RESPONSES,
+        status.HTTP_413_CONTENT_TOO_LARGE: {"description": "A single NDJSON line is too large"},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def bulk_store_ndjson_docs(
+    request: Request,
+    response: Response,
+    index_name: str,
+    passthrough: bool = Query(
+        IngestorConfig.INGESTOR_NDJSON_PASSTHROUGH,
+        description="Forward each line's bytes to Elasticsearch without decoding the document",
+    ),
+    repo: IngestorRepo = Depends(get_ingestor_repo),
+) -> BulkInsertSchema:
+    try:
+        result = await repo.bulk_insert_ndjson(request.stream(), index_name, passthrough)
+        _set_bulk_status_code(response, result)
+
+        logger.info("bulk ndjson docs processed", extra={"data": result.summary.model_dump()})
+
+        return result
+
+    except IngestOverloadedError as e:
+        raise _overloaded(e)
+    except SpoolFullError as e:
+        raise _spool_full(e)
+    except NdjsonLineTooLongError as e:
+        logger.warning("ndjson line too long", extra={"data": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=str(e),
+        )
+    except Exception as e:
+        logger.exception("error bulk inserting ndjson docs", extra={"data": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred while bulk creating log entries",
+        )
@@ -10,6 +10,7 @@ class ErrorDetailSchema(BaseModel):
 class InsertSummarySchema(BaseModel):
     inserted: int = Field(..., description="Number of successfully inserted documents")
     failed: int = Field(0, description="Number of failed insertions")
+    spooled: int = Field(0, description="Number of documents accepted into the local spool for later indexing")
 
 
 class BulkInsertSchema(BaseModel):
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import time
+
+import orjson
+
+from config.settings.integrations_config import IngestorConfig
+from config.settings.services.elk import es_manager
+from config.settings.services.metrics import gauge, histogram
+from shared.exceptions import BulkItemError
+
+logger = logging.getLogger(__name__)
+
+
+BUFFER_FLUSH_DOCS = histogram(
+    "ingestor_buffer_flush_docs",
+    "Documents sent per write-behind flush",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+BUFFER_FLUSH_SECONDS = histogram(
+    "ingestor_buffer_flush_seconds",
+    "Latency of write-behind _bulk flushes",
+)
+BUFFER_QUEUE_DEPTH = gauge(
+    "ingestor_buffer_queue_depth",
+    "Documents waiting in the write-behind buffer",
+)
+
+
+class _PendingDoc:
+    __slots__ = ("header", "source", "future")
+
+    def __init__(self, header: bytes, source: bytes, future: asyncio.Future):
+        self.header = header
+        self.source = source
+        self.future = future
+
+    @property
+    def size(self) -> int:
+        return len(self.header) + len(self.source) + 2
+
+
+class WriteBehindBuffer:
+    """
+    Per-worker group commit for single-document ingest.
+
+    Concurrent ``submit`` calls are gathered into one ``_bulk`` request which
+    is flushed once ``max_docs``, ``max_bytes`` or ``max_latency_ms`` is hit.
+    Each caller waits for and receives its own item result.
+    """
+
+    def __init__(
+        self,
+        max_docs: int,
+        max_bytes: int,
+        max_latency_ms: int,
+        max_queue: int,
+    ):
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency_ms / 1000
+        self.max_queue = max_queue
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._closing
+
+    async def start(self) -> None:
+        if self.is_running:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+        logger.info("✓ Ingestor write-behind buffer started")
+
+    async def submit(self, log_data: dict, index_name: str, routing: str | None = None) -> dict:
+        if not self.is_running:
+            raise RuntimeError("Write-behind buffer is not running")
+
+        doc_id = log_data.pop("_id", None)
+        meta = {"_index": index_name}
+        if doc_id is not None:
+            meta["_id"] = doc_id
+        if routing is not None:
+            meta["routing"] = routing
+
+        future = asyncio.get_running_loop().create_future()
+        # Waits here when the queue is full, pushing back on producers.
+        await self._queue.put(
+            _PendingDoc(orjson.dumps({"index": meta}), orjson.dumps(log_data), future)
+        )
+        BUFFER_QUEUE_DEPTH.set(self._queue.qsize())
+        if self._task is None or self._task.done():
+            # Queued after close() failed what was left behind the sentinel.
+            self._fail(future)
+        return await future
+
+    @staticmethod
+    def _fail(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_exception(RuntimeError("Write-behind buffer is closed"))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            batch_bytes = item.size
+            deadline = loop.time() + self.max_latency
+            stop = False
+
+            while len(batch) < self.max_docs and batch_bytes < self.max_bytes:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                batch_bytes += item.size
+
+            BUFFER_QUEUE_DEPTH.set(self._queue.qsize())
+            await self._flush(batch)
+            if stop:
+                return
+
+    async def _flush(self, batch: list[_PendingDoc]) -> None:
+        operations = []
+        for item in batch:
+            operations.append(item.header)
+            operations.append(item.source)
+
+        started = time.perf_counter()
+        try:
+            client = await es_manager.get_write_client()
+            response = await client.bulk(operations=operations)
+        except Exception as e:
+            logger.exception("write-behind flush failed", extra={"data": str(e)})
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        finally:
+            BUFFER_FLUSH_DOCS.observe(len(batch))
+            BUFFER_FLUSH_SECONDS.observe(time.perf_counter() - started)
+
+        for item, result in zip(batch, response["items"]):
+            if item.future.done():
+                continue
+            info = result["index"]
+            error = info.get("error")
+            if error:
+                item.future.set_exception(
+                    BulkItemError(info.get("_id"), info.get("status", 500), error.get("reason") or str(error))
+                )
+            else:
+                item.future.set_result(info)
+
+    async def close(self) -> None:
+        """Drain every queued document before the worker shuts down."""
+        if not self.is_running:
+            return
+        # New submits are refused from here on: nothing would flush them
+        # once they are queued behind the sentinel.
+        self._closing = True
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                self._fail(item.future)
+        BUFFER_QUEUE_DEPTH.set(0)
+        logger.info("✓ Ingestor write-behind buffer drained")
+
+
+ingest_buffer = WriteBehindBuffer(
+    max_docs=IngestorConfig.INGESTOR_BUFFER_MAX_DOCS,
+    max_bytes=IngestorConfig.INGESTOR_BUFFER_MAX_BYTES,
+    max_latency_ms=IngestorConfig.INGESTOR_BUFFER_MAX_LATENCY_MS,
+    max_queue=IngestorConfig.INGESTOR_BUFFER_MAX_QUEUE,
+)
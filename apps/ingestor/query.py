@@ -1,5 +1,20 @@
-from elasticsearch import AsyncElasticsearch, helpers
+import asyncio
+import uuid
+from typing import AsyncIterable, AsyncIterator, Iterable
 
+import orjson
+from elasticsearch import AsyncElasticsearch, ConnectionError, ConnectionTimeout
+
+from apps.analytic.sync import ClaimFlowSync
+from apps.ingestor.buffer import WriteBehindBuffer
+from apps.ingestor.spool import Spool
+from apps.ingestor.streaming import iter_ndjson_lines
+from config.settings.integrations_config import IngestorConfig
+from config.settings.services.elk import es_manager
+from config.settings.services.metrics import counter
+from shared.bulk import BulkEngine, BulkEntry, iter_actions, with_doc_id
+from shared.enums import ElkClientTypeChoices
+from shared.routing import RoutingRules
 from .api.v1.schemas import (
     BulkInsertSchema,
     ErrorDetailSchema,
@@ -8,55 +23,311 @@ from .api.v1.schemas import (
 )
 
 
+UNROUTED_DOCUMENTS = counter(
+    "ingest_unrouted_documents_total",
+    "Documents of a routed index stored with default routing for lack of the routing key",
+    labelnames=("index",),
+)
+
+# Errors after which a write may be retried later: the cluster was not
+# reached, or did not answer in time.
+WRITE_UNAVAILABLE_ERRORS = (ConnectionError, ConnectionTimeout)
+
+_END = object()
+
+
+class _UnackedActions:
+    """
+    Action source for ``BulkEngine`` that remembers every entry it hands
+    out until its bulk item result arrives, so that after a connection
+    failure the unanswered entries and the rest of the source can still be
+    spooled. Pulls from the source are shielded: cancelling the engine
+    never loses a document that was being read.
+    """
+
+    def __init__(self, actions: Iterable | AsyncIterable):
+        self._source = iter_actions(actions).__aiter__()
+        self._next: asyncio.Future | None = None
+        self.entries: dict[str, BulkEntry] = {}
+
+    async def _pull(self):
+        if self._next is None:
+            self._next = asyncio.ensure_future(anext(self._source, _END))
+        action = await asyncio.shield(self._next)
+        self._next = None
+        return action
+
+    async def __aiter__(self) -> AsyncIterator[BulkEntry]:
+        while (action := await self._pull()) is not _END:
+            entry = with_doc_id(action)
+            self.entries[entry.meta["_id"]] = entry
+            yield entry
+
+    def acknowledge(self, doc_id: str | None) -> None:
+        self.entries.pop(doc_id, None)
+
+    async def remaining(self) -> AsyncIterator[BulkEntry]:
+        """Unanswered entries first, then the rest of the source."""
+        for entry in list(self.entries.values()):
+            yield entry
+        self.entries.clear()
+        while (action := await self._pull()) is not _END:
+            yield with_doc_id(action)
+
+
 class IngestorElkQry:
-    def __init__(self, db: AsyncElasticsearch):
+    SPOOL_BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        db: AsyncElasticsearch | None,
+        buffer: WriteBehindBuffer | None = None,
+        spool: Spool | None = None,
+        flow_sync: ClaimFlowSync | None = None,
+        routing: RoutingRules | None = None,
+    ):
         self.db = db
+        self.buffer = buffer
+        self.spool = spool
+        self.flow_sync = flow_sync
+        self.routing = routing
+
+    @property
+    def syncs_flows(self) -> bool:
+        return self.flow_sync is not None and self.flow_sync.enabled
+
+    @property
+    def can_spool(self) -> bool:
+        return self.spool is not None and self.spool.is_open
+
+    @property
+    def is_spooling(self) -> bool:
+        """
+        New writes go to the spool while the write client is down (``db`` is
+        None) and while it still holds a backlog: writing around the backlog
+        would let its replay overwrite newer versions of the same documents.
+        Ordering is kept per worker, each of which replays its own spool.
+        """
+        return self.can_spool and (self.db is None or self.spool.pending_records > 0)
 
     async def insert_doc(self, log_data: dict, index_name: str) -> SingleInsertSchema:
+        if self.is_spooling:
+            return await self._spool_doc(log_data, index_name)
 
-        index_params = {
-            "index": index_name,
-            "document": log_data,
-            "id": log_data.pop("_id", None)
-        }
+        flow_source = (
+            self.flow_sync.source_of({"_index": index_name, "_source": log_data})
+            if self.syncs_flows
+            else None
+        )
+
+        routing = self._routing_for(index_name, log_data)
+        if self.can_spool and log_data.get("_id") is None:
+            # A spooled retry of a write that did land must replace it.
+            log_data["_id"] = uuid.uuid4().hex
+        doc_id = log_data.get("_id")
+        try:
+            if self.buffer is not None and self.buffer.is_running:
+                response = await self.buffer.submit(log_data, index_name, routing)
+            else:
+                response = (await self.db.index(
+                    index=index_name,
+                    document=log_data,
+                    id=log_data.pop("_id", None),
+                    routing=routing,
+                )).body
+        except WRITE_UNAVAILABLE_ERRORS as e:
+            if not self.can_spool:
+                raise
+            es_manager.record_failure(ElkClientTypeChoices.WRITE, e)
+            if doc_id is not None:
+                log_data["_id"] = doc_id
+            return await self._spool_doc(log_data, index_name)
 
-        response = await self.db.index(**index_params)
-        return SingleInsertSchema(success=True, **response.body)
+        if flow_source is not None:
+            await self.flow_sync.indexed(self.db, [(response["_id"], flow_source)])
+        return SingleInsertSchema(success=True, **response)
+
+    async def _spool_doc(self, log_data: dict, index_name: str) -> SingleInsertSchema:
+        entry = with_doc_id(self._build_action(log_data, index_name))
+        await self.spool.append([entry])
+        return SingleInsertSchema(
+            success=True,
+            _id=entry.meta["_id"],
+            _index=index_name,
+            _version=0,
+            result="spooled",
+        )
 
     async def bulk_insert_docs(
-        self, logs_data: list[dict], index_name: str, batch_size: int = 1000
+        self,
+        logs_data: list[dict] | AsyncIterable[dict],
+        index_name: str,
+        errors: list[dict] | None = None,
     ) -> BulkInsertSchema:
-        actions = (
-            {
-                "_op_type": "index",
-                "_index": index_name,
-                "_source": doc,
-                "_id": doc.pop("_id", None),
-            }
-            for doc in logs_data
-        )
+        if isinstance(logs_data, list):
+            actions = (self._build_action(doc, index_name) for doc in logs_data)
+        else:
+            actions = (self._build_action(doc, index_name) async for doc in logs_data)
 
-        summary = {"inserted": 0, "failed": 0}
-        errors = []
+        return await self._bulk_insert_actions(actions, errors)
 
-        async for ok, info in helpers.async_streaming_bulk(
-            client=self.db,
-            actions=actions,
-            chunk_size=batch_size,
-            raise_on_error=False,
-        ):
-            if ok:
-                summary["inserted"] += 1
-            else:
-                summary["failed"] += 1
-                errors.append(self._extract_error_info(info))
+    async def _bulk_insert_actions(
+        self,
+        actions: Iterable[dict] | AsyncIterable[dict | BulkEntry],
+        errors: list[dict] | None = None,
+    ) -> BulkInsertSchema:
+        summary = {"inserted": 0, "failed": 0, "spooled": 0}
+        errors = errors if errors is not None else []
+
+        if self.is_spooling:
+            summary["spooled"] = await self._spool_actions(actions)
+        else:
+            flow_sources = {}
+            indexed_flows = []
+            if self.syncs_flows:
+                actions = self._track_flow_sources(actions, flow_sources)
+            unacked = _UnackedActions(actions) if self.can_spool else None
+            try:
+                async for ok, info in BulkEngine(self.db).stream(unacked or actions):
+                    doc_id = next(iter(info.values())).get("_id")
+                    if unacked is not None:
+                        unacked.acknowledge(doc_id)
+                    if ok:
+                        summary["inserted"] += 1
+                        if doc_id in flow_sources:
+                            indexed_flows.append((doc_id, flow_sources.pop(doc_id)))
+                    else:
+                        errors.append(self._extract_error_info(info))
+            except WRITE_UNAVAILABLE_ERRORS as e:
+                if unacked is None:
+                    raise
+                # Unanswered chunks may have landed; their ids make the replay idempotent.
+                es_manager.record_failure(ElkClientTypeChoices.WRITE, e)
+                summary["spooled"] = await self._spool_actions(unacked.remaining())
+            finally:
+                # Also after a failure: part of the documents may be indexed.
+                if indexed_flows:
+                    await self.flow_sync.indexed(self.db, indexed_flows)
 
+        # Includes items rejected before reaching Elasticsearch.
+        summary["failed"] = len(errors)
         return BulkInsertSchema(
             success=summary["failed"] == 0,
             summary=InsertSummarySchema(**summary),
             errors=[ErrorDetailSchema(**err) for err in errors]
         )
 
+    async def bulk_insert_ndjson(
+        self, chunks: AsyncIterator[bytes], index_name: str, passthrough: bool = False
+    ) -> BulkInsertSchema:
+        """
+        Index an NDJSON byte stream while it is still being received.
+
+        Lines that are not JSON objects are reported as failed items instead
+        of aborting the documents that were already indexed.
+
+        With ``passthrough`` the original line bytes become the _bulk source
+        line as-is; only lines mentioning ``_id`` are decoded, to move it
+        into the action metadata.
+        """
+        errors = []
+
+        if passthrough:
+            return await self._bulk_insert_actions(
+                self._raw_entries(chunks, index_name, errors), errors
+            )
+
+        async def docs():
+            line_number = 0
+            async for line in iter_ndjson_lines(
+                chunks, IngestorConfig.INGESTOR_NDJSON_MAX_LINE_BYTES
+            ):
+                line_number += 1
+                try:
+                    doc = orjson.loads(line)
+                except orjson.JSONDecodeError as e:
+                    errors.append({"id": None, "reason": f"line {line_number}: invalid JSON ({e})"})
+                    continue
+                if not isinstance(doc, dict):
+                    errors.append({"id": None, "reason": f"line {line_number}: expected a JSON object"})
+                    continue
+                yield doc
+
+        return await self.bulk_insert_docs(docs(), index_name, errors=errors)
+
+    async def _raw_entries(
+        self, chunks: AsyncIterator[bytes], index_name: str, errors: list[dict]
+    ) -> AsyncIterator[dict | BulkEntry]:
+        meta = {"_index": index_name}
+        header = orjson.dumps({"index": meta})
+        # Routed documents are decoded to read their routing key.
+        routed = self.routing is not None and self.routing.field_for(index_name) is not None
+        line_number = 0
+
+        async for line in iter_ndjson_lines(
+            chunks, IngestorConfig.INGESTOR_NDJSON_MAX_LINE_BYTES
+        ):
+            line_number += 1
+            if not (line.startswith(b"{") and line.endswith(b"}")):
+                errors.append({"id": None, "reason": f"line {line_number}: expected a JSON object"})
+                continue
+
+            if not routed and b'"_id"' not in line:
+                yield BulkEntry("index", meta, header, line)
+                continue
+
+            try:
+                doc = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                errors.append({"id": None, "reason": f"line {line_number}: invalid JSON ({e})"})
+                continue
+            yield self._build_action(doc, index_name)
+
+    async def _track_flow_sources(
+        self, actions, flow_sources: dict[str, dict]
+    ) -> AsyncIterator[dict | BulkEntry]:
+        """
+        Record the source of every claim flow document by ``_id``, assigning
+        ids where missing: bulk results arrive out of order and carry only ids.
+        """
+        async for action in iter_actions(actions):
+            source = self.flow_sync.source_of(action)
+            if source is not None:
+                action = with_doc_id(action)
+                flow_sources[action.meta["_id"]] = source
+            yield action
+
+    async def _spool_actions(self, actions) -> int:
+        spooled = 0
+        batch = []
+        async for action in iter_actions(actions):
+            batch.append(with_doc_id(action))
+            if len(batch) >= self.SPOOL_BATCH_SIZE:
+                await self.spool.append(batch)
+                spooled += len(batch)
+                batch = []
+        if batch:
+            await self.spool.append(batch)
+            spooled += len(batch)
+        return spooled
+
+    def _routing_for(self, index_name: str, doc: dict) -> str | None:
+        if self.routing is None:
+            return None
+        routing = self.routing.routing_for(index_name, doc)
+        if routing is None and self.routing.field_for(index_name):
+            UNROUTED_DOCUMENTS.labels(index_name).inc()
+        return routing
+
+    def _build_action(self, doc: dict, index_name: str) -> dict:
+        return {
+            "_op_type": "index",
+            "_index": index_name,
+            "_source": doc,
+            "_id": doc.pop("_id", None),
+            "_routing": self._routing_for(index_name, doc),
+        }
+
     @staticmethod
     def _extract_error_info(info: dict) -> dict:
         failed_doc = info.get("index", {})
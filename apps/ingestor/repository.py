@@ -1,3 +1,5 @@
+from typing import AsyncIterator
+
 from apps.ingestor.query import IngestorElkQry
 from .api.v1.schemas import BulkInsertSchema, SingleInsertSchema
 
@@ -17,3 +19,9 @@ class IngestorRepo:
     ) -> BulkInsertSchema:
         res = await self.elk_qry.bulk_insert_docs(logs_data, index_name)
         return res
+
+    async def bulk_insert_ndjson(
+        self, chunks: AsyncIterator[bytes], index_name: str, passthrough: bool = False
+    ) -> BulkInsertSchema:
+        res = await self.elk_qry.bulk_insert_ndjson(chunks, index_name, passthrough)
+        return res
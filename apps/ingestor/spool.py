@@ -0,0 +1,447 @@
+import asyncio
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+
+import orjson
+
+from apps.analytic.sync import ClaimFlowSync, claim_flow_sync
+from config.settings.integrations_config import IngestorConfig
+from config.settings.services.elk import es_manager
+from config.settings.services.metrics import counter, gauge
+from shared.bulk import BulkEngine, BulkEntry, is_rejected_item
+from shared.enums import ElkClientTypeChoices, SpoolFsyncChoices
+from shared.exceptions import IngestOverloadedError, SpoolFullError
+
+logger = logging.getLogger(__name__)
+
+
+SPOOL_LAG_RECORDS = gauge(
+    "ingestor_spool_lag_records",
+    "Spooled documents not yet replayed to Elasticsearch",
+)
+SPOOL_LAG_BYTES = gauge(
+    "ingestor_spool_lag_bytes",
+    "Spooled bytes not yet replayed to Elasticsearch",
+)
+SPOOL_REPLAYED = counter(
+    "ingestor_spool_replayed_total",
+    "Spooled documents replayed to Elasticsearch",
+)
+SPOOL_DROPPED = counter(
+    "ingestor_spool_dropped_total",
+    "Spooled documents permanently rejected by Elasticsearch during replay",
+)
+
+# Record framing: payload length, crc32 of payload, then the payload
+# itself (the _bulk header line, a newline and the source line).
+_RECORD_HEADER = struct.Struct("<II")
+_SEGMENT_SUFFIX = ".log"
+
+
+def _segment_name(sequence: int) -> str:
+    return f"{sequence:012d}{_SEGMENT_SUFFIX}"
+
+
+def _encode(entry: BulkEntry) -> bytes:
+    payload = entry.header + b"\n" + entry.body
+    return _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _decode(payload: bytes) -> BulkEntry:
+    header, _, body = payload.partition(b"\n")
+    op_type, meta = next(iter(orjson.loads(header).items()))
+    return BulkEntry(op_type, meta, header, body)
+
+
+def _iter_records(data, position: int):
+    """Yield ``(payload, end)`` for every intact record from ``position``."""
+    size = len(data)
+    while position + _RECORD_HEADER.size <= size:
+        length, checksum = _RECORD_HEADER.unpack_from(data, position)
+        start = position + _RECORD_HEADER.size
+        end = start + length
+        if end > size:
+            return
+        payload = bytes(data[start:end])
+        if zlib.crc32(payload) != checksum:
+            return
+        yield payload, end
+        position = end
+
+
+class Spool:
+    """
+    Append-only, segmented write-ahead log for ingest during outages.
+
+    Each worker claims its own slot directory with a file lock, so a
+    restarted worker picks up and replays whatever a previous one left.
+    The replay offset is persisted atomically; records are only dropped
+    once the bulk request carrying them has completed, so replay is
+    at-least-once. Every spooled document gets an ``_id`` to keep replays
+    idempotent.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int,
+        max_bytes: int,
+        fsync_policy: SpoolFsyncChoices,
+        fsync_interval_ms: int,
+    ):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval_ms / 1000
+
+        self.slot: Path | None = None
+        self._lock_file = None
+        self._active = None
+        self._active_sequence = 0
+        self._active_size = 0
+        self._dirty = False
+        self._fsync_task: asyncio.Task | None = None
+
+        self._offset = (0, 0)
+        self._segments: dict[int, int] = {}
+        self.pending_records = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self._active is not None
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._segments.values())
+
+    @property
+    def lag_bytes(self) -> int:
+        sequence, position = self._offset
+        return sum(
+            size - (position if seq == sequence else 0)
+            for seq, size in self._segments.items()
+            if seq >= sequence
+        )
+
+    def open(self) -> None:
+        if self.is_open:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._claim_slot()
+        self._load_offset()
+
+        sequences = sorted(
+            int(path.stem) for path in self.slot.glob(f"*{_SEGMENT_SUFFIX}")
+        )
+        for sequence in sequences:
+            if sequence < self._offset[0]:
+                (self.slot / _segment_name(sequence)).unlink()
+            else:
+                self._segments[sequence] = (self.slot / _segment_name(sequence)).stat().st_size
+
+        self._active_sequence = max(self._segments, default=self._offset[0])
+        self._repair_tail()
+        self._open_active()
+        self.pending_records = self._count_pending()
+        self._update_gauges()
+
+        if self.fsync_policy == SpoolFsyncChoices.INTERVAL:
+            self._fsync_task = asyncio.create_task(self._fsync_loop())
+
+        logger.info(
+            f"✓ Ingest spool opened at {self.slot} "
+            f"({self.pending_records} records pending replay)"
+        )
+
+    def _claim_slot(self) -> None:
+        number = 0
+        while True:
+            slot = self.directory / f"worker-{number}"
+            slot.mkdir(exist_ok=True)
+            lock_file = open(slot / "lock", "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                number += 1
+                continue
+            self.slot = slot
+            self._lock_file = lock_file
+            return
+
+    def _load_offset(self) -> None:
+        path = self.slot / "offset"
+        if path.exists():
+            data = orjson.loads(path.read_bytes())
+            self._offset = (data["segment"], data["position"])
+
+    def _repair_tail(self) -> None:
+        """Truncate a record torn by a crash in the middle of an append."""
+        path = self.slot / _segment_name(self._active_sequence)
+        if not path.exists() or path.stat().st_size == 0:
+            return
+        with open(path, "r+b") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                valid = 0
+                for _, end in _iter_records(data, 0):
+                    valid = end
+            if valid != self._segments[self._active_sequence]:
+                logger.warning(f"Truncating torn spool record in {path} at byte {valid}")
+                f.truncate(valid)
+                self._segments[self._active_sequence] = valid
+
+    def _open_active(self) -> None:
+        path = self.slot / _segment_name(self._active_sequence)
+        # Unbuffered so the replayer's mmap sees appended records at once.
+        self._active = open(path, "ab", buffering=0)
+        self._active_size = self._active.tell()
+        self._segments[self._active_sequence] = self._active_size
+
+    def _count_pending(self) -> int:
+        count = 0
+        sequence, position = self._offset
+        for seq in sorted(self._segments):
+            if seq < sequence:
+                continue
+            with self._map(seq) as data:
+                count += sum(1 for _ in _iter_records(data, position if seq == sequence else 0))
+        return count
+
+    def _map(self, sequence: int):
+        size = self._segments.get(sequence, 0)
+        if size == 0:
+            return _EmptyMap()
+        with open(self.slot / _segment_name(sequence), "rb") as f:
+            return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+
+    async def append(self, entries: list[BulkEntry]) -> None:
+        if not self.is_open:
+            raise RuntimeError("Ingest spool is not open")
+
+        records = b"".join(_encode(entry) for entry in entries)
+        if self.total_bytes + len(records) > self.max_bytes:
+            raise SpoolFullError(self.max_bytes)
+
+        if self._active_size and self._active_size + len(records) > self.segment_bytes:
+            self._roll_segment()
+
+        # A single write keeps the batch contiguous; no await happens
+        # between the size checks and the write.
+        self._active.write(records)
+        self._active_size += len(records)
+        self._segments[self._active_sequence] = self._active_size
+        self.pending_records += len(entries)
+        self._update_gauges()
+
+        if self.fsync_policy == SpoolFsyncChoices.ALWAYS:
+            await asyncio.to_thread(os.fsync, self._active.fileno())
+        else:
+            self._dirty = True
+
+    def _roll_segment(self) -> None:
+        os.fsync(self._active.fileno())
+        self._active.close()
+        self._active_sequence += 1
+        self._open_active()
+
+    async def _fsync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            if self._dirty and self._active is not None:
+                self._dirty = False
+                fsync = asyncio.ensure_future(asyncio.to_thread(os.fsync, self._active.fileno()))
+                try:
+                    await asyncio.shield(fsync)
+                except asyncio.CancelledError:
+                    # close() must not close the file under a running fsync.
+                    await fsync
+                    raise
+
+    def read(self, max_records: int) -> tuple[list[BulkEntry], tuple[int, int]]:
+        """Return up to ``max_records`` entries after the committed offset and the offset after them."""
+        entries = []
+        sequence, position = self._offset
+
+        while len(entries) < max_records and sequence in self._segments:
+            with self._map(sequence) as data:
+                for payload, end in _iter_records(data, position):
+                    entries.append(_decode(payload))
+                    position = end
+                    if len(entries) >= max_records:
+                        break
+            if len(entries) >= max_records or sequence >= self._active_sequence:
+                break
+            sequence, position = sequence + 1, 0
+
+        return entries, (sequence, position)
+
+    def commit(self, offset: tuple[int, int], records: int) -> None:
+        path = self.slot / "offset"
+        tmp = self.slot / "offset.tmp"
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps({"segment": offset[0], "position": offset[1]}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        dir_fd = os.open(self.slot, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+        self._offset = offset
+        self.pending_records -= records
+        for sequence in [seq for seq in self._segments if seq < offset[0]]:
+            (self.slot / _segment_name(sequence)).unlink(missing_ok=True)
+            del self._segments[sequence]
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        SPOOL_LAG_RECORDS.set(self.pending_records)
+        SPOOL_LAG_BYTES.set(self.lag_bytes)
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.is_open,
+            "slot": str(self.slot) if self.slot else None,
+            "lag_records": self.pending_records,
+            "lag_bytes": self.lag_bytes if self.is_open else 0,
+            "disk_bytes": self.total_bytes,
+            "disk_budget_bytes": self.max_bytes,
+            "segments": len(self._segments),
+            "replay_offset": {"segment": self._offset[0], "position": self._offset[1]},
+            "fsync_policy": self.fsync_policy.value,
+        }
+
+    async def close(self) -> None:
+        if not self.is_open:
+            return
+        if self._fsync_task:
+            self._fsync_task.cancel()
+            try:
+                await self._fsync_task
+            except asyncio.CancelledError:
+                pass
+            self._fsync_task = None
+        os.fsync(self._active.fileno())
+        self._active.close()
+        self._active = None
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+        logger.info("✓ Ingest spool closed")
+
+
+class _EmptyMap:
+    def __enter__(self):
+        return b""
+
+    def __exit__(self, *args):
+        return False
+
+
+class SpoolReplayer:
+    """Drains the spool into Elasticsearch whenever the write client is healthy."""
+
+    def __init__(
+        self,
+        spool: Spool,
+        batch_size: int,
+        interval_ms: int,
+        flow_sync: ClaimFlowSync | None = None,
+    ):
+        self.spool = spool
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        self.flow_sync = flow_sync
+        self.last_error: str | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            while (
+                self.spool.pending_records > 0
+                and es_manager.is_available(ElkClientTypeChoices.WRITE)
+            ):
+                try:
+                    if not await self.replay_once():
+                        break
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.warning(f"Spool replay paused: {e}")
+                    break
+
+    async def replay_once(self) -> bool:
+        entries, offset = self.spool.read(self.batch_size)
+        if not entries:
+            return False
+
+        client = await es_manager.get_write_client()
+        replayed = dropped = 0
+        flow_sources = {}
+        if self.flow_sync is not None and self.flow_sync.enabled:
+            for entry in entries:
+                source = self.flow_sync.source_of(entry)
+                if source is not None:
+                    flow_sources[entry.meta["_id"]] = source
+        indexed_flows = []
+        try:
+            async for ok, item in BulkEngine(client).stream(entries):
+                info = next(iter(item.values()))
+                if ok:
+                    replayed += 1
+                    if info.get("_id") in flow_sources:
+                        indexed_flows.append((info["_id"], flow_sources[info["_id"]]))
+                elif is_rejected_item(info.get("status"), info.get("error")):
+                    # Still rejected after retries: keep the batch for later.
+                    self.last_error = "bulk items rejected with 429"
+                    return False
+                else:
+                    dropped += 1
+                    logger.error(
+                        "Dropping spooled document rejected by Elasticsearch",
+                        extra={"data": info},
+                    )
+        except IngestOverloadedError:
+            return False
+
+        self.spool.commit(offset, len(entries))
+        if indexed_flows:
+            await self.flow_sync.indexed(client, indexed_flows)
+        SPOOL_REPLAYED.inc(replayed)
+        SPOOL_DROPPED.inc(dropped)
+        self.last_error = None
+        return True
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+ingest_spool = Spool(
+    directory=IngestorConfig.INGESTOR_SPOOL_DIR,
+    segment_bytes=IngestorConfig.INGESTOR_SPOOL_SEGMENT_BYTES,
+    max_bytes=IngestorConfig.INGESTOR_SPOOL_MAX_BYTES,
+    fsync_policy=IngestorConfig.INGESTOR_SPOOL_FSYNC,
+    fsync_interval_ms=IngestorConfig.INGESTOR_SPOOL_FSYNC_INTERVAL_MS,
+)
+spool_replayer = SpoolReplayer(
+    ingest_spool,
+    batch_size=IngestorConfig.INGESTOR_SPOOL_REPLAY_BATCH,
+    interval_ms=IngestorConfig.INGESTOR_SPOOL_REPLAY_INTERVAL_MS,
+    flow_sync=claim_flow_sync,
+)
@@ -0,0 +1,37 @@
+from typing import AsyncIterator
+
+from shared.exceptions import NdjsonLineTooLongError
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int
+) -> AsyncIterator[bytes]:
+    """
+    Split a byte stream into non-empty NDJSON lines as the chunks arrive.
+
+    Only the current partial line is retained, so memory stays bounded by
+    ``max_line_bytes`` plus one transport chunk, whatever the payload size.
+    """
+    buffer = bytearray()
+    line_number = 0
+
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end == -1:
+                break
+            line_number += 1
+            line = bytes(buffer[start:end]).strip()
+            start = end + 1
+            if line:
+                yield line
+        del buffer[:start]
+
+        if len(buffer) > max_line_bytes:
+            raise NdjsonLineTooLongError(line_number + 1, max_line_bytes)
+
+    line = bytes(buffer).strip()
+    if line:
+        yield line
@@ -1,12 +1,24 @@
-from typing import Annotated, Any, Dict
+from typing import Annotated, Any, AsyncIterator, Dict
+
+import orjson
 from elasticsearch import AsyncElasticsearch, BadRequestError
 from fastapi import Body, Depends, APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 
+from apps.journey.cache import journey_count_cache, journey_doc_cache, journey_search_cache
 from apps.journey.query import ElasticSearchQry
 from apps.journey.repository import JourneyRepo
+from config.settings.integrations_config import JourneyConfig
 from config.settings.services.elk import get_read_es_client, get_write_es_client
 from config.settings.services.log import setup_logging
-from .schemas import DynamicDoc, ESResponse, InsertResultSchema, JourneyQuerySchema, PaginatedResponse, UpdateInputSchema, UpdateResultSchema
+from shared.enums import PaginationModeChoices, SearchModeChoices, SuggestFieldChoices, TotalHitsChoices
+from shared.exceptions import (
+    CursorExpiredError,
+    IngestOverloadedError,
+    InvalidCursorError,
+    ResultWindowExceededError,
+)
+from .schemas import BulkUpdateItemSchema, CountRequestSchema, CountResponseSchema, DynamicDoc, ESResponse, ExportRequestSchema, GetManyRequestSchema, GetManyResponseSchema, InsertResultSchema, JourneyQuerySchema, PaginatedResponse, SuggestResponseSchema, UpdateInputSchema, UpdateResultSchema
 
 logger = setup_logging()
 
@@ -22,10 +34,20 @@ v1_router = APIRouter(
 
 __all__ = ["v1_router"]
 
-index_name = "journey_v3"
+index_name = JourneyConfig.JOURNEY_INDEX_NAME
 historical_index_name = "historical_journey_v1"
 
 
+def journey_query(db: AsyncElasticsearch) -> ElasticSearchQry:
+    return ElasticSearchQry(
+        db=db,
+        index_name=index_name,
+        doc_cache=journey_doc_cache,
+        search_cache=journey_search_cache,
+        count_cache=journey_count_cache,
+    )
+
+
 @v1_router.get(
     "/get_by_id",
     response_model=DynamicDoc | None,
@@ -37,7 +59,7 @@ async def get_by_id(
     db: AsyncElasticsearch = Depends(get_read_es_client)
 ) -> DynamicDoc | None:
     try:
-        repo = JourneyRepo(ElasticSearchQry(db=db, index_name=index_name))
+        repo = JourneyRepo(journey_query(db))
         result = await repo.get_journey_by_id(id)
         if result:
             return DynamicDoc(id=result["_id"], source=result["_source"])
@@ -51,6 +73,38 @@ async def get_by_id(
         )
 
 
+@v1_router.post(
+    "/get-many",
+    response_model=GetManyResponseSchema,
+    summary="Get many doc entries",
+    description=(
+        "Fetch journeys by id with one mget. `docs` follows the order of `ids`, "
+        "with null for every id listed in `missing`."
+    ),
+)
+async def get_many(
+    input: GetManyRequestSchema,
+    db: AsyncElasticsearch = Depends(get_read_es_client)
+) -> GetManyResponseSchema:
+    try:
+        repo = JourneyRepo(journey_query(db))
+        results = await repo.get_journeys_by_ids(input.ids)
+        return GetManyResponseSchema(
+            docs=[
+                DynamicDoc(id=result["_id"], source=result["_source"]) if result else None
+                for result in results
+            ],
+            missing=[id for id, result in zip(input.ids, results) if result is None],
+        )
+
+    except Exception as e:
+        logger.exception("error get docs", extra={"data": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal error occurred while fetching entries",
+        )
+
+
 @v1_router.post(
     "/save",
     response_model=InsertResultSchema,
@@ -62,7 +116,7 @@ async def save(
     db: AsyncElasticsearch = Depends(get_write_es_client)
 ) -> InsertResultSchema:
     try:
-        repo = JourneyRepo(ElasticSearchQry(db=db, index_name=index_name))
+        repo = JourneyRepo(journey_query(db))
         result = await repo.save_journey(input)
         return result
 
@@ -93,7 +147,7 @@ async def update(
     db: AsyncElasticsearch = Depends(get_write_es_client)
 ) -> UpdateResultSchema:
     try:
-        repo = JourneyRepo(ElasticSearchQry(db=db, index_name=index_name))
+        repo = JourneyRepo(journey_query(db))
         result = await repo.update_journey(id, input)
         return result
 
@@ -112,6 +166,51 @@ async def update(
         )
 
 
+@v1_router.patch(
+    "/bulk-update",
+    response_model=UpdateResultSchema,
+    summary="Bulk update doc entries",
+    description=(
+        "Partially update many journeys, each with its own history snapshot. "
+        "Current versions are read with one mget; snapshots and updates are "
+        "sent in chunked _bulk requests. Failed ids are listed in `errors`."
+    ),
+)
+async def bulk_update(
+    inputs: Annotated[list[BulkUpdateItemSchema], Body(
+        title="body string",
+        description="id, data and meta of every journey to update",
+        max_length=JourneyConfig.JOURNEY_BULK_UPDATE_MAX_ITEMS,
+    )],
+    db: AsyncElasticsearch = Depends(get_write_es_client)
+) -> UpdateResultSchema:
+    try:
+        repo = JourneyRepo(journey_query(db))
+        result = await repo.update_journeys(inputs)
+        return result
+
+    except IngestOverloadedError as e:
+        logger.warning("bulk update overloaded", extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except BadRequestError as e:
+        logger.warning("Bad request while updating docs",
+                       extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid document format or field type: {e.error}"
+        )
+    except Exception as e:
+        logger.exception("Unexpected error", extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected internal server error"
+        )
+
+
 @v1_router.post(
     "/bulk-save",
     response_model=InsertResultSchema,
@@ -123,10 +222,17 @@ async def bulk_save(
     db: AsyncElasticsearch = Depends(get_write_es_client)
 ) -> InsertResultSchema:
     try:
-        repo = JourneyRepo(ElasticSearchQry(db=db, index_name=index_name))
+        repo = JourneyRepo(journey_query(db))
         result = await repo.save_journeys(inputs)
         return result
 
+    except IngestOverloadedError as e:
+        logger.warning("bulk save overloaded", extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except BadRequestError as e:
         logger.warning("Bad request while inserting doc",
                        extra={"error": str(e)})
@@ -146,13 +252,17 @@ async def bulk_save(
     "/all",
     response_model=ESResponse,
     summary="Bulk create doc entries",
-    description="Insert multiple log documents into Elasticsearch in bulk",
+    description=(
+        "Returns only the first page of the default search size. "
+        "Deprecated: use POST /export to read every journey."
+    ),
+    deprecated=True,
 )
 async def all(
     db: AsyncElasticsearch = Depends(get_read_es_client)
 ) -> ESResponse:
     try:
-        repo = JourneyRepo(ElasticSearchQry(db=db, index_name=index_name))
+        repo = JourneyRepo(journey_query(db))
         result = await repo.all_journeys()
         return result
 
@@ -171,6 +281,64 @@ async def all(
         )
 
 
+async def _encode_export(first_page: list[dict] | None, pages: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    """One NDJSON line per journey: its ``_id`` followed by its source fields."""
+    page = first_page
+    try:
+        while page is not None:
+            yield b"".join(
+                orjson.dumps({"_id": hit["_id"], **hit.get("_source", {})}, option=orjson.OPT_APPEND_NEWLINE)
+                for hit in page
+            )
+            page = await anext(pages, None)
+    except Exception as e:
+        # Headers are already sent: the body is cut short.
+        logger.exception("Error streaming journey export", extra={"error": str(e)})
+        raise
+    finally:
+        await pages.aclose()
+
+
+@v1_router.post(
+    "/export",
+    summary="Export journeys as NDJSON",
+    description=(
+        "Stream every journey matching the optional query as NDJSON, one "
+        "`{\"_id\": ..., <source fields>}` line each, in no particular order. "
+        "The index is read from one point in time by concurrent sliced "
+        "searches, which pause while the client is slow to read."
+    ),
+    responses={status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}}},
+)
+async def export(
+    body: ExportRequestSchema = Body(default_factory=ExportRequestSchema),
+    slices: Annotated[int, Query(
+        description="Concurrent slices", ge=1, le=JourneyConfig.JOURNEY_EXPORT_MAX_SLICES,
+    )] = JourneyConfig.JOURNEY_EXPORT_SLICES,
+    db: AsyncElasticsearch = Depends(get_read_es_client)
+) -> StreamingResponse:
+    repo = JourneyRepo(journey_query(db))
+    pages = repo.export_journeys(query=body.query, source_includes=body.source_includes, slices=slices)
+    try:
+        # Read the first page before answering, so a bad query still gets a 400.
+        first_page = await anext(pages, None)
+    except BadRequestError as e:
+        await pages.aclose()
+        logger.warning("Bad request while exporting docs", extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid export query: {e.error}"
+        )
+    except Exception as e:
+        await pages.aclose()
+        logger.exception("Unexpected error", extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected internal server error"
+        )
+    return StreamingResponse(_encode_export(first_page, pages), media_type="application/x-ndjson")
+
+
 @v1_router.post(
     "/search",
     response_model=ESResponse | None,
@@ -179,11 +347,24 @@ async def all(
 )
 async def search(
     query_data: JourneyQuerySchema = Body(...),
+    mode: Annotated[SearchModeChoices, Query(
+        description=(
+            "`combined` runs exact and fuzzy matching in one query; `tiered` runs "
+            "exact/prefix matching first and falls back to fuzzy matching when it "
+            "finds too few hits, reporting the tier that answered in `tier`"
+        ),
+    )] = JourneyConfig.JOURNEY_SEARCH_MODE,
+    total_hits: Annotated[TotalHitsChoices, Query(
+        description=(
+            "How `total` is counted: `exact`, `capped` at JOURNEY_TOTAL_HITS_CAP "
+            "(reported with `total_relation` gte past it) or `off`"
+        ),
+    )] = JourneyConfig.JOURNEY_TOTAL_HITS,
     db: AsyncElasticsearch = Depends(get_read_es_client)
 ) -> ESResponse | None:
     try:
-        repo = JourneyRepo(ElasticSearchQry(db=db, index_name=index_name))
-        result = await repo.search_journey(query_data=query_data)
+        repo = JourneyRepo(journey_query(db))
+        result = await repo.search_journey(query_data=query_data, mode=mode, total_hits=total_hits)
         return result
 
     except BadRequestError as e:
@@ -201,24 +382,116 @@ async def search(
         )
 
 
+@v1_router.post(
+    "/count",
+    response_model=CountResponseSchema,
+    summary="Count doc entries",
+    description=(
+        "Exact number of journeys matching `query`, from _count. Counts are "
+        "cached for JOURNEY_COUNT_CACHE_TTL seconds when the count cache is enabled."
+    ),
+)
+async def count(
+    input: CountRequestSchema,
+    db: AsyncElasticsearch = Depends(get_read_es_client)
+) -> CountResponseSchema:
+    try:
+        repo = JourneyRepo(journey_query(db))
+        return await repo.count_journeys(input.query)
+
+    except BadRequestError as e:
+        logger.warning("Bad request while counting docs",
+                       extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid count query: {e.error}"
+        )
+    except Exception as e:
+        logger.exception("Unexpected error", extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected internal server error"
+        )
+
+
+@v1_router.get(
+    "/suggest",
+    response_model=SuggestResponseSchema,
+    summary="Autocomplete journeys",
+    description=(
+        "Complete the prefix `q` against the search_as_you_type subfield of "
+        "`field`. Indices created without the journey mapping template have "
+        "no such subfield and return no suggestions."
+    ),
+)
+async def suggest(
+    q: Annotated[str, Query(min_length=1, description="Prefix typed so far")],
+    field: Annotated[SuggestFieldChoices, Query(description="Field to complete")] = SuggestFieldChoices.TITLE,
+    size: Annotated[int, Query(ge=1, le=JourneyConfig.JOURNEY_SUGGEST_MAX_SIZE)] = 10,
+    db: AsyncElasticsearch = Depends(get_read_es_client)
+) -> SuggestResponseSchema:
+    try:
+        repo = JourneyRepo(journey_query(db))
+        return await repo.suggest_journeys(field, q, size=size)
+
+    except BadRequestError as e:
+        logger.warning("Bad request while suggesting docs",
+                       extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid suggest query: {e.error}"
+        )
+    except Exception as e:
+        logger.exception("Unexpected error", extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected internal server error"
+        )
+
+
 @v1_router.get(
     "/all-paginated",
     response_model=PaginatedResponse,
-    summary="Bulk create doc entries",
-    description="Insert multiple log documents into Elasticsearch in bulk",
+    summary="Paginate all journeys",
+    description=(
+        "Page mode reads `page` by offset and is limited to the first "
+        "JOURNEY_MAX_RESULT_WINDOW results. Cursor mode reads any depth: pass "
+        "each response's `next_cursor` as `cursor` to get the next page, "
+        "within JOURNEY_PIT_KEEP_ALIVE of the previous one."
+    ),
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Page past the result window, or malformed cursor"},
+        status.HTTP_410_GONE: {"description": "The cursor expired"},
+    },
 )
 async def all_paginated(
     size: Annotated[int | None, Query(
-        title="query size", description="body json for the items to save in the database")] = 10,
+        title="query size", description="Number of journeys per page", ge=1, le=10000)] = 10,
     page: Annotated[int | None, Query(
-        title="query page", description="body json for the items to save in the database")] = 1,
+        title="query page", description="Page number, in page mode", ge=1)] = 1,
+    pagination: Annotated[PaginationModeChoices, Query(
+        description="`cursor` to start a cursor walk; implied when `cursor` is given")] = PaginationModeChoices.PAGE,
+    cursor: Annotated[str | None, Query(
+        description="`next_cursor` of the previous page")] = None,
+    total_hits: Annotated[TotalHitsChoices, Query(
+        description=(
+            "How `total` is counted: `exact`, `capped` at JOURNEY_TOTAL_HITS_CAP "
+            "(reported with `total_relation` gte past it) or `off`"
+        ),
+    )] = JourneyConfig.JOURNEY_TOTAL_HITS,
     db: AsyncElasticsearch = Depends(get_read_es_client)
 ) -> PaginatedResponse:
     try:
-        repo = JourneyRepo(ElasticSearchQry(db=db, index_name=index_name))
-        result = await repo.all_journeys_with_pagination(page=page, size=size)
+        repo = JourneyRepo(journey_query(db))
+        if cursor is not None or pagination == PaginationModeChoices.CURSOR:
+            return await repo.all_journeys_by_cursor(size=size, cursor=cursor, total_hits=total_hits)
+        result = await repo.all_journeys_with_pagination(page=page, size=size, total_hits=total_hits)
         return result
 
+    except (InvalidCursorError, ResultWindowExceededError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
     except BadRequestError as e:
         logger.warning("Bad request while inserting doc",
                        extra={"error": str(e)})
@@ -2,13 +2,19 @@ from pydantic import BaseModel, Field
 from typing import Any, Dict, List, Optional
 from typing import Generic, TypeVar, List
 
+from config.settings.integrations_config import JourneyConfig
+from shared.enums import SearchTierChoices
+
 T = TypeVar("T")
 
 
 class PaginationMeta(BaseModel):
     page: int = Field(..., description="Current page number")
     size: int = Field(..., description="Number of items per page")
-    total: int = Field(..., description="Total number of documents")
+    total: Optional[int] = Field(..., description="Total number of documents, null when not tracked")
+    total_relation: Optional[str] = Field(
+        None, description="`eq` when `total` is exact, `gte` when it is a lower bound"
+    )
 
 class ElasticsearchHit(BaseModel):
     id: str = Field(..., alias="_id", description="Document ID")
@@ -20,14 +26,23 @@ class ElasticsearchHit(BaseModel):
 class PaginatedResponse(BaseModel):
     meta: PaginationMeta
     results: List[dict]
+    next_cursor: Optional[str] = Field(
+        None, description="Cursor of the next page in cursor pagination, null on the last page"
+    )
 
 class ESResponse(BaseModel):
     """
     Example for generic Elasticsearch raw result
     (if you don’t want to define a separate schema for hits)
     """
-    total: int
+    total: Optional[int]
+    total_relation: Optional[str] = Field(
+        None, description="`eq` when `total` is exact, `gte` when it is a lower bound"
+    )
     hits: List[ElasticsearchHit]
+    tier: Optional[SearchTierChoices] = Field(
+        None, description="Query tier that produced the hits, for tiered searches"
+    )
     
     
 class ErrorDetailSchema(BaseModel):
@@ -133,4 +148,49 @@ class JourneyQuerySchema(BaseModel):
     
 class UpdateInputSchema(BaseModel):
     data: Dict[str, Any]
-    meta: Dict[str, Any]
\ No newline at end of file
+    meta: Dict[str, Any]
+
+
+class BulkUpdateItemSchema(UpdateInputSchema):
+    id: str = Field(..., description="ID of the journey to update")
+
+
+class CountRequestSchema(BaseModel):
+    query: Optional[Dict[str, Any]] = Field(
+        None, description="Elasticsearch query of the journeys to count, all of them by default"
+    )
+
+
+class CountResponseSchema(BaseModel):
+    count: int = Field(..., description="Exact number of matching journeys")
+
+
+class SuggestionSchema(BaseModel):
+    id: str = Field(..., description="ID of the journey the suggestion comes from")
+    text: str = Field(..., description="Completed field value")
+    score: float = Field(..., description="Relevance of the completion")
+
+
+class SuggestResponseSchema(BaseModel):
+    suggestions: List[SuggestionSchema] = Field(..., description="Distinct completions, best first")
+
+
+class GetManyRequestSchema(BaseModel):
+    ids: List[str] = Field(
+        ..., min_length=1, max_length=JourneyConfig.JOURNEY_GET_MANY_MAX_IDS,
+        description="IDs of the journeys to fetch",
+    )
+
+
+class GetManyResponseSchema(BaseModel):
+    docs: List[Optional[DynamicDoc]] = Field(..., description="One entry per requested id, in order; null when missing")
+    missing: List[str] = Field(..., description="Requested ids that were not found")
+
+
+class ExportRequestSchema(BaseModel):
+    query: Optional[Dict[str, Any]] = Field(
+        None, description="Elasticsearch query of the journeys to export, all of them by default"
+    )
+    source_includes: Optional[List[str]] = Field(
+        None, description="Only these _source fields, all of them by default"
+    )
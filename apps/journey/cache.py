@@ -0,0 +1,328 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+from redis.asyncio import Redis
+
+from config.settings.integrations_config import JourneyConfig
+from config.settings.services.metrics import counter, histogram
+from config.settings.services.redis import redis_manager
+from shared.cache import LocalTTLCache, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DOC_CACHE_REQUESTS = counter(
+    "journey_doc_cache_requests_total",
+    "Journey document cache lookups by outcome",
+    labelnames=("result",),
+)
+SEARCH_CACHE_REQUESTS = counter(
+    "journey_search_cache_requests_total",
+    "Journey search cache lookups by outcome",
+    labelnames=("result",),
+)
+COUNT_CACHE_REQUESTS = counter(
+    "journey_count_cache_requests_total",
+    "Journey count cache lookups by outcome",
+    labelnames=("result",),
+)
+SEARCH_CACHE_SAVED_SECONDS = histogram(
+    "journey_search_cache_saved_seconds",
+    "Search latency avoided by each journey search cache hit",
+)
+
+# Clauses of a bool query match the same documents in any order.
+_UNORDERED_BOOL_CLAUSES = frozenset({"must", "should", "filter", "must_not"})
+
+
+def _canonical(value: Any, parent: Optional[str] = None) -> Any:
+    if isinstance(value, dict):
+        return {key: _canonical(item, key) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [_canonical(item) for item in value]
+        if parent in _UNORDERED_BOOL_CLAUSES:
+            items.sort(key=lambda item: orjson.dumps(item, option=orjson.OPT_SORT_KEYS))
+        return items
+    return value
+
+
+def search_cache_key(query: dict) -> str:
+    """Digest of a search body, equal for bodies that only differ in key or clause order."""
+    return hashlib.sha256(
+        orjson.dumps(_canonical(query), option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+class JourneyDocCache:
+    """
+    In-process cache of journey documents read by id, keyed by
+    ``(index, id)`` and holding the ``_seq_no`` each was read at.
+
+    Writes made through this process drop the entry and keep the
+    ``_seq_no`` they produced as a floor, so a read racing the write cannot
+    cache an older version afterwards. Other workers drop their copy when
+    it expires after ``ttl`` seconds.
+    """
+
+    def __init__(self, enabled: bool, ttl: float, max_entries: int):
+        self.enabled = enabled
+        self.docs = LocalTTLCache(max_entries=max_entries, ttl=ttl)
+        self.floors = LocalTTLCache(max_entries=max_entries, ttl=ttl)
+
+    def get(self, index_name: str, id: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        doc = self.docs.get((index_name, id))
+        DOC_CACHE_REQUESTS.labels("miss" if doc is None else "hit").inc()
+        return doc
+
+    def put(self, index_name: str, doc: dict) -> None:
+        """Cache a ``get``/``mget`` result unless a newer version is known."""
+        if not self.enabled:
+            return
+        key = (index_name, doc["_id"])
+        cached = self.docs.get(key)
+        newest = max(self.floors.get(key, -1), cached["_seq_no"] if cached else -1)
+        if doc["_seq_no"] >= newest:
+            self.docs.set(key, doc)
+
+    def invalidate(self, index_name: str, id: str, seq_no: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        key = (index_name, id)
+        self.docs.delete(key)
+        if seq_no is not None:
+            self.floors.set(key, max(seq_no, self.floors.get(key, -1)))
+
+
+class JourneySearchCache:
+    """
+    Two-level cache of journey search results: a short-lived in-process L1
+    in front of Redis, keyed by the canonical form of the search body.
+
+    Entries are not deleted on writes. Each index has a generation counter
+    that ``bump`` increments after every write, and an entry only counts
+    while it was computed at the current generation. The bump is repeated
+    after ``invalidation_delay_ms``, once the write is visible to searches.
+    Redis holds the shared counter and tells the other workers about bumps
+    through pub/sub; without Redis, their L1 entries simply expire.
+    """
+
+    KEY_PREFIX = "journey_search:v1:"
+    GENERATION_PREFIX = "journey_search:v1:generation:"
+    CHANNEL = "journey_search:v1:bump"
+
+    def __init__(
+        self,
+        enabled: bool,
+        ttl: int,
+        local_ttl: float,
+        local_max_entries: int,
+        invalidation_delay_ms: int,
+    ):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.invalidation_delay = invalidation_delay_ms / 1000
+        self.local = LocalTTLCache(max_entries=local_max_entries, ttl=local_ttl)
+        self.single_flight = SingleFlight()
+        self._generations: dict[str, int] = {}
+        self._listener: asyncio.Task | None = None
+        self._delayed: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _redis() -> Redis | None:
+        return redis_manager.get_client() if redis_manager.is_initialized else None
+
+    async def get_or_load(
+        self,
+        index_name: str,
+        query: dict,
+        loader: Callable[[], Awaitable[dict]],
+    ) -> dict:
+        """
+        Return the cached result of ``query``, or run ``loader`` once for all
+        concurrent callers. Results must be JSON serializable.
+        """
+        if not self.enabled:
+            return await loader()
+
+        digest = search_cache_key(query)
+        generation = self._generations.get(index_name, 0)
+        entry = self.local.get((index_name, digest))
+        if entry is not None and entry[0] == generation:
+            SEARCH_CACHE_REQUESTS.labels("local_hit").inc()
+            SEARCH_CACHE_SAVED_SECONDS.observe(entry[2])
+            return entry[1]
+
+        return await self.single_flight.do(
+            (index_name, digest, generation),
+            lambda: self._fill(index_name, digest, generation, loader),
+        )
+
+    async def _fill(self, index_name: str, digest: str, generation: int, loader) -> dict:
+        shared_generation, cached = await self._redis_get(index_name, digest)
+        if cached is not None and cached["generation"] == shared_generation:
+            SEARCH_CACHE_REQUESTS.labels("redis_hit").inc()
+            SEARCH_CACHE_SAVED_SECONDS.observe(cached["took"])
+            self.local.set((index_name, digest), (generation, cached["result"], cached["took"]))
+            return cached["result"]
+
+        SEARCH_CACHE_REQUESTS.labels("miss").inc()
+        started = time.perf_counter()
+        result = await loader()
+        took = time.perf_counter() - started
+        self.local.set((index_name, digest), (generation, result, took))
+        if shared_generation is not None:
+            await self._redis_set(index_name, digest, shared_generation, result, took)
+        return result
+
+    async def _redis_get(self, index_name: str, digest: str) -> tuple[int | None, dict | None]:
+        """The shared generation of ``index_name`` and the entry stored for ``digest``."""
+        client = self._redis()
+        if client is None:
+            return None, None
+        try:
+            raw_generation, raw = await client.mget(
+                self.GENERATION_PREFIX + index_name, f"{self.KEY_PREFIX}{index_name}:{digest}"
+            )
+        except Exception as e:
+            logger.warning(f"Journey search cache read failed: {e}")
+            return None, None
+        return int(raw_generation or 0), orjson.loads(raw) if raw is not None else None
+
+    async def _redis_set(
+        self, index_name: str, digest: str, generation: int, result: dict, took: float
+    ) -> None:
+        try:
+            await self._redis().set(
+                f"{self.KEY_PREFIX}{index_name}:{digest}",
+                orjson.dumps({"generation": generation, "result": result, "took": took}),
+                ex=self.ttl,
+            )
+        except Exception as e:
+            logger.warning(f"Journey search cache write failed: {e}")
+
+    async def bump(self, index_name: str) -> None:
+        """Expire every cached search of ``index_name`` after a write to it."""
+        if not self.enabled:
+            return
+        await self._bump(index_name)
+        if self.invalidation_delay > 0:
+            task = asyncio.create_task(self._bump_later(index_name))
+            self._delayed.add(task)
+            task.add_done_callback(self._delayed.discard)
+
+    async def _bump_later(self, index_name: str) -> None:
+        await asyncio.sleep(self.invalidation_delay)
+        await self._bump(index_name)
+
+    def _bump_local(self, index_name: str) -> None:
+        self._generations[index_name] = self._generations.get(index_name, 0) + 1
+
+    async def _bump(self, index_name: str) -> None:
+        self._bump_local(index_name)
+
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.incr(self.GENERATION_PREFIX + index_name)
+                pipe.publish(self.CHANNEL, index_name)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Journey search cache generation bump failed: {e}")
+
+    def start(self) -> None:
+        if self.enabled and self._listener is None and redis_manager.is_initialized:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis().pubsub() as pubsub:
+                    await pubsub.subscribe(self.CHANNEL)
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            self._bump_local(message["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Bumps may have been missed while disconnected.
+                logger.warning(f"Journey search cache bump listener failed: {e}")
+                self.local.clear()
+                await asyncio.sleep(1)
+
+    async def stop(self) -> None:
+        tasks = [*self._delayed]
+        if self._listener is not None:
+            tasks.append(self._listener)
+            self._listener = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class JourneyCountCache:
+    """
+    In-process cache of ``_count`` results by index and canonical query,
+    kept for ``ttl`` seconds. Writes made through this process drop the
+    counts of their index; other workers' counts lag by up to ``ttl``.
+    """
+
+    def __init__(self, enabled: bool, ttl: float, max_entries: int):
+        self.enabled = enabled
+        self.local = LocalTTLCache(max_entries=max_entries, ttl=ttl)
+        self.single_flight = SingleFlight()
+
+    async def get_or_load(
+        self,
+        index_name: str,
+        query: dict,
+        loader: Callable[[], Awaitable[int]],
+    ) -> int:
+        if not self.enabled:
+            return await loader()
+
+        key = (index_name, search_cache_key(query))
+        count = self.local.get(key)
+        if count is not None:
+            COUNT_CACHE_REQUESTS.labels("hit").inc()
+            return count
+
+        COUNT_CACHE_REQUESTS.labels("miss").inc()
+        return await self.single_flight.do(key, lambda: self._fill(key, index_name, loader))
+
+    async def _fill(self, key: tuple, index_name: str, loader) -> int:
+        count = await loader()
+        self.local.set(key, count, tags=(index_name,))
+        return count
+
+    def invalidate(self, index_name: str) -> None:
+        if self.enabled:
+            self.local.invalidate_tags((index_name,))
+
+
+journey_doc_cache = JourneyDocCache(
+    enabled=JourneyConfig.JOURNEY_DOC_CACHE_ENABLED,
+    ttl=JourneyConfig.JOURNEY_DOC_CACHE_TTL,
+    max_entries=JourneyConfig.JOURNEY_DOC_CACHE_MAX_ENTRIES,
+)
+
+journey_search_cache = JourneySearchCache(
+    enabled=JourneyConfig.JOURNEY_SEARCH_CACHE_ENABLED,
+    ttl=JourneyConfig.JOURNEY_SEARCH_CACHE_TTL,
+    local_ttl=JourneyConfig.JOURNEY_SEARCH_CACHE_LOCAL_TTL,
+    local_max_entries=JourneyConfig.JOURNEY_SEARCH_CACHE_LOCAL_MAX_ENTRIES,
+    invalidation_delay_ms=JourneyConfig.JOURNEY_SEARCH_CACHE_INVALIDATION_DELAY_MS,
+)
+
+journey_count_cache = JourneyCountCache(
+    enabled=JourneyConfig.JOURNEY_COUNT_CACHE_ENABLED,
+    ttl=JourneyConfig.JOURNEY_COUNT_CACHE_TTL,
+    max_entries=JourneyConfig.JOURNEY_COUNT_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,60 @@
+"""
+Maintenance commands for the journey indices.
+
+    python -m apps.journey.commands create-index --name journey_v4
+        [--template journey] [--reindex-from journey_v3]
+"""
+import argparse
+import asyncio
+
+from apps.journey.mappings import MAPPING_TEMPLATES
+from apps.journey.query import ElasticSearchQry
+from config.settings.services.elk import es_manager
+from config.settings.services.log import setup_logging
+
+logger = setup_logging()
+
+
+async def create_index(name: str, template: str, reindex_from: str | None) -> None:
+    """
+    Create ``name`` from a mapping template and optionally copy another
+    index into it. The copy runs as a cluster task; once it is done, point
+    the journey endpoints at the new index by moving the alias named in
+    JOURNEY_INDEX_NAME, or by setting JOURNEY_INDEX_NAME to ``name``.
+    """
+    await es_manager.initialize()
+    try:
+        client = await es_manager.get_write_client()
+        if await ElasticSearchQry(db=client, index_name=name).create_collection(name, template):
+            logger.info(f"✓ Created {name} index from the {template} template")
+        else:
+            logger.info(f"{name} already exists, its mapping was left as is")
+
+        if reindex_from:
+            task = await client.reindex(
+                source={"index": reindex_from},
+                dest={"index": name},
+                wait_for_completion=False,
+            )
+            logger.info(f"Reindexing {reindex_from} into {name} as task {task['task']}")
+    finally:
+        await es_manager.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m apps.journey.commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser(
+        "create-index", help="Create a journey index from a mapping template"
+    )
+    create.add_argument("--name", required=True)
+    create.add_argument("--template", choices=sorted(MAPPING_TEMPLATES), default="journey")
+    create.add_argument("--reindex-from")
+
+    args = parser.parse_args()
+    if args.command == "create-index":
+        asyncio.run(create_index(args.name, args.template, args.reindex_from))
+
+
+if __name__ == "__main__":
+    main()
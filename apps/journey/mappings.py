@@ -0,0 +1,39 @@
+from config.settings.integrations_config import JourneyConfig
+
+# Same text + keyword pair dynamic mapping creates for strings, plus a
+# search_as_you_type subfield whose shingle and edge n-gram subfields
+# answer prefix lookups without fuzzy expansion.
+_SUGGEST_TEXT = {
+    "type": "text",
+    "fields": {
+        "keyword": {"type": "keyword", "ignore_above": 256},
+        "suggest": {"type": "search_as_you_type", "max_shingle_size": 3},
+    },
+}
+
+# Fields the suggest endpoint can complete, each mapped with _SUGGEST_TEXT.
+SUGGEST_FIELDS = ("title", "username")
+
+_SETTINGS = {
+    "index": {"max_result_window": JourneyConfig.JOURNEY_MAX_RESULT_WINDOW},
+}
+
+# Index bodies ``create_collection`` creates indices from, by template name.
+# Fields not listed here are still mapped dynamically.
+MAPPING_TEMPLATES = {
+    "journey": {
+        "settings": _SETTINGS,
+        "mappings": {
+            "properties": {field_name: _SUGGEST_TEXT for field_name in SUGGEST_FIELDS},
+        },
+    },
+    "historical_journey": {
+        "settings": _SETTINGS,
+        "mappings": {
+            "properties": {
+                "_original_id": {"type": "keyword"},
+                **{field_name: _SUGGEST_TEXT for field_name in SUGGEST_FIELDS},
+            },
+        },
+    },
+}
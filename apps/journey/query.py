@@ -1,12 +1,23 @@
+import asyncio
+import uuid
 from abc import ABC, abstractmethod
 from datetime import datetime
-from elasticsearch import AsyncElasticsearch, NotFoundError, helpers
-from typing import List, Optional, TypeVar
+from elasticsearch import AsyncElasticsearch, BadRequestError, NotFoundError
+from elasticsearch.helpers import expand_action
+from typing import AsyncIterator, List, Optional, TypeVar
+from config.settings.integrations_config import JourneyConfig
 from config.settings.services.log import setup_logging
+from shared.bulk import BulkEngine
+from shared.enums import TotalHitsChoices
+from shared.exceptions import CursorExpiredError, InvalidCursorError, ResultWindowExceededError
+from shared.pagination import decode_cursor, encode_cursor
 
 from pydantic import BaseModel
 
+from .cache import JourneyCountCache, JourneyDocCache, JourneySearchCache
+from .mappings import MAPPING_TEMPLATES
 from .api.v1.schemas import (
+    BulkUpdateItemSchema,
     ESResponse,
     ErrorDetailSchema,
     InsertResultSchema,
@@ -20,6 +31,20 @@ logger = setup_logging()
 
 T = TypeVar("T", bound=BaseModel)
 
+_DONE = object()
+
+
+def track_total_hits(policy: TotalHitsChoices) -> bool | int:
+    """
+    ``track_total_hits`` for ``policy``: an exact total, one counted up to
+    JOURNEY_TOTAL_HITS_CAP and reported as a lower bound past it, or none.
+    """
+    if policy == TotalHitsChoices.EXACT:
+        return True
+    if policy == TotalHitsChoices.CAPPED:
+        return JourneyConfig.JOURNEY_TOTAL_HITS_CAP
+    return False
+
 
 class BaseQuery(ABC):
     @abstractmethod
@@ -27,16 +52,43 @@ class BaseQuery(ABC):
         """Get a single record/document by its ID."""
         pass
 
+    @abstractmethod
+    async def get_many(self, ids: List[str]) -> List[Optional[T]]:
+        """Get records/documents by their IDs, None for the missing ones."""
+        pass
+
     @abstractmethod
     async def search(self, query: dict) -> ESResponse:
         """Perform a search or query operation."""
         pass
 
     @abstractmethod
-    async def all_paginated(self, page: int = 1, size: int = 10) -> PaginatedResponse:
+    async def all_paginated(
+        self, page: int = 1, size: int = 10, total_hits: TotalHitsChoices = TotalHitsChoices.CAPPED
+    ) -> PaginatedResponse:
         """Perform a search or query operation."""
         pass
 
+    @abstractmethod
+    async def all_by_cursor(
+        self,
+        size: int = 10,
+        cursor: Optional[str] = None,
+        total_hits: TotalHitsChoices = TotalHitsChoices.CAPPED,
+    ) -> PaginatedResponse:
+        """Page through every record/document, following ``cursor`` from a previous page."""
+        pass
+
+    @abstractmethod
+    def export(
+        self,
+        query: Optional[dict] = None,
+        source_includes: Optional[List[str]] = None,
+        slices: int = 1,
+    ) -> AsyncIterator[List[dict]]:
+        """Yield every matching record/document, a page at a time."""
+        pass
+
     @abstractmethod
     async def all(self) -> ESResponse:
         """Perform a search or query operation."""
@@ -48,8 +100,13 @@ class BaseQuery(ABC):
         pass
 
     @abstractmethod
-    async def create_collection(self, collection_name: str) -> bool:
-        """Return count of matching records/documents."""
+    async def create_collection(self, collection_name: str, template: str = "journey") -> bool:
+        """Create a collection from a mapping template, False if it already exists."""
+        pass
+
+    @abstractmethod
+    async def suggest(self, field_name: str, text: str, size: int = 10) -> ESResponse:
+        """Records/documents whose ``field_name`` completes the prefix ``text``."""
         pass
 
     @abstractmethod
@@ -57,6 +114,11 @@ class BaseQuery(ABC):
         """Save a single domain object and return its ID."""
         pass
 
+    @abstractmethod
+    async def bulk_update(self, items: List[BulkUpdateItemSchema]) -> UpdateResultSchema:
+        """Apply many partial updates, returning successes and failures."""
+        pass
+
     @abstractmethod
     async def save(self, data: T) -> InsertResultSchema:
         """Save a single domain object and return its ID."""
@@ -69,78 +131,344 @@ class BaseQuery(ABC):
 
 
 class ElasticSearchQry(BaseQuery):
-    def __init__(self, db: AsyncElasticsearch, index_name: str):
+    # Cheapest stable order inside a point in time.
+    CURSOR_SORT = [{"_shard_doc": "asc"}]
+
+    def __init__(
+        self,
+        db: AsyncElasticsearch,
+        index_name: str,
+        doc_cache: JourneyDocCache | None = None,
+        search_cache: JourneySearchCache | None = None,
+        count_cache: JourneyCountCache | None = None,
+    ):
         self.db = db
         self.index_name = index_name
+        self.doc_cache = doc_cache
+        self.search_cache = search_cache
+        self.count_cache = count_cache
+        self.pit_keep_alive = JourneyConfig.JOURNEY_PIT_KEEP_ALIVE
+        self.max_result_window = JourneyConfig.JOURNEY_MAX_RESULT_WINDOW
+        self.export_page_size = JourneyConfig.JOURNEY_EXPORT_PAGE_SIZE
+        self.export_queue_pages = JourneyConfig.JOURNEY_EXPORT_QUEUE_PAGES
+        self.update_conflict_retries = JourneyConfig.JOURNEY_UPDATE_CONFLICT_RETRIES
 
     async def get_by_id(self, doc_id: str) -> Optional[T]:
+        if self.doc_cache is not None:
+            cached = self.doc_cache.get(self.index_name, doc_id)
+            if cached is not None:
+                return cached
         try:
             res = await self.db.get(index=self.index_name, id=doc_id)
-            return res
         except NotFoundError:
             return None
         except Exception as e:
-            print(str(e))
+            logger.exception("error getting doc", extra={"error": str(e)})
+            raise
+        # Plain dicts, like the documents get_many caches.
+        doc = res.body
+        if self.doc_cache is not None:
+            self.doc_cache.put(self.index_name, doc)
+        return doc
+
+    async def get_many(self, ids: List[str]) -> List[Optional[dict]]:
+        """
+        Documents in the order of ``ids``, None for the missing ones. Cached
+        documents are served locally, all the others come from one ``mget``.
+        """
+        found = {}
+        if self.doc_cache is not None:
+            for id in ids:
+                cached = self.doc_cache.get(self.index_name, id)
+                if cached is not None:
+                    found[id] = cached
+
+        wanted = [id for id in dict.fromkeys(ids) if id not in found]
+        if wanted:
+            response = await self.db.mget(index=self.index_name, ids=wanted)
+            for doc in response["docs"]:
+                if not doc.get("found"):
+                    continue
+                found[doc["_id"]] = doc
+                if self.doc_cache is not None:
+                    self.doc_cache.put(self.index_name, doc)
+
+        return [found.get(id) for id in ids]
 
-    async def search(self, query: dict) -> list[T]:
+    async def search(self, query: dict) -> ESResponse:
         try:
-            res = await self.db.search(index=self.index_name, body=query)
-            hits = res["hits"]["hits"]
-            docs = [hit for hit in hits]
-            total = res["hits"]["total"]["value"]
-            return ESResponse(
-                total=total,
-                hits=docs
-            )
+            return ESResponse(**await self._cached_search(query))
         except Exception as e:
-            print(f"Error searching documents: {e}")
-            return ESResponse(
-                total=0,
-                hits=[]
-            )
-        
-    async def count(self, query: Optional[dict] = None) -> int:
-        """Return count of matching records/documents."""
-        pass
+            # Never answered as an empty result: a failed exact tier would
+            # fall through to the fuzzy one.
+            logger.warning("error searching documents", extra={"error": str(e)})
+            raise
+
+    async def _cached_search(self, query: dict) -> dict:
+        if self.search_cache is None:
+            return await self._search(query)
+        return await self.search_cache.get_or_load(
+            self.index_name, query, lambda: self._search(query)
+        )
 
-    async def create_collection(self, collection_name: str) -> bool:
-        """Return count of matching records/documents."""
-        pass
+    async def _search(self, query: dict) -> dict:
+        res = await self.db.search(index=self.index_name, body=query)
+        total, total_relation = self._total_hits(res["hits"])
+        return {
+            "total": total,
+            "total_relation": total_relation,
+            "hits": [hit for hit in res["hits"]["hits"]],
+        }
 
-    async def _log(self, id, meta):
-        historical_index = f'historical_{self.index_name}'
+    @staticmethod
+    def _total_hits(hits: dict) -> tuple[Optional[int], Optional[str]]:
+        """``hits.total`` as (value, relation), (None, None) when it was not tracked."""
+        total = hits.get("total")
+        if total is None:
+            return None, None
+        return total["value"], total.get("relation")
+
+    async def count(self, query: Optional[dict] = None) -> int:
+        """
+        Exact number of records/documents matching ``query``, all of them by
+        default, from ``_count``: nothing is fetched or scored.
+        """
+        query = query or {"match_all": {}}
+        if self.count_cache is None:
+            return await self._count(query)
+        return await self.count_cache.get_or_load(
+            self.index_name, query, lambda: self._count(query)
+        )
+
+    async def _count(self, query: dict) -> int:
+        response = await self.db.count(index=self.index_name, query=query)
+        return response["count"]
+
+    async def create_collection(self, collection_name: str, template: str = "journey") -> bool:
+        """
+        Create ``collection_name`` from one of the ``MAPPING_TEMPLATES``.
+        Returns False, leaving its mapping alone, if it already exists.
+        """
+        if await self.db.indices.exists(index=collection_name):
+            return False
         try:
-            current_doc = await self.db.get(index=self.index_name, id=id)
-        except Exception as e:
-            logger.warning("document has not been found",
-                           extra={"error": str(e)})
-            current_doc = None
-
-        if current_doc and current_doc.get("_source"):
-            hist_doc = current_doc["_source"].copy()
-            hist_doc["_original_id"] = id
-            hist_doc.update(meta)
-            
-            try:
-                await self.db.index(index=historical_index, document=hist_doc)
-                return True
-            except Exception as e:
-                return False
-        return False
+            await self.db.indices.create(index=collection_name, **MAPPING_TEMPLATES[template])
+        except BadRequestError as e:
+            # Another worker created it first.
+            if "resource_already_exists_exception" not in str(e):
+                raise
+            return False
+        return True
+
+    async def suggest(self, field_name: str, text: str, size: int = 10) -> ESResponse:
+        """
+        ``bool_prefix`` match on the ``search_as_you_type`` subfield of
+        ``field_name``: the last term is looked up in the edge n-grams, the
+        others in the shingles. Only ``field_name`` is returned and hits are
+        not counted.
+        """
+        suggest_field = f"{field_name}.suggest"
+        query = {
+            "size": size,
+            "_source": [field_name],
+            "track_total_hits": False,
+            "query": {
+                "multi_match": {
+                    "query": text,
+                    "type": "bool_prefix",
+                    "fields": [suggest_field, f"{suggest_field}._2gram", f"{suggest_field}._3gram"],
+                }
+            },
+        }
+        return ESResponse(**await self._cached_search(query))
 
-    async def update(self, id: str, input: T) -> UpdateResultSchema:
-        index_params = {
-            "index": self.index_name,
-            "id": id,
-            "doc": input.data,
+    def _history_action(self, id: str, current_doc: dict, meta: dict) -> dict:
+        """Snapshot of ``current_doc`` for ``historical_<index>``, under an id owned by this update."""
+        hist_doc = current_doc["_source"].copy()
+        hist_doc["_original_id"] = id
+        hist_doc.update(meta)
+        return {
+            "_op_type": "create",
+            "_index": f"historical_{self.index_name}",
+            "_id": f"{id}:{current_doc['_seq_no']}:{uuid.uuid4().hex}",
+            "_source": hist_doc,
+        }
+
+    def _update_action(self, id: str, current_doc: dict, data: dict) -> dict:
+        """Partial update applied only if ``current_doc`` is still the current version."""
+        return {
+            "_op_type": "update",
+            "_index": self.index_name,
+            "_id": id,
+            "if_seq_no": current_doc["_seq_no"],
+            "if_primary_term": current_doc["_primary_term"],
+            "doc": data,
         }
+
+    async def update(self, id: str, input: T) -> UpdateResultSchema:
+        """
+        One ``get`` for the current version, then one ``_bulk`` with its
+        history snapshot and the partial update, conditional on that
+        version. On a version conflict the snapshot is deleted and both are
+        redone from a fresh ``get``.
+        """
         summary_success = {"updated": 1, "failed": 0}
         summary_error = {"updated": 0, "failed": 1}
-        result = await self._log(id, input.meta)
-        if result:
-            response = await self.db.update(**index_params)
-            return UpdateResultSchema(success=True, summary=UpdateSummarySchema(**summary_success), errors=None)
-        return UpdateResultSchema(success=False, summary=UpdateSummarySchema(**summary_error), errors=None)
+
+        for _ in range(self.update_conflict_retries + 1):
+            try:
+                current_doc = await self.db.get(index=self.index_name, id=id)
+            except NotFoundError:
+                return UpdateResultSchema(
+                    success=False,
+                    summary=UpdateSummarySchema(**summary_error),
+                    errors=[ErrorDetailSchema(id=id, reason="document not found")],
+                )
+
+            hist_action = self._history_action(id, current_doc, input.meta)
+            response = await self.db.bulk(operations=[
+                *expand_action(hist_action),
+                *expand_action(self._update_action(id, current_doc, input.data)),
+            ])
+            hist_item, update_item = response["items"]
+            hist_result, update_result = hist_item["create"], update_item["update"]
+
+            if "error" not in update_result:
+                self._written(update_result)
+                await self._changed()
+                if "error" in hist_result:
+                    # The update is applied, only its history is missing.
+                    logger.error("history snapshot failed", extra={"error": str(hist_result["error"])})
+                    return UpdateResultSchema(
+                        success=True,
+                        summary=UpdateSummarySchema(**summary_success),
+                        errors=[ErrorDetailSchema(**self._extract_error_info(hist_item))],
+                    )
+                return UpdateResultSchema(success=True, summary=UpdateSummarySchema(**summary_success), errors=None)
+
+            if "error" not in hist_result:
+                await self._delete_history(hist_action)
+            if update_result.get("status") != 409:
+                return UpdateResultSchema(
+                    success=False,
+                    summary=UpdateSummarySchema(**summary_error),
+                    errors=[ErrorDetailSchema(**self._extract_error_info(update_item))],
+                )
+
+        logger.warning("update gave up after version conflicts", extra={"error": id})
+        return UpdateResultSchema(
+            success=False,
+            summary=UpdateSummarySchema(**summary_error),
+            errors=[ErrorDetailSchema(id=id, reason="version conflict: the document kept changing")],
+        )
+
+    def _written(self, result: dict) -> None:
+        """Drop the cached copy of a document this process just wrote."""
+        if self.doc_cache is not None and result.get("_id") is not None:
+            self.doc_cache.invalidate(self.index_name, result["_id"], result.get("_seq_no"))
+
+    async def _changed(self) -> None:
+        """Expire cached searches and counts once this index has been written to."""
+        if self.count_cache is not None:
+            self.count_cache.invalidate(self.index_name)
+        if self.search_cache is not None:
+            await self.search_cache.bump(self.index_name)
+
+    async def _delete_history(self, hist_action: dict) -> None:
+        try:
+            await self.db.delete(index=hist_action["_index"], id=hist_action["_id"])
+        except Exception as e:
+            logger.warning("failed to delete orphan history snapshot", extra={"error": str(e)})
+
+    async def bulk_update(self, items: List[BulkUpdateItemSchema]) -> UpdateResultSchema:
+        """
+        Batched ``update``: each round reads the current version of every
+        pending document with one ``mget`` and sends their history snapshots
+        and conditional updates through chunked ``_bulk`` requests. Version
+        conflicts go to the next round, their orphan snapshots are deleted
+        in one more ``_bulk``. Repeated ids are applied in order, one per
+        round; only version conflicts count against an item's retries.
+        """
+        errors: List[ErrorDetailSchema] = []
+        updated = 0
+        # Each item with the version conflicts it has met so far.
+        pending = [(item, 0) for item in items]
+
+        while pending:
+            batch, deferred, seen = [], [], set()
+            for entry in pending:
+                (deferred if entry[0].id in seen else batch).append(entry)
+                seen.add(entry[0].id)
+
+            response = await self.db.mget(index=self.index_name, ids=[item.id for item, _ in batch])
+            actions = []
+            hist_actions = {}
+            for (item, _), current_doc in zip(batch, response["docs"]):
+                if not current_doc.get("found"):
+                    errors.append(ErrorDetailSchema(id=item.id, reason="document not found"))
+                    continue
+                hist_actions[item.id] = self._history_action(item.id, current_doc, item.meta)
+                actions.append(hist_actions[item.id])
+                actions.append(self._update_action(item.id, current_doc, item.data))
+
+            id_by_hist_id = {action["_id"]: id for id, action in hist_actions.items()}
+            hist_results, update_results = {}, {}
+            async for ok, info in BulkEngine(self.db).stream(actions):
+                op_type, result = next(iter(info.items()))
+                if op_type == "create":
+                    hist_results[id_by_hist_id[result["_id"]]] = info
+                else:
+                    update_results[result["_id"]] = info
+
+            conflicted, orphans = [], []
+            for item, conflicts in batch:
+                if item.id not in hist_actions:
+                    continue
+                hist_info, update_info = hist_results[item.id], update_results[item.id]
+                hist_failed = "error" in hist_info["create"]
+                if "error" not in update_info["update"]:
+                    self._written(update_info["update"])
+                    updated += 1
+                    if hist_failed:
+                        # The update is applied, only its history is missing.
+                        errors.append(ErrorDetailSchema(**self._extract_error_info(hist_info)))
+                    continue
+                if not hist_failed:
+                    orphans.append(hist_actions[item.id])
+                if update_info["update"].get("status") != 409:
+                    errors.append(ErrorDetailSchema(**self._extract_error_info(update_info)))
+                elif conflicts < self.update_conflict_retries:
+                    conflicted.append((item, conflicts + 1))
+                else:
+                    errors.append(ErrorDetailSchema(
+                        id=item.id, reason="version conflict: the document kept changing"
+                    ))
+
+            if orphans:
+                await self._delete_histories(orphans)
+            pending = conflicted + deferred
+
+        if updated:
+            await self._changed()
+
+        summary = {"updated": updated, "failed": len(items) - updated}
+        return UpdateResultSchema(
+            success=summary["failed"] == 0,
+            summary=UpdateSummarySchema(**summary),
+            errors=errors or None,
+        )
+
+    async def _delete_histories(self, hist_actions: List[dict]) -> None:
+        deletes = (
+            {"_op_type": "delete", "_index": action["_index"], "_id": action["_id"]}
+            for action in hist_actions
+        )
+        try:
+            async for ok, info in BulkEngine(self.db).stream(deletes):
+                if not ok:
+                    logger.warning("failed to delete orphan history snapshot", extra={"error": str(info)})
+        except Exception as e:
+            logger.warning("failed to delete orphan history snapshots", extra={"error": str(e)})
 
     async def save(self, data: T) -> InsertResultSchema:
         index_params = {
@@ -150,10 +478,12 @@ class ElasticSearchQry(BaseQuery):
         }
         summary = {"inserted": 1, "failed": 0}
         response = await self.db.index(**index_params)
+        self._written(response)
+        await self._changed()
 
         return InsertResultSchema(success=True, summary=InsertSummarySchema(**summary), errors=None)
 
-    async def bulk_save(self, data_list: List[T], batch_size: int = 1000) -> InsertResultSchema:
+    async def bulk_save(self, data_list: List[T]) -> InsertResultSchema:
         actions = (
             {
                 "_op_type": "index",
@@ -167,17 +497,17 @@ class ElasticSearchQry(BaseQuery):
         summary = {"inserted": 0, "failed": 0}
         errors = []
 
-        async for ok, info in helpers.async_streaming_bulk(
-            client=self.db,
-            actions=actions,
-            chunk_size=batch_size,
-            raise_on_error=False,
-        ):
-            if ok:
-                summary["inserted"] += 1
-            else:
-                summary["failed"] += 1
-                errors.append(info)
+        try:
+            async for ok, info in BulkEngine(self.db).stream(actions):
+                self._written(next(iter(info.values()), {}))
+                if ok:
+                    summary["inserted"] += 1
+                else:
+                    summary["failed"] += 1
+                    errors.append(info)
+        finally:
+            if summary["inserted"]:
+                await self._changed()
 
         return InsertResultSchema(
             success=summary["failed"] == 0,
@@ -186,21 +516,158 @@ class ElasticSearchQry(BaseQuery):
                 **self._extract_error_info(err)) for err in errors]
         )
 
-    async def all_paginated(self, page: int = 1, size: int = 10) -> PaginatedResponse:
+    async def all_paginated(
+        self, page: int = 1, size: int = 10, total_hits: TotalHitsChoices = TotalHitsChoices.CAPPED
+    ) -> PaginatedResponse:
         from_ = (page - 1) * size
+        if from_ + size > self.max_result_window:
+            raise ResultWindowExceededError(self.max_result_window)
         response = await self.db.search(
             index=self.index_name,
             body={"query": {"match_all": {}}},
             from_=from_,
             size=size,
+            track_total_hits=track_total_hits(total_hits),
         )
         docs = [hit["_source"] for hit in response["hits"]["hits"]]
-        total = response["hits"]["total"]["value"]
+        total, total_relation = self._total_hits(response["hits"])
         return PaginatedResponse(
-            meta=PaginationMeta(page=page, size=size, total=total),
+            meta=PaginationMeta(page=page, size=size, total=total, total_relation=total_relation),
             results=docs
         )
 
+    async def all_by_cursor(
+        self,
+        size: int = 10,
+        cursor: Optional[str] = None,
+        total_hits: TotalHitsChoices = TotalHitsChoices.CAPPED,
+    ) -> PaginatedResponse:
+        """
+        Pages of a point in time read with ``search_after``, so any depth
+        costs the same and documents indexed meanwhile cannot shift pages.
+        The cursor carries the PIT id, the last sort values and the total
+        counted on the first page under ``total_hits``; every page extends
+        the PIT keep-alive. The PIT is closed once the last page is served.
+        """
+        if cursor is None:
+            pit = await self.db.open_point_in_time(index=self.index_name, keep_alive=self.pit_keep_alive)
+            state = {"pit": pit["id"], "after": None, "page": 1, "total": None, "total_relation": None}
+        else:
+            state = decode_cursor(cursor)
+            if not isinstance(state.get("pit"), str) or not isinstance(state.get("page"), int):
+                raise InvalidCursorError()
+
+        try:
+            response = await self.db.search(
+                pit={"id": state["pit"], "keep_alive": self.pit_keep_alive},
+                query={"match_all": {}},
+                sort=self.CURSOR_SORT,
+                size=size,
+                search_after=state.get("after"),
+                track_total_hits=track_total_hits(total_hits) if cursor is None else False,
+            )
+        except NotFoundError:
+            raise CursorExpiredError(self.pit_keep_alive)
+
+        hits = response["hits"]["hits"]
+        if cursor is None:
+            total, total_relation = self._total_hits(response["hits"])
+        else:
+            total, total_relation = state.get("total"), state.get("total_relation")
+
+        next_cursor = None
+        if len(hits) == size:
+            next_cursor = encode_cursor({
+                "pit": response.get("pit_id", state["pit"]),
+                "after": hits[-1]["sort"],
+                "page": state["page"] + 1,
+                "total": total,
+                "total_relation": total_relation,
+            })
+        else:
+            await self._close_pit(response.get("pit_id", state["pit"]))
+
+        return PaginatedResponse(
+            meta=PaginationMeta(
+                page=state["page"], size=size, total=total, total_relation=total_relation
+            ),
+            results=[hit["_source"] for hit in hits],
+            next_cursor=next_cursor,
+        )
+
+    async def export(
+        self,
+        query: Optional[dict] = None,
+        source_includes: Optional[List[str]] = None,
+        slices: int = 1,
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Pages of hits from one point in time, read by ``slices`` concurrent
+        sliced searches with ``search_after``. Slices hand their pages over
+        through a bounded queue, so they pause while the consumer is slow
+        and memory stays at a few pages. Order across slices is arbitrary.
+        """
+        pit = await self.db.open_point_in_time(index=self.index_name, keep_alive=self.pit_keep_alive)
+        pit_ids = {pit["id"]}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.export_queue_pages)
+
+        async def read_slice(slice_id: int) -> None:
+            pit_id = pit["id"]
+            search_after = None
+            while True:
+                response = await self.db.search(
+                    pit={"id": pit_id, "keep_alive": self.pit_keep_alive},
+                    query=query or {"match_all": {}},
+                    sort=self.CURSOR_SORT,
+                    size=self.export_page_size,
+                    search_after=search_after,
+                    slice={"id": slice_id, "max": slices} if slices > 1 else None,
+                    source={"includes": source_includes} if source_includes else None,
+                    track_total_hits=False,
+                )
+                pit_id = response.get("pit_id", pit_id)
+                pit_ids.add(pit_id)
+                hits = response["hits"]["hits"]
+                if hits:
+                    await queue.put(hits)
+                if len(hits) < self.export_page_size:
+                    return
+                search_after = hits[-1]["sort"]
+
+        readers = [asyncio.create_task(read_slice(slice_id)) for slice_id in range(slices)]
+
+        async def read_all() -> Optional[Exception]:
+            try:
+                await asyncio.gather(*readers)
+                error = None
+            except Exception as e:
+                error = e
+            await queue.put(_DONE)
+            return error
+
+        done = asyncio.create_task(read_all())
+        try:
+            while True:
+                page = await queue.get()
+                if page is _DONE:
+                    break
+                yield page
+            error = await done
+            if error is not None:
+                raise error
+        finally:
+            for task in (*readers, done):
+                task.cancel()
+            await asyncio.gather(*readers, done, return_exceptions=True)
+            for pit_id in pit_ids:
+                await self._close_pit(pit_id)
+
+    async def _close_pit(self, pit_id: str) -> None:
+        try:
+            await self.db.close_point_in_time(id=pit_id)
+        except Exception as e:
+            logger.warning("failed to close point in time", extra={"error": str(e)})
+
     async def all(self) -> ESResponse:
         response = await self.db.search(
             index=self.index_name,
@@ -214,7 +681,7 @@ class ElasticSearchQry(BaseQuery):
 
     @staticmethod
     def _extract_error_info(info: dict) -> dict:
-        failed_doc = info.get("index", {})
+        failed_doc = next(iter(info.values()), {})
         error_info = failed_doc.get("error", {})
 
         reason = (
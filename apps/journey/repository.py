@@ -1,8 +1,10 @@
-from typing import TypeVar
+from typing import AsyncIterator, TypeVar
 
 from pydantic import BaseModel
-from apps.journey.api.v1.schemas import ESResponse, InsertResultSchema, JourneyQuerySchema, PaginatedResponse, UpdateInputSchema, UpdateResultSchema
-from apps.journey.query import BaseQuery
+from apps.journey.api.v1.schemas import BulkUpdateItemSchema, CountResponseSchema, ESResponse, InsertResultSchema, JourneyQuerySchema, PaginatedResponse, SuggestionSchema, SuggestResponseSchema, UpdateInputSchema, UpdateResultSchema
+from apps.journey.query import BaseQuery, track_total_hits
+from config.settings.integrations_config import JourneyConfig
+from shared.enums import SearchModeChoices, SearchTierChoices, SuggestFieldChoices, TotalHitsChoices
 
 T = TypeVar("T", bound=BaseModel)
 
@@ -17,38 +19,73 @@ class JourneyRepo:
         res = await self.query.get_by_id(id)
         return res
 
+    async def get_journeys_by_ids(
+        self, ids: list[str]
+    ) -> list[dict | None]:
+        res = await self.query.get_many(ids)
+        return res
+
     async def search_journey(
-        self, query_data: JourneyQuerySchema, size: int = 10
+        self,
+        query_data: JourneyQuerySchema,
+        size: int = 10,
+        mode: SearchModeChoices = JourneyConfig.JOURNEY_SEARCH_MODE,
+        total_hits: TotalHitsChoices = JourneyConfig.JOURNEY_TOTAL_HITS,
     ) -> ESResponse:
+        """
+        ``combined`` sends the exact and fuzzy clauses as one query.
+        ``tiered`` first runs only the exact and prefix keyword clauses, and
+        pays for fuzzy expansion only when they find fewer than ``size`` hits.
+        """
         must_filters = []
-        should_queries = []
+        exact_queries = []
+        prefix_queries = []
+        fuzzy_queries = []
         if query_data.id:
             must_filters.append({"term": {"id.keyword": query_data.id}})
 
-        if query_data.title:
-            should_queries.append(
-                {"term": {"title.keyword": {"value": query_data.title, "boost": 5}}})
-            should_queries.append({
-                "match": {
-                    "title": {
-                        "query": query_data.title,
-                        "fuzziness": "AUTO"
-                    }
-                }
-            })
-        if query_data.username:
-            should_queries.append(
-                {"term": {"username.keyword": {"value": query_data.username, "boost": 4}}})
-            should_queries.append({
+        for field_name, value, boost in (
+            ("title", query_data.title, 5),
+            ("username", query_data.username, 4),
+        ):
+            if not value:
+                continue
+            exact_queries.append(
+                {"term": {f"{field_name}.keyword": {"value": value, "boost": boost}}})
+            prefix_queries.append(
+                {"prefix": {f"{field_name}.keyword": {"value": value}}})
+            fuzzy_queries.append({
                 "match": {
-                    "username": {
-                        "query": query_data.username,
-                        "fuzziness": "AUTO"
+                    field_name: {
+                        "query": value,
+                        "fuzziness": "AUTO",
+                        "prefix_length": JourneyConfig.JOURNEY_SEARCH_FUZZY_PREFIX_LENGTH,
+                        "max_expansions": JourneyConfig.JOURNEY_SEARCH_FUZZY_MAX_EXPANSIONS,
                     }
                 }
             })
-        es_query_body = {
+
+        if mode == SearchModeChoices.TIERED:
+            res = await self.query.search(
+                self._search_body(size, must_filters, exact_queries + prefix_queries, total_hits)
+            )
+            if len(res.hits) >= size or not fuzzy_queries:
+                return res.model_copy(update={"tier": SearchTierChoices.EXACT})
+
+        res = await self.query.search(
+            self._search_body(size, must_filters, exact_queries + fuzzy_queries, total_hits)
+        )
+        if mode == SearchModeChoices.TIERED:
+            return res.model_copy(update={"tier": SearchTierChoices.FUZZY})
+        return res
+
+    @staticmethod
+    def _search_body(
+        size: int, must_filters: list, should_queries: list, total_hits: TotalHitsChoices
+    ) -> dict:
+        return {
             "size": size,
+            "track_total_hits": track_total_hits(total_hits),
             "query": {
                 "bool": {
                     "must": must_filters,
@@ -56,8 +93,18 @@ class JourneyRepo:
                 }
             }
         }
-        res = await self.query.search(es_query_body)
-        return res
+
+    async def suggest_journeys(
+        self, field_name: SuggestFieldChoices, text: str, size: int = 10
+    ) -> SuggestResponseSchema:
+        res = await self.query.suggest(field_name, text, size=size)
+        suggestions = {}
+        for hit in res.hits:
+            value = hit.source.get(field_name)
+            # Several journeys can share a title; suggest it once.
+            if isinstance(value, str) and value not in suggestions:
+                suggestions[value] = SuggestionSchema(id=hit.id, text=value, score=hit.score)
+        return SuggestResponseSchema(suggestions=list(suggestions.values()))
 
     async def update_journey(
         self, id: str, input: UpdateInputSchema
@@ -65,6 +112,12 @@ class JourneyRepo:
         res = await self.query.update(id, input)
         return res
 
+    async def update_journeys(
+        self, items: list[BulkUpdateItemSchema]
+    ) -> UpdateResultSchema:
+        res = await self.query.bulk_update(items)
+        return res
+
     async def save_journey(
         self, input: dict
     ) -> InsertResultSchema:
@@ -84,7 +137,33 @@ class JourneyRepo:
         return res
 
     async def all_journeys_with_pagination(
-        self, page: int = 1, size: int = 10
+        self,
+        page: int = 1,
+        size: int = 10,
+        total_hits: TotalHitsChoices = JourneyConfig.JOURNEY_TOTAL_HITS,
+    ) -> PaginatedResponse:
+        res = await self.query.all_paginated(page=page, size=size, total_hits=total_hits)
+        return res
+
+    async def all_journeys_by_cursor(
+        self,
+        size: int = 10,
+        cursor: str | None = None,
+        total_hits: TotalHitsChoices = JourneyConfig.JOURNEY_TOTAL_HITS,
     ) -> PaginatedResponse:
-        res = await self.query.all_paginated(page=page, size=size)
+        res = await self.query.all_by_cursor(size=size, cursor=cursor, total_hits=total_hits)
         return res
+
+    async def count_journeys(
+        self, query: dict | None = None
+    ) -> CountResponseSchema:
+        res = await self.query.count(query)
+        return CountResponseSchema(count=res)
+
+    def export_journeys(
+        self,
+        query: dict | None = None,
+        source_includes: list[str] | None = None,
+        slices: int = 1,
+    ) -> AsyncIterator[list[dict]]:
+        return self.query.export(query=query, source_includes=source_includes, slices=slices)
@@ -0,0 +1,80 @@
+"""
+Per-hit CPU of building a claim flow response from a 300-hit search.
+
+Compares the previous path (pydantic round trip per hit, stdlib JSON
+response) with the current one (plain dicts, orjson response), each on
+full and on filtered ``_source`` documents as set by
+ANALYTIC_FLOW_SOURCE_INCLUDES.
+
+    python -m benchmarks.bench_claim_flow [hits]
+"""
+import sys
+import time
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from starlette.responses import JSONResponse
+
+from apps.analytic.api.v1.schemas import ClaimFlowSchema
+from apps.analytic.query import BackToBackDeduplicator
+
+FILTERED_FIELDS = ("id", "model_tag", "state", "timestamp")
+
+
+def make_response(hits: int, filtered: bool) -> bytes:
+    docs = []
+    for i in range(hits):
+        source = {
+            "id": i,
+            "model_tag": "HealthInsuredClaim",
+            "state": f"state_{i // 2}",
+            "timestamp": f"2025-01-01T00:{i // 60:02d}:{i % 60:02d}Z",
+            "payload": {"amount": i * 1.5, "items": list(range(20)), "note": "x" * 200},
+            **{f"field_{n}": f"value_{n}" for n in range(20)},
+        }
+        if filtered:
+            source = {field: source[field] for field in FILTERED_FIELDS}
+        docs.append({"_index": "historical_claim", "_id": f"id-{i}", "_source": source})
+    return orjson.dumps({"hits": {"hits": docs}})
+
+
+def previous(body: bytes) -> bytes:
+    hits = orjson.loads(body)["hits"]["hits"]
+    result, last_state_by_model = [], {}
+    for doc in hits:
+        source = doc["_source"]
+        model_tag, state = source.get("model_tag"), source.get("state")
+        last_state = last_state_by_model.get(model_tag)
+        if last_state is None or state != last_state:
+            result.append(ClaimFlowSchema(**doc).model_dump())
+            last_state_by_model[model_tag] = state
+    return JSONResponse(content=result).body
+
+
+def current(body: bytes) -> bytes:
+    hits = orjson.loads(body)["hits"]["hits"]
+    deduplicator = BackToBackDeduplicator()
+    result = [data for data in map(deduplicator.accept, hits) if data is not None]
+    return ORJSONResponse(content=result).body
+
+
+def bench(name: str, func, body: bytes, hits: int, rounds: int = 200) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func(body)
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<40} {best * 1e6:>9.0f} µs/flow {best * 1e6 / hits:>7.2f} µs/hit")
+    return best
+
+
+if __name__ == "__main__":
+    hits = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    full, filtered = make_response(hits, False), make_response(hits, True)
+    assert orjson.loads(previous(full)) == orjson.loads(current(full))
+
+    baseline = bench("previous, full _source", previous, full, hits)
+    bench("current, full _source", current, full, hits)
+    bench("previous, filtered _source", previous, filtered, hits)
+    best = bench("current, filtered _source", current, filtered, hits)
+    print(f"speedup (previous full -> current filtered): {baseline / best:.1f}x")
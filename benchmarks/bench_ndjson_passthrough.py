@@ -0,0 +1,83 @@
+"""
+CPU cost of building _bulk bodies for NDJSON ingest, decoded vs passthrough.
+
+Runs offline: it measures the work the ingestor does per document before
+the request reaches Elasticsearch (JSON decode, ``_id`` handling and
+re-serialization vs. byte passthrough).
+
+    python -m benchmarks.bench_ndjson_passthrough [docs]
+"""
+import sys
+import time
+
+import orjson
+from elasticsearch.serializer import NdjsonSerializer
+
+from shared.bulk import BulkEntry
+
+
+def make_lines(count: int) -> list[bytes]:
+    return [
+        orjson.dumps({
+            "model_tag": "HealthInsuredClaim",
+            "id": i,
+            "state": f"state_{i % 7}",
+            "timestamp": "2025-01-01T00:00:00Z",
+            "payload": {"amount": i * 1.5, "items": list(range(20)), "note": "x" * 200},
+        })
+        for i in range(count)
+    ]
+
+
+def decoded_path(lines: list[bytes], index_name: str) -> bytes:
+    # What FastAPI + the ES client serializer did per document before.
+    operations = []
+    for line in lines:
+        doc = orjson.loads(line)
+        entry = BulkEntry.from_action(
+            {"_op_type": "index", "_index": index_name, "_source": doc, "_id": doc.pop("_id", None)}
+        )
+        operations.append(entry.header)
+        operations.append(entry.body)
+    return NdjsonSerializer().dumps(operations)
+
+
+def stdlib_path(lines: list[bytes], index_name: str) -> bytes:
+    import json
+
+    operations = []
+    for line in lines:
+        doc = json.loads(line)
+        operations.append({"index": {"_index": index_name}})
+        operations.append(doc)
+    return NdjsonSerializer().dumps(operations)
+
+
+def passthrough_path(lines: list[bytes], index_name: str) -> bytes:
+    meta = {"_index": index_name}
+    header = orjson.dumps({"index": meta})
+    operations = []
+    for line in lines:
+        if b'"_id"' in line:
+            raise AssertionError("benchmark lines carry no _id")
+        entry = BulkEntry("index", meta, header, line)
+        operations.append(entry.header)
+        operations.append(entry.body)
+    return NdjsonSerializer().dumps(operations)
+
+
+def bench(name, func, lines, rounds=5):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func(lines, "bench")
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<24} {len(lines) / best:>12,.0f} docs/s  ({best * 1e6 / len(lines):.2f} µs/doc)")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    lines = make_lines(count)
+    bench("stdlib json decode", stdlib_path, lines)
+    bench("orjson decode", decoded_path, lines)
+    bench("passthrough", passthrough_path, lines)
@@ -0,0 +1,92 @@
+"""
+Shard fan-out and latency of claim flow searches with and without routing.
+
+Needs a cluster (the usual ELASTIC_* settings) and an index written by
+``python -m apps.analytic.commands reindex-routed``. Samples junctions
+from it and runs each flow search twice: unrouted, as every search did
+before, and routed by the junction's family key.
+
+    python -m benchmarks.bench_routing <routed index> [samples] [routing field]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from apps.analytic.query import AnalyticElkQry
+from config.settings.services.elk import es_manager
+from shared.enums import ModelTagChoices
+
+
+async def run_searches(client, index: str, searches: list[tuple[dict, str]], routed: bool):
+    latencies, shards = [], []
+    for flow_search, routing in searches:
+        started = time.perf_counter()
+        resp = await client.search(
+            index=index,
+            query=flow_search["query"],
+            sort=flow_search["sort"],
+            size=flow_search["size"],
+            routing=routing if routed else None,
+            request_cache=False,
+        )
+        latencies.append(time.perf_counter() - started)
+        shards.append(resp["_shards"]["total"])
+    return latencies, shards
+
+
+def report(name: str, latencies: list[float], shards: list[int]) -> float:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(
+        f"{name:<10} shards/search {statistics.mean(shards):>5.1f}  "
+        f"p50 {p50 * 1000:>7.2f} ms  p95 {p95 * 1000:>7.2f} ms"
+    )
+    return p50
+
+
+async def main(index: str, samples: int, routing_field: str) -> None:
+    await es_manager.initialize()
+    try:
+        client = await es_manager.get_read_client()
+        qry = AnalyticElkQry(client)
+        qry.index_name = index
+
+        resp = await client.search(
+            index=index,
+            query={"function_score": {
+                "query": {"term": {"model_tag.keyword": ModelTagChoices.CLAIM_JUNCTION}},
+                "random_score": {},
+            }},
+            size=samples,
+        )
+        searches = []
+        for hit in resp["hits"]["hits"]:
+            flow_search = qry._build_flow_search(hit["_source"])
+            if flow_search is not None and hit["_source"].get(routing_field):
+                searches.append((flow_search, str(hit["_source"][routing_field])))
+        if not searches:
+            print(f"No junctions with {routing_field} found in {index}")
+            return
+
+        # Warm both paths once so neither pays for cold caches alone.
+        await run_searches(client, index, searches[:10], routed=False)
+        await run_searches(client, index, searches[:10], routed=True)
+
+        print(f"{len(searches)} flows from {index}")
+        baseline = report("unrouted", *await run_searches(client, index, searches, routed=False))
+        best = report("routed", *await run_searches(client, index, searches, routed=True))
+        print(f"p50 speedup: {baseline / best:.1f}x")
+    finally:
+        await es_manager.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    asyncio.run(main(
+        sys.argv[1],
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+        sys.argv[3] if len(sys.argv) > 3 else "health_insured_claim",
+    ))
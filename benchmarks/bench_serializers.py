@@ -0,0 +1,74 @@
+"""
+Client-side CPU per request for the Elasticsearch serializers.
+
+Decodes a claim-flow sized search response (300 hits) and encodes a
+1000-document _bulk body with the stdlib serializers and with the orjson
+ones configured through ELASTIC_SERIALIZER / ELASTIC_LAZY_RESPONSES.
+
+    python -m benchmarks.bench_serializers
+"""
+import time
+
+import orjson
+from elasticsearch.serializer import JsonSerializer, NdjsonSerializer
+
+from config.settings.services.serializers import (
+    LazyOrjsonJsonSerializer,
+    OrjsonJsonSerializer,
+    OrjsonNdjsonSerializer,
+)
+
+
+def search_response(hits: int) -> bytes:
+    return orjson.dumps({
+        "took": 3,
+        "timed_out": False,
+        "hits": {
+            "total": {"value": hits, "relation": "eq"},
+            "hits": [
+                {
+                    "_index": "historical_claim",
+                    "_id": f"id-{i}",
+                    "_score": None,
+                    "_source": {
+                        "id": i,
+                        "model_tag": "HealthInsuredClaim",
+                        "state": f"state_{i % 7}",
+                        "timestamp": "2025-01-01T00:00:00Z",
+                        "payload": {"amount": i * 1.5, "items": list(range(20)), "note": "x" * 200},
+                    },
+                    "sort": [1735689600000 + i],
+                }
+                for i in range(hits)
+            ],
+        },
+    })
+
+
+def bulk_operations(docs: int) -> list:
+    operations = []
+    for i in range(docs):
+        operations.append({"index": {"_index": "historical_claim"}})
+        operations.append({"id": i, "state": f"state_{i % 7}", "payload": {"items": list(range(20)), "note": "x" * 200}})
+    return operations
+
+
+def bench(name, func, rounds=200):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<40} {best * 1e6:>10.1f} µs/request")
+
+
+if __name__ == "__main__":
+    body = search_response(300)
+    operations = bulk_operations(1000)
+
+    bench("search decode: stdlib json", lambda: JsonSerializer().loads(body))
+    bench("search decode: orjson", lambda: OrjsonJsonSerializer().loads(body))
+    bench("search decode: orjson lazy, unread", lambda: LazyOrjsonJsonSerializer().loads(body))
+    bench("search decode: orjson lazy, read", lambda: LazyOrjsonJsonSerializer().loads(body)["hits"])
+    bench("bulk encode: stdlib ndjson", lambda: NdjsonSerializer().dumps(operations), rounds=50)
+    bench("bulk encode: orjson ndjson", lambda: OrjsonNdjsonSerializer().dumps(operations), rounds=50)
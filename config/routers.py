@@ -4,11 +4,19 @@ import os
 import sys
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, status
 from fastapi_pagination import add_pagination
+from starlette.responses import JSONResponse
 
-from config.settings.integrations_config import BaseConfig
+from apps.analytic.cache import claim_flow_cache
+from apps.analytic.flow_index import claim_flow_index
+from apps.analytic.junctions import junction_index
+from apps.ingestor.buffer import ingest_buffer
+from apps.ingestor.spool import ingest_spool, spool_replayer
+from apps.journey.cache import journey_search_cache
+from config.settings.integrations_config import BaseConfig, IngestorConfig, RedisConfig
 from config.settings.services.elk import es_manager
+from config.settings.services.redis import redis_manager
 from config.settings.services.middlewares import add_trusted_host_middleware, add_cors_middleware
 from config.settings.services.prometheus import setup_prometheus
 from config.settings.services.register_apps import register_apps
@@ -19,7 +27,26 @@ from config.settings.services.sentry import setup_sentry
 async def lifespan(app: FastAPI):
 
     await es_manager.initialize()
+    if claim_flow_index.enabled:
+        await claim_flow_index.ensure_index(await es_manager.get_write_client())
+    junction_index.start()
+    if RedisConfig.REDIS_ENABLED:
+        await redis_manager.initialize()
+        claim_flow_cache.start()
+        journey_search_cache.start()
+    if IngestorConfig.INGESTOR_SPOOL_ENABLED:
+        ingest_spool.open()
+        spool_replayer.start()
+    if IngestorConfig.INGESTOR_BUFFER_ENABLED:
+        await ingest_buffer.start()
     yield
+    await ingest_buffer.close()
+    await spool_replayer.stop()
+    await ingest_spool.close()
+    await claim_flow_cache.stop()
+    await journey_search_cache.stop()
+    await junction_index.stop()
+    await redis_manager.close()
     await es_manager.close()
 
 
@@ -42,3 +69,13 @@ sys.path.append(os.path.abspath(os.path.join(parent_dir, "apps")))
 
 add_pagination(app)
 register_apps(app)
+
+
+@app.get("/health", tags=["health"], summary="Cached Elasticsearch client health")
+async def health():
+    result = await es_manager.health_check()
+    healthy = all(client["available"] for client in result.values())
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=result,
+    )
@@ -1,6 +1,7 @@
 from decouple import config
 from pathlib import Path
-from shared.enums import EnvironmentChoices
+from shared.enums import EnvironmentChoices, SearchModeChoices, SerializerChoices, SpoolFsyncChoices, TotalHitsChoices
+from shared.routing import parse_routing_rules
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -45,6 +46,125 @@ class ELKConfig(BaseConfig):
     ELASTIC_TIMEOUT = config("ELASTIC_TIMEOUT", cast=int, default=30)
     ELASTIC_MAX_RETRIES = config("ELASTIC_MAX_RETRIES", cast=int, default=3)
 
+    ELASTIC_SERIALIZER = config("ELASTIC_SERIALIZER", cast=SerializerChoices, default=SerializerChoices.ORJSON)
+    ELASTIC_LAZY_RESPONSES = config("ELASTIC_LAZY_RESPONSES", cast=bool, default=False)
+
+    ELASTIC_HEALTH_CHECK_INTERVAL = config("ELASTIC_HEALTH_CHECK_INTERVAL", cast=float, default=5.0)
+    ELASTIC_BREAKER_FAILURE_THRESHOLD = config("ELASTIC_BREAKER_FAILURE_THRESHOLD", cast=int, default=3)
+    ELASTIC_BREAKER_RESET_TIMEOUT = config("ELASTIC_BREAKER_RESET_TIMEOUT", cast=float, default=15.0)
+
+    ELASTIC_BULK_CONCURRENCY = config("ELASTIC_BULK_CONCURRENCY", cast=int, default=4)
+    ELASTIC_BULK_CHUNK_SIZE = config("ELASTIC_BULK_CHUNK_SIZE", cast=int, default=1000)
+    ELASTIC_BULK_MIN_CHUNK_SIZE = config("ELASTIC_BULK_MIN_CHUNK_SIZE", cast=int, default=100)
+    ELASTIC_BULK_MAX_CHUNK_SIZE = config("ELASTIC_BULK_MAX_CHUNK_SIZE", cast=int, default=5000)
+    ELASTIC_BULK_MAX_CHUNK_BYTES = config("ELASTIC_BULK_MAX_CHUNK_BYTES", cast=int, default=10 * 1024 * 1024)
+    ELASTIC_BULK_TARGET_LATENCY_MS = config("ELASTIC_BULK_TARGET_LATENCY_MS", cast=int, default=1000)
+    ELASTIC_BULK_MAX_RETRIES = config("ELASTIC_BULK_MAX_RETRIES", cast=int, default=5)
+    ELASTIC_BULK_INITIAL_BACKOFF_MS = config("ELASTIC_BULK_INITIAL_BACKOFF_MS", cast=int, default=200)
+    ELASTIC_BULK_MAX_BACKOFF_MS = config("ELASTIC_BULK_MAX_BACKOFF_MS", cast=int, default=10000)
+    ELASTIC_BULK_MAX_INFLIGHT_DOCS = config("ELASTIC_BULK_MAX_INFLIGHT_DOCS", cast=int, default=50000)
+    ELASTIC_BULK_RETRY_AFTER = config("ELASTIC_BULK_RETRY_AFTER", cast=int, default=5)
+
+
+class IngestorConfig(BaseConfig):
+    INGESTOR_BUFFER_ENABLED = config("INGESTOR_BUFFER_ENABLED", cast=bool, default=False)
+    INGESTOR_BUFFER_MAX_DOCS = config("INGESTOR_BUFFER_MAX_DOCS", cast=int, default=500)
+    INGESTOR_BUFFER_MAX_BYTES = config("INGESTOR_BUFFER_MAX_BYTES", cast=int, default=5 * 1024 * 1024)
+    INGESTOR_BUFFER_MAX_LATENCY_MS = config("INGESTOR_BUFFER_MAX_LATENCY_MS", cast=int, default=20)
+    INGESTOR_BUFFER_MAX_QUEUE = config("INGESTOR_BUFFER_MAX_QUEUE", cast=int, default=10000)
+
+    INGESTOR_NDJSON_MAX_LINE_BYTES = config("INGESTOR_NDJSON_MAX_LINE_BYTES", cast=int, default=10 * 1024 * 1024)
+    INGESTOR_NDJSON_PASSTHROUGH = config("INGESTOR_NDJSON_PASSTHROUGH", cast=bool, default=False)
+
+    INGESTOR_SPOOL_ENABLED = config("INGESTOR_SPOOL_ENABLED", cast=bool, default=False)
+    INGESTOR_SPOOL_DIR = config("INGESTOR_SPOOL_DIR", cast=str, default=str(BASE_DIR / "spool"))
+    INGESTOR_SPOOL_SEGMENT_BYTES = config("INGESTOR_SPOOL_SEGMENT_BYTES", cast=int, default=64 * 1024 * 1024)
+    INGESTOR_SPOOL_MAX_BYTES = config("INGESTOR_SPOOL_MAX_BYTES", cast=int, default=1024 * 1024 * 1024)
+    INGESTOR_SPOOL_FSYNC = config("INGESTOR_SPOOL_FSYNC", cast=SpoolFsyncChoices, default=SpoolFsyncChoices.INTERVAL)
+    INGESTOR_SPOOL_FSYNC_INTERVAL_MS = config("INGESTOR_SPOOL_FSYNC_INTERVAL_MS", cast=int, default=1000)
+    INGESTOR_SPOOL_REPLAY_BATCH = config("INGESTOR_SPOOL_REPLAY_BATCH", cast=int, default=1000)
+    INGESTOR_SPOOL_REPLAY_INTERVAL_MS = config("INGESTOR_SPOOL_REPLAY_INTERVAL_MS", cast=int, default=1000)
+
+    # index:field pairs, e.g. "historical_claim:claim_key"
+    INGESTOR_ROUTING_RULES = config("INGESTOR_ROUTING_RULES", cast=parse_routing_rules, default="")
+
+
+class RedisConfig(BaseConfig):
+    REDIS_ENABLED = config("REDIS_ENABLED", cast=bool, default=False)
+    REDIS_HOST = config("REDIS_HOST", cast=str, default="localhost")
+    REDIS_PORT = config("REDIS_PORT", cast=int, default=6379)
+    REDIS_DB = config("REDIS_DB", cast=int, default=0)
+    REDIS_PASSWORD = config("REDIS_PASSWORD", cast=str, default=None)
+    REDIS_MAX_CONNECTIONS = config("REDIS_MAX_CONNECTIONS", cast=int, default=50)
+    REDIS_SOCKET_TIMEOUT = config("REDIS_SOCKET_TIMEOUT", cast=float, default=1.0)
+
+
+class AnalyticConfig(BaseConfig):
+    ANALYTIC_FLOW_CACHE_ENABLED = config("ANALYTIC_FLOW_CACHE_ENABLED", cast=bool, default=False)
+    ANALYTIC_FLOW_CACHE_TTL = config("ANALYTIC_FLOW_CACHE_TTL", cast=int, default=300)
+    ANALYTIC_FLOW_CACHE_LOCAL_TTL = config("ANALYTIC_FLOW_CACHE_LOCAL_TTL", cast=float, default=5.0)
+    ANALYTIC_FLOW_CACHE_LOCAL_MAX_ENTRIES = config("ANALYTIC_FLOW_CACHE_LOCAL_MAX_ENTRIES", cast=int, default=10000)
+    ANALYTIC_FLOW_CACHE_INVALIDATION_DELAY_MS = config("ANALYTIC_FLOW_CACHE_INVALIDATION_DELAY_MS", cast=int, default=1500)
+    ANALYTIC_FLOW_PAGE_SIZE = config("ANALYTIC_FLOW_PAGE_SIZE", cast=int, default=300)
+    ANALYTIC_FLOW_PIT_KEEP_ALIVE = config("ANALYTIC_FLOW_PIT_KEEP_ALIVE", cast=str, default="1m")
+    ANALYTIC_FLOW_SOURCE_INCLUDES = config(
+        "ANALYTIC_FLOW_SOURCE_INCLUDES", cast=lambda v: [s.strip() for s in v.split(",") if s.strip()], default=""
+    )
+    ANALYTIC_FLOW_BATCH_MAX_SIZE = config("ANALYTIC_FLOW_BATCH_MAX_SIZE", cast=int, default=500)
+    ANALYTIC_FLOW_INDEX_ENABLED = config("ANALYTIC_FLOW_INDEX_ENABLED", cast=bool, default=False)
+    ANALYTIC_FLOW_INDEX_NAME = config("ANALYTIC_FLOW_INDEX_NAME", cast=str, default="claim_flow")
+    ANALYTIC_FLOW_ROUTING_FIELD = config("ANALYTIC_FLOW_ROUTING_FIELD", cast=str, default="")
+    ANALYTIC_JUNCTION_INDEX_ENABLED = config("ANALYTIC_JUNCTION_INDEX_ENABLED", cast=bool, default=False)
+    ANALYTIC_JUNCTION_INDEX_SNAPSHOT_DIR = config("ANALYTIC_JUNCTION_INDEX_SNAPSHOT_DIR", cast=str, default="")
+    ANALYTIC_JUNCTION_INDEX_REFRESH_INTERVAL = config("ANALYTIC_JUNCTION_INDEX_REFRESH_INTERVAL", cast=float, default=30.0)
+    ANALYTIC_JUNCTION_INDEX_REFRESH_OVERLAP = config("ANALYTIC_JUNCTION_INDEX_REFRESH_OVERLAP", cast=float, default=900.0)
+    ANALYTIC_JUNCTION_INDEX_PAGE_SIZE = config("ANALYTIC_JUNCTION_INDEX_PAGE_SIZE", cast=int, default=5000)
+    ANALYTIC_JUNCTION_INDEX_MAX_ENTRIES = config("ANALYTIC_JUNCTION_INDEX_MAX_ENTRIES", cast=int, default=3_000_000)
+    ANALYTIC_JUNCTION_INDEX_COMPACT_ENTRIES = config("ANALYTIC_JUNCTION_INDEX_COMPACT_ENTRIES", cast=int, default=100_000)
+
+    ANALYTIC_STATS_MAX_DAYS = config("ANALYTIC_STATS_MAX_DAYS", cast=int, default=366)
+    ANALYTIC_STATS_COMPOSITE_PAGE_SIZE = config("ANALYTIC_STATS_COMPOSITE_PAGE_SIZE", cast=int, default=500)
+    # Elasticsearch rejects top_hits above index.max_inner_result_window (100 by default).
+    ANALYTIC_STATS_MAX_EVENTS_PER_ENTITY = min(
+        config("ANALYTIC_STATS_MAX_EVENTS_PER_ENTITY", cast=int, default=100), 100
+    )
+    ANALYTIC_STATS_MAX_HITS_PER_PAGE = config("ANALYTIC_STATS_MAX_HITS_PER_PAGE", cast=int, default=10_000)
+    ANALYTIC_STATS_TRANSITIONS_LOOKBACK_DAYS = config("ANALYTIC_STATS_TRANSITIONS_LOOKBACK_DAYS", cast=int, default=30)
+    ANALYTIC_STATS_ROLLUP_CLOSE_DELAY = config("ANALYTIC_STATS_ROLLUP_CLOSE_DELAY", cast=int, default=3600)
+    ANALYTIC_STATS_ROLLUP_TTL = config("ANALYTIC_STATS_ROLLUP_TTL", cast=int, default=7 * 24 * 3600)
+    ANALYTIC_STATS_ROLLUP_LOCAL_MAX_ENTRIES = config("ANALYTIC_STATS_ROLLUP_LOCAL_MAX_ENTRIES", cast=int, default=5000)
+
+
+class JourneyConfig(BaseConfig):
+    # Index or alias behind the journey endpoints, e.g. an alias moved to an index made by create-index.
+    JOURNEY_INDEX_NAME = config("JOURNEY_INDEX_NAME", cast=str, default="journey_v3")
+    JOURNEY_PIT_KEEP_ALIVE = config("JOURNEY_PIT_KEEP_ALIVE", cast=str, default="2m")
+    JOURNEY_MAX_RESULT_WINDOW = config("JOURNEY_MAX_RESULT_WINDOW", cast=int, default=10000)
+    JOURNEY_EXPORT_PAGE_SIZE = config("JOURNEY_EXPORT_PAGE_SIZE", cast=int, default=1000)
+    JOURNEY_EXPORT_SLICES = config("JOURNEY_EXPORT_SLICES", cast=int, default=4)
+    JOURNEY_EXPORT_MAX_SLICES = config("JOURNEY_EXPORT_MAX_SLICES", cast=int, default=16)
+    JOURNEY_EXPORT_QUEUE_PAGES = config("JOURNEY_EXPORT_QUEUE_PAGES", cast=int, default=8)
+    JOURNEY_UPDATE_CONFLICT_RETRIES = config("JOURNEY_UPDATE_CONFLICT_RETRIES", cast=int, default=3)
+    JOURNEY_BULK_UPDATE_MAX_ITEMS = config("JOURNEY_BULK_UPDATE_MAX_ITEMS", cast=int, default=10000)
+    JOURNEY_GET_MANY_MAX_IDS = config("JOURNEY_GET_MANY_MAX_IDS", cast=int, default=1000)
+    JOURNEY_DOC_CACHE_ENABLED = config("JOURNEY_DOC_CACHE_ENABLED", cast=bool, default=False)
+    JOURNEY_DOC_CACHE_TTL = config("JOURNEY_DOC_CACHE_TTL", cast=float, default=5.0)
+    JOURNEY_DOC_CACHE_MAX_ENTRIES = config("JOURNEY_DOC_CACHE_MAX_ENTRIES", cast=int, default=10000)
+    JOURNEY_SEARCH_CACHE_ENABLED = config("JOURNEY_SEARCH_CACHE_ENABLED", cast=bool, default=False)
+    JOURNEY_SEARCH_CACHE_TTL = config("JOURNEY_SEARCH_CACHE_TTL", cast=int, default=300)
+    JOURNEY_SEARCH_CACHE_LOCAL_TTL = config("JOURNEY_SEARCH_CACHE_LOCAL_TTL", cast=float, default=5.0)
+    JOURNEY_SEARCH_CACHE_LOCAL_MAX_ENTRIES = config("JOURNEY_SEARCH_CACHE_LOCAL_MAX_ENTRIES", cast=int, default=10000)
+    JOURNEY_SEARCH_CACHE_INVALIDATION_DELAY_MS = config("JOURNEY_SEARCH_CACHE_INVALIDATION_DELAY_MS", cast=int, default=1500)
+    JOURNEY_SEARCH_MODE = config("JOURNEY_SEARCH_MODE", cast=SearchModeChoices, default=SearchModeChoices.COMBINED)
+    JOURNEY_SEARCH_FUZZY_PREFIX_LENGTH = config("JOURNEY_SEARCH_FUZZY_PREFIX_LENGTH", cast=int, default=0)
+    JOURNEY_SEARCH_FUZZY_MAX_EXPANSIONS = config("JOURNEY_SEARCH_FUZZY_MAX_EXPANSIONS", cast=int, default=50)
+    JOURNEY_SUGGEST_MAX_SIZE = config("JOURNEY_SUGGEST_MAX_SIZE", cast=int, default=50)
+    JOURNEY_TOTAL_HITS = config("JOURNEY_TOTAL_HITS", cast=TotalHitsChoices, default=TotalHitsChoices.CAPPED)
+    JOURNEY_TOTAL_HITS_CAP = config("JOURNEY_TOTAL_HITS_CAP", cast=int, default=10000)
+    JOURNEY_COUNT_CACHE_ENABLED = config("JOURNEY_COUNT_CACHE_ENABLED", cast=bool, default=False)
+    JOURNEY_COUNT_CACHE_TTL = config("JOURNEY_COUNT_CACHE_TTL", cast=float, default=10.0)
+    JOURNEY_COUNT_CACHE_MAX_ENTRIES = config("JOURNEY_COUNT_CACHE_MAX_ENTRIES", cast=int, default=1000)
+
 
 class LogConfig(BaseConfig):
     APPLICATION_LOG_LEVEL = config("APPLICATION_LOG_LEVEL", default="INFO")
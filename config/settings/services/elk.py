@@ -1,15 +1,88 @@
 from typing import AsyncGenerator
+import asyncio
 import logging
+import math
+import time
 from elasticsearch import AsyncElasticsearch
 from elastic_transport import ConnectionError, ConnectionTimeout
+from fastapi import HTTPException, status
 
 from config.settings.integrations_config import ELKConfig
-from shared.enums import ElkClientTypeChoices
+from config.settings.services.serializers import get_serializers
+from shared.enums import CircuitStateChoices, ElkClientTypeChoices
 
 
 logger = logging.getLogger(__name__)
 
 
+class ClientHealth:
+    """
+    Cached health state of a single client, guarded by a circuit breaker.
+
+    - closed: requests flow, failures are counted
+    - open: requests fail fast until ``reset_timeout`` elapses
+    - half_open: the next probe decides whether to close or re-open
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitStateChoices.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.last_checked_at: float | None = None
+        self.last_error: str | None = None
+
+    @property
+    def is_available(self) -> bool:
+        return self.state != CircuitStateChoices.OPEN
+
+    @property
+    def retry_after(self) -> int:
+        if self.opened_at is None:
+            return 0
+        remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+        return max(1, math.ceil(remaining))
+
+    def should_probe(self) -> bool:
+        if self.state != CircuitStateChoices.OPEN:
+            return True
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = CircuitStateChoices.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = CircuitStateChoices.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.last_checked_at = time.time()
+
+    def record_failure(self, error: str) -> None:
+        self.consecutive_failures += 1
+        self.last_error = error
+        self.last_checked_at = time.time()
+
+        if (
+            self.state == CircuitStateChoices.HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state != CircuitStateChoices.OPEN:
+                logger.error(f"Elasticsearch circuit opened: {error}")
+            self.state = CircuitStateChoices.OPEN
+            self.opened_at = time.monotonic()
+
+    def as_dict(self) -> dict:
+        return {
+            "available": self.is_available,
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "last_checked_at": self.last_checked_at,
+            "last_error": self.last_error,
+        }
+
+
 class ElasticsearchManager:
     """
     Manager for Elasticsearch clients with separate read and write instances.
@@ -17,12 +90,17 @@ class ElasticsearchManager:
     This ensures proper separation of concerns and security boundaries:
     - Read client: Limited to search/get operations
     - Write client: Full access for CRUD operations
+
+    Client health is probed in the background and cached per client, so
+    request dependencies never pay an extra round trip for a ping.
     """
 
     _instance: "ElasticsearchManager | None" = None
     _read_client: AsyncElasticsearch | None = None
     _write_client: AsyncElasticsearch | None = None
     _is_initialized: bool = False
+    _health: dict[ElkClientTypeChoices, ClientHealth] = {}
+    _health_task: asyncio.Task | None = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -39,6 +117,7 @@ class ElasticsearchManager:
                 client_type=ElkClientTypeChoices.READ,
                 user=ELKConfig.ELASTIC_READ_USER,
                 password=ELKConfig.ELASTIC_READ_PASSWORD,
+                lazy_responses=ELKConfig.ELASTIC_LAZY_RESPONSES,
             )
 
             self._write_client = await self._create_client(
@@ -55,6 +134,15 @@ class ElasticsearchManager:
             logger.info("✓ Read-only client initialized")
             logger.info("✓ Read-write client initialized")
 
+            self._health = {
+                client_type: ClientHealth(
+                    failure_threshold=ELKConfig.ELASTIC_BREAKER_FAILURE_THRESHOLD,
+                    reset_timeout=ELKConfig.ELASTIC_BREAKER_RESET_TIMEOUT,
+                )
+                for client_type in ElkClientTypeChoices
+            }
+            self._health_task = asyncio.create_task(self._health_probe_loop())
+
             self._is_initialized = True
 
         except Exception as e:
@@ -67,6 +155,7 @@ class ElasticsearchManager:
         client_type: ElkClientTypeChoices,
         user: str = None,
         password: str = None,
+        lazy_responses: bool = False,
     ) -> AsyncElasticsearch:
         client = AsyncElasticsearch(
             hosts=[f"http://{ELKConfig.ELASTIC_HOST}:{ELKConfig.ELASTIC_PORT}"],
@@ -82,6 +171,7 @@ class ElasticsearchManager:
             http_compress=True,
             connections_per_node=ELKConfig.ELASTIC_CONNECTIONS_PER_NODE,
             sniff_on_start=False,
+            serializers=get_serializers(ELKConfig.ELASTIC_SERIALIZER, lazy_responses),
         )
 
         if not await client.ping():
@@ -108,25 +198,57 @@ class ElasticsearchManager:
             )
         return self._write_client
 
-    async def health_check(self) -> dict[str, bool]:
-        read_healthy = False
-        write_healthy = False
+    def _get_client(self, client_type: ElkClientTypeChoices) -> AsyncElasticsearch | None:
+        if client_type == ElkClientTypeChoices.READ:
+            return self._read_client
+        return self._write_client
 
-        if self._read_client:
-            try:
-                read_healthy = await self._read_client.ping()
-            except Exception as e:
-                logger.error(f"Read client health check failed: {e}")
+    async def _probe(self, client_type: ElkClientTypeChoices) -> None:
+        health = self._health[client_type]
+        client = self._get_client(client_type)
+        if client is None or not health.should_probe():
+            return
 
-        if self._write_client:
-            try:
-                write_healthy = await self._write_client.ping()
-            except Exception as e:
-                logger.error(f"Write client health check failed: {e}")
+        error = "ping returned false"
+        try:
+            healthy = await client.ping()
+        except Exception as e:
+            healthy = False
+            error = str(e)
+
+        if healthy:
+            health.record_success()
+        else:
+            logger.warning(f"{client_type.value} client health probe failed: {error}")
+            health.record_failure(error)
+
+    async def _health_probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(ELKConfig.ELASTIC_HEALTH_CHECK_INTERVAL)
+            await asyncio.gather(*(self._probe(client_type) for client_type in self._health))
+
+    def is_available(self, client_type: ElkClientTypeChoices) -> bool:
+        health = self._health.get(client_type)
+        return health is None or health.is_available
+
+    def ensure_available(self, client_type: ElkClientTypeChoices) -> None:
+        health = self._health.get(client_type)
+        if health is not None and not health.is_available:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Elasticsearch {client_type.value} service unavailable",
+                headers={"Retry-After": str(health.retry_after)},
+            )
+
+    def record_failure(self, client_type: ElkClientTypeChoices, error: Exception) -> None:
+        health = self._health.get(client_type)
+        if health is not None:
+            health.record_failure(str(error))
 
+    async def health_check(self) -> dict[str, dict]:
         return {
-            "read_client": read_healthy,
-            "write_client": write_healthy
+            f"{client_type.value}_client": health.as_dict()
+            for client_type, health in self._health.items()
         }
 
     async def _cleanup_clients(self) -> None:
@@ -138,6 +260,14 @@ class ElasticsearchManager:
             self._write_client = None
 
     async def close(self) -> None:
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
         if self._read_client:
             await self._read_client.close()
             logger.info("✓ Read client closed")
@@ -156,23 +286,41 @@ es_manager = ElasticsearchManager()
 
 async def get_read_es_client() -> AsyncGenerator[AsyncElasticsearch, None]:
     client = await es_manager.get_read_client()
+    es_manager.ensure_available(ElkClientTypeChoices.READ)
 
     try:
-        await client.ping()
+        yield client
     except (ConnectionError, ConnectionTimeout) as e:
         logger.error(f"Read client not available: {e}")
-        raise ConnectionError("Elasticsearch read service unavailable") from e
-
-    yield client
+        es_manager.record_failure(ElkClientTypeChoices.READ, e)
+        raise
 
 
 async def get_write_es_client() -> AsyncGenerator[AsyncElasticsearch, None]:
     client = await es_manager.get_write_client()
+    es_manager.ensure_available(ElkClientTypeChoices.WRITE)
 
     try:
-        await client.ping()
+        yield client
     except (ConnectionError, ConnectionTimeout) as e:
         logger.error(f"Write client not available: {e}")
-        raise ConnectionError("Elasticsearch write service unavailable") from e
+        es_manager.record_failure(ElkClientTypeChoices.WRITE, e)
+        raise
+
 
-    yield client
+async def get_deferrable_write_es_client() -> AsyncGenerator[AsyncElasticsearch | None, None]:
+    """
+    Like ``get_write_es_client`` but yields ``None`` while the write breaker
+    is open, for callers that can defer their writes instead of failing.
+    """
+    client = await es_manager.get_write_client()
+    if not es_manager.is_available(ElkClientTypeChoices.WRITE):
+        yield None
+        return
+
+    try:
+        yield client
+    except (ConnectionError, ConnectionTimeout) as e:
+        logger.error(f"Write client not available: {e}")
+        es_manager.record_failure(ElkClientTypeChoices.WRITE, e)
+        raise
@@ -1,5 +1,5 @@
 import orjson
-import logging
+import logging.config
 
 from config.settings.integrations_config import LogConfig
 from shared.enums import LogChoices
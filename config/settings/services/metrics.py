@@ -0,0 +1,55 @@
+from config.settings.integrations_config import BaseConfig
+
+
+class _NoopMetric:
+    """Stands in for prometheus metrics outside production."""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+
+_metrics: dict = {}
+
+
+def _get_or_create(kind: str, name: str, documentation: str, labelnames=(), **kwargs):
+    """
+    Metrics are registered once per process, even if the defining module is
+    imported under several package paths by the app auto-discovery.
+    """
+    if name in _metrics:
+        return _metrics[name]
+
+    if BaseConfig.is_production():
+        import prometheus_client
+
+        metric = getattr(prometheus_client, kind)(name, documentation, labelnames, **kwargs)
+    else:
+        metric = _NoopMetric()
+
+    _metrics[name] = metric
+    return metric
+
+
+def counter(name: str, documentation: str, labelnames=()):
+    return _get_or_create("Counter", name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames=()):
+    return _get_or_create("Gauge", name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames=(), buckets=None):
+    kwargs = {"buckets": buckets} if buckets else {}
+    return _get_or_create("Histogram", name, documentation, labelnames, **kwargs)
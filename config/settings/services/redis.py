@@ -0,0 +1,79 @@
+import logging
+
+from redis.asyncio import ConnectionPool, Redis
+
+from config.settings.integrations_config import RedisConfig
+
+
+logger = logging.getLogger(__name__)
+
+
+class RedisManager:
+    """
+    Manager for the shared async Redis connection pool.
+
+    Redis only backs caches, so callers are expected to treat it as
+    optional: check ``is_initialized`` and fall back to Elasticsearch when a
+    command fails.
+    """
+
+    _instance: "RedisManager | None" = None
+    _client: Redis | None = None
+    _is_initialized: bool = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    @property
+    def is_initialized(self) -> bool:
+        return self._is_initialized
+
+    async def initialize(self) -> None:
+        if self._is_initialized:
+            logger.warning("Redis client already initialized")
+            return
+
+        pool = ConnectionPool(
+            host=RedisConfig.REDIS_HOST,
+            port=RedisConfig.REDIS_PORT,
+            db=RedisConfig.REDIS_DB,
+            password=RedisConfig.REDIS_PASSWORD,
+            max_connections=RedisConfig.REDIS_MAX_CONNECTIONS,
+            socket_timeout=RedisConfig.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=RedisConfig.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30,
+        )
+        client = Redis(connection_pool=pool)
+
+        try:
+            await client.ping()
+        except Exception as e:
+            logger.error(f"Failed to initialize Redis client: {e}")
+            await client.aclose(close_connection_pool=True)
+            raise
+
+        self._client = client
+        self._is_initialized = True
+        logger.info(
+            f"✓ Redis client initialized ({RedisConfig.REDIS_HOST}:{RedisConfig.REDIS_PORT}/{RedisConfig.REDIS_DB})"
+        )
+
+    def get_client(self) -> Redis:
+        if not self._is_initialized or self._client is None:
+            raise RuntimeError(
+                "Redis client not initialized. "
+                "Call initialize() during application startup."
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client:
+            await self._client.aclose(close_connection_pool=True)
+            logger.info("✓ Redis client closed")
+            self._client = None
+        self._is_initialized = False
+
+
+redis_manager = RedisManager()
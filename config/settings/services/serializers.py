@@ -0,0 +1,87 @@
+from collections.abc import Mapping
+from typing import Any, Iterator
+
+import orjson
+from elasticsearch.serializer import JsonSerializer, NdjsonSerializer, Serializer
+
+from shared.enums import SerializerChoices
+
+
+class OrjsonJsonSerializer(JsonSerializer):
+    """JSON bodies through orjson, keeping the client's fallbacks for extra types."""
+
+    def json_dumps(self, data: Any) -> bytes:
+        return orjson.dumps(data, default=self.default)
+
+    def json_loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class OrjsonNdjsonSerializer(NdjsonSerializer):
+    """NDJSON (_bulk, _msearch) bodies through orjson."""
+
+    def json_dumps(self, data: Any) -> bytes:
+        return orjson.dumps(data, default=self.default)
+
+    def json_loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class LazyJsonBody(Mapping):
+    """
+    Read-only response body that is decoded on first access.
+
+    Responses whose body is never inspected (acks, existence checks,
+    responses only forwarded on status) skip decoding entirely.
+    """
+
+    __slots__ = ("_raw", "_decoded")
+
+    def __init__(self, raw: bytes):
+        self._raw = raw
+        self._decoded = None
+
+    @property
+    def decoded(self) -> dict:
+        if self._decoded is None:
+            self._decoded = orjson.loads(self._raw)
+            self._raw = None
+        return self._decoded
+
+    def __getitem__(self, key: str) -> Any:
+        return self.decoded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.decoded)
+
+    def __len__(self) -> int:
+        return len(self.decoded)
+
+    def __repr__(self) -> str:
+        return repr(self.decoded)
+
+
+class LazyOrjsonJsonSerializer(OrjsonJsonSerializer):
+    def loads(self, data: bytes) -> Any:
+        # Error bodies are decoded eagerly so the client can build a
+        # detailed ApiError from them, as do non-object bodies.
+        if not data.startswith(b"{") or data.startswith(b'{"error"'):
+            return super().loads(data)
+        return LazyJsonBody(data)
+
+
+def get_serializers(
+    serializer: SerializerChoices, lazy_responses: bool = False
+) -> dict[str, Serializer]:
+    """
+    Serializers to pass to ``AsyncElasticsearch(serializers=...)``.
+    The client derives the compatibility-mode mimetypes from these.
+    """
+    if serializer == SerializerChoices.JSON:
+        return {}
+
+    json_serializer = LazyOrjsonJsonSerializer() if lazy_responses else OrjsonJsonSerializer()
+    return {
+        OrjsonJsonSerializer.mimetype: json_serializer,
+        OrjsonNdjsonSerializer.mimetype: OrjsonNdjsonSerializer(),
+    }
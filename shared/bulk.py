@@ -0,0 +1,381 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+from decimal import Decimal
+from typing import AsyncIterable, AsyncIterator, Iterable
+
+import orjson
+from elasticsearch import ApiError, AsyncElasticsearch
+from elasticsearch.helpers import expand_action
+
+from config.settings.integrations_config import ELKConfig
+from config.settings.services.metrics import counter, gauge, histogram
+from shared.exceptions import IngestOverloadedError
+
+logger = logging.getLogger(__name__)
+
+
+BULK_CHUNK_SECONDS = histogram(
+    "es_bulk_chunk_seconds",
+    "Latency of a single _bulk chunk",
+)
+BULK_CHUNK_SIZE = gauge(
+    "es_bulk_chunk_size",
+    "Current adaptive _bulk chunk size in documents",
+)
+BULK_REJECTED_ITEMS = counter(
+    "es_bulk_rejected_items_total",
+    "Bulk items rejected by Elasticsearch with 429",
+)
+BULK_RETRIED_ITEMS = counter(
+    "es_bulk_retried_items_total",
+    "Bulk items re-sent after a 429 rejection",
+)
+BULK_BACKOFF_SECONDS = counter(
+    "es_bulk_backoff_seconds_total",
+    "Time spent backing off before re-sending rejected bulk items",
+)
+BULK_INFLIGHT_DOCS = gauge(
+    "es_bulk_inflight_docs",
+    "Documents currently held by in-flight bulk chunks",
+)
+
+_DONE = object()
+
+
+def _default(data):
+    if isinstance(data, Decimal):
+        return float(data)
+    raise TypeError(f"Unable to serialize {data!r} (type: {type(data).__name__})")
+
+
+def is_rejected_item(status: int | None, error: dict | str | None) -> bool:
+    if status == 429:
+        return True
+    return isinstance(error, dict) and error.get("type") == "es_rejected_execution_exception"
+
+
+async def iter_actions(actions: Iterable | AsyncIterable) -> AsyncIterator:
+    """Iterate sync and async action sources alike."""
+    if hasattr(actions, "__aiter__"):
+        async for action in actions:
+            yield action
+    else:
+        for action in actions:
+            yield action
+
+
+class BulkEntry:
+    """One action already serialized into its _bulk header and body lines."""
+
+    __slots__ = ("op_type", "meta", "header", "body")
+
+    def __init__(self, op_type: str, meta: dict, header: bytes, body: bytes | None):
+        self.op_type = op_type
+        self.meta = meta
+        self.header = header
+        self.body = body
+
+    @classmethod
+    def from_action(cls, action: dict) -> "BulkEntry":
+        header, body = expand_action(action)
+        op_type, meta = next(iter(header.items()))
+        meta = {key: value for key, value in meta.items() if value is not None}
+        if body is not None and not isinstance(body, bytes):
+            body = orjson.dumps(body, default=_default)
+        return cls(op_type, meta, orjson.dumps({op_type: meta}), body)
+
+    @property
+    def size(self) -> int:
+        return len(self.header) + 1 + (len(self.body) + 1 if self.body is not None else 0)
+
+
+def with_doc_id(action: dict | BulkEntry) -> BulkEntry:
+    """Serialize an index action, assigning an ``_id`` if it has none."""
+    if isinstance(action, BulkEntry):
+        if "_id" in action.meta:
+            return action
+        meta = {**action.meta, "_id": uuid.uuid4().hex}
+        return BulkEntry(action.op_type, meta, orjson.dumps({action.op_type: meta}), action.body)
+
+    if action.get("_id") is None:
+        action["_id"] = uuid.uuid4().hex
+    return BulkEntry.from_action(action)
+
+
+class AdaptiveChunkSizer:
+    """
+    AIMD chunk sizing: halve on 429 rejections, back off when chunks are
+    slower than the target latency, grow slowly while they are fast.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, target_latency_ms: int):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency_ms / 1000
+        self.step = max(1, initial // 10)
+        self.size = max(minimum, min(initial, maximum))
+        BULK_CHUNK_SIZE.set(self.size)
+
+    def record(self, latency: float, rejected: bool) -> None:
+        if rejected:
+            self.size = max(self.minimum, self.size // 2)
+        elif latency > self.target_latency:
+            self.size = max(self.minimum, int(self.size * 0.75))
+        elif latency < self.target_latency / 2:
+            self.size = min(self.maximum, self.size + self.step)
+        BULK_CHUNK_SIZE.set(self.size)
+
+
+class InFlightBudget:
+    """
+    Caps the documents a worker keeps in flight, including items waiting
+    for a retry. A request that cannot get its first chunk admitted is
+    rejected; later chunks wait, which slows down the upload instead.
+    """
+
+    def __init__(self, limit: int, retry_after: int):
+        self.limit = limit
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._waiters: list[asyncio.Future] = []
+
+    def _fits(self, count: int) -> bool:
+        # A single oversized chunk is still admitted when nothing else runs.
+        return not self.limit or self.in_flight == 0 or self.in_flight + count <= self.limit
+
+    def _take(self, count: int) -> None:
+        self.in_flight += count
+        BULK_INFLIGHT_DOCS.set(self.in_flight)
+
+    def admit(self, count: int) -> None:
+        if not self._fits(count):
+            raise IngestOverloadedError(self.retry_after)
+        self._take(count)
+
+    async def acquire(self, count: int) -> None:
+        while not self._fits(count):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        self._take(count)
+
+    def release(self, count: int) -> None:
+        """Synchronous, so it can run from a done callback."""
+        self.in_flight -= count
+        BULK_INFLIGHT_DOCS.set(self.in_flight)
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+# Shared by every request in the worker so feedback from one upload
+# informs the next.
+bulk_chunk_sizer = AdaptiveChunkSizer(
+    initial=ELKConfig.ELASTIC_BULK_CHUNK_SIZE,
+    minimum=ELKConfig.ELASTIC_BULK_MIN_CHUNK_SIZE,
+    maximum=ELKConfig.ELASTIC_BULK_MAX_CHUNK_SIZE,
+    target_latency_ms=ELKConfig.ELASTIC_BULK_TARGET_LATENCY_MS,
+)
+bulk_budget = InFlightBudget(
+    limit=ELKConfig.ELASTIC_BULK_MAX_INFLIGHT_DOCS,
+    retry_after=ELKConfig.ELASTIC_BULK_RETRY_AFTER,
+)
+
+
+class BulkEngine:
+    """
+    Sends _bulk chunks with several requests in flight at once.
+
+    Chunks are bounded by both document count (adaptive) and bytes. Items
+    rejected with 429 are re-sent with jittered exponential backoff; other
+    failures, including version conflicts, are final. Results are yielded
+    per item as ``(ok, {op_type: item})``, the same shape as
+    ``helpers.async_streaming_bulk``, in chunk completion order.
+
+    Raises ``IngestOverloadedError`` before sending anything when the
+    worker's in-flight budget is exhausted.
+    """
+
+    def __init__(
+        self,
+        client: AsyncElasticsearch,
+        concurrency: int | None = None,
+        max_chunk_bytes: int | None = None,
+        sizer: AdaptiveChunkSizer | None = None,
+        budget: InFlightBudget | None = None,
+        max_retries: int | None = None,
+    ):
+        self.client = client
+        self.concurrency = max(1, min(
+            concurrency or ELKConfig.ELASTIC_BULK_CONCURRENCY,
+            ELKConfig.ELASTIC_CONNECTIONS_PER_NODE,
+        ))
+        self.max_chunk_bytes = max_chunk_bytes or ELKConfig.ELASTIC_BULK_MAX_CHUNK_BYTES
+        self.sizer = sizer or bulk_chunk_sizer
+        self.budget = budget or bulk_budget
+        self.max_retries = ELKConfig.ELASTIC_BULK_MAX_RETRIES if max_retries is None else max_retries
+        self.initial_backoff = ELKConfig.ELASTIC_BULK_INITIAL_BACKOFF_MS / 1000
+        self.max_backoff = ELKConfig.ELASTIC_BULK_MAX_BACKOFF_MS / 1000
+
+    async def stream(
+        self, actions: Iterable[dict] | AsyncIterable[dict]
+    ) -> AsyncIterator[tuple[bool, dict]]:
+        results: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: set[asyncio.Task] = set()
+
+        async def send(chunk: list[BulkEntry]) -> None:
+            try:
+                await results.put(await self._send_with_retries(chunk))
+            except Exception as e:
+                await results.put(e)
+
+        def release(count: int) -> None:
+            self.budget.release(count)
+            semaphore.release()
+
+        async def produce() -> None:
+            admitted = False
+            try:
+                async for chunk in self._chunks(actions):
+                    await semaphore.acquire()
+                    try:
+                        if admitted:
+                            await self.budget.acquire(len(chunk))
+                        else:
+                            self.budget.admit(len(chunk))
+                            admitted = True
+                    except BaseException:
+                        semaphore.release()
+                        raise
+                    task = asyncio.create_task(send(chunk))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    # A done callback also runs for a task cancelled before
+                    # it started, which never reaches a finally in send().
+                    task.add_done_callback(lambda _, count=len(chunk): release(count))
+                await asyncio.gather(*tasks, return_exceptions=True)
+            except Exception as e:
+                await results.put(e)
+            finally:
+                await results.put(_DONE)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                items = await results.get()
+                if items is _DONE:
+                    break
+                if isinstance(items, Exception):
+                    raise items
+                for item in items:
+                    yield item
+        finally:
+            pending = [task for task in (producer, *tasks) if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _chunks(
+        self, actions: Iterable[dict] | AsyncIterable[dict]
+    ) -> AsyncIterator[list[BulkEntry]]:
+        chunk: list[BulkEntry] = []
+        chunk_bytes = 0
+
+        async for action in iter_actions(actions):
+            entry = action if isinstance(action, BulkEntry) else BulkEntry.from_action(action)
+            if chunk and (
+                len(chunk) >= self.sizer.size
+                or chunk_bytes + entry.size > self.max_chunk_bytes
+            ):
+                yield chunk
+                chunk, chunk_bytes = [], 0
+            chunk.append(entry)
+            chunk_bytes += entry.size
+
+        if chunk:
+            yield chunk
+
+    def _backoff(self, attempt: int) -> float:
+        # "Equal jitter": half fixed, half random, so retries spread out
+        # without collapsing to zero delay.
+        delay = min(self.max_backoff, self.initial_backoff * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _send_with_retries(self, chunk: list[BulkEntry]) -> list[tuple[bool, dict]]:
+        results = []
+        pending = chunk
+
+        for attempt in range(self.max_retries + 1):
+            retry = []
+            for entry, (ok, item) in zip(pending, await self._send_chunk(pending)):
+                info = next(iter(item.values()))
+                if (
+                    not ok
+                    and attempt < self.max_retries
+                    and is_rejected_item(info.get("status"), info.get("error"))
+                ):
+                    retry.append(entry)
+                else:
+                    results.append((ok, item))
+
+            if not retry:
+                break
+
+            delay = self._backoff(attempt)
+            BULK_RETRIED_ITEMS.inc(len(retry))
+            BULK_BACKOFF_SECONDS.inc(delay)
+            logger.warning(
+                f"Retrying {len(retry)} rejected bulk items in {delay:.2f}s "
+                f"(attempt {attempt + 1}/{self.max_retries})"
+            )
+            await asyncio.sleep(delay)
+            pending = retry
+
+        return results
+
+    async def _send_chunk(self, chunk: list[BulkEntry]) -> list[tuple[bool, dict]]:
+        operations = []
+        for entry in chunk:
+            operations.append(entry.header)
+            if entry.body is not None:
+                operations.append(entry.body)
+
+        started = time.perf_counter()
+        try:
+            response = await self.client.bulk(operations=operations)
+        except ApiError as e:
+            if e.meta.status != 429:
+                raise
+            # The whole request was rejected; report it on every item.
+            latency = time.perf_counter() - started
+            BULK_CHUNK_SECONDS.observe(latency)
+            BULK_REJECTED_ITEMS.inc(len(chunk))
+            self.sizer.record(latency, rejected=True)
+            error = {"type": "es_rejected_execution_exception", "reason": str(e)}
+            return [
+                (False, {entry.op_type: {**entry.meta, "status": 429, "error": error}})
+                for entry in chunk
+            ]
+
+        latency = time.perf_counter() - started
+        BULK_CHUNK_SECONDS.observe(latency)
+
+        results = []
+        rejected = 0
+        for item in response["items"]:
+            info = next(iter(item.values()))
+            status = info.get("status", 500)
+            ok = 200 <= status < 300
+            if not ok and is_rejected_item(status, info.get("error")):
+                rejected += 1
+            results.append((ok, item))
+
+        if rejected:
+            BULK_REJECTED_ITEMS.inc(rejected)
+        self.sizer.record(latency, rejected=rejected > 0)
+        return results
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+
+class LocalTTLCache:
+    """
+    In-process LRU cache whose entries also expire after ``ttl`` seconds.
+
+    Entries can carry tags; ``invalidate_tags`` drops every entry holding
+    any of the given tags.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any, frozenset]] = OrderedDict()
+        self._keys_by_tag: dict[Hashable, set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = ()) -> None:
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        self.delete(key)
+        tags = frozenset(tags)
+        self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self.delete(next(iter(self._entries)))
+
+    def delete(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def invalidate_tags(self, tags: Iterable[Hashable]) -> int:
+        removed = 0
+        for tag in tags:
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self.delete(key)
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_tag.clear()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution; every
+    caller receives the same result or exception.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            # shield: one cancelled waiter must not cancel the shared call.
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(func())
+        self._calls[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
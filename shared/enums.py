@@ -19,4 +19,52 @@ class EnvironmentChoices(StrEnum):
 
 class ElkClientTypeChoices(StrEnum):
     READ = "read"
-    WRITE = "write"
\ No newline at end of file
+    WRITE = "write"
+
+
+class CircuitStateChoices(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class SpoolFsyncChoices(StrEnum):
+    ALWAYS = "always"
+    INTERVAL = "interval"
+    NEVER = "never"
+
+
+class SerializerChoices(StrEnum):
+    JSON = "json"
+    ORJSON = "orjson"
+
+
+class StreamFormatChoices(StrEnum):
+    NDJSON = "ndjson"
+    JSON = "json"
+
+
+class PaginationModeChoices(StrEnum):
+    PAGE = "page"
+    CURSOR = "cursor"
+
+
+class SearchModeChoices(StrEnum):
+    COMBINED = "combined"
+    TIERED = "tiered"
+
+
+class SearchTierChoices(StrEnum):
+    EXACT = "exact"
+    FUZZY = "fuzzy"
+
+
+class SuggestFieldChoices(StrEnum):
+    TITLE = "title"
+    USERNAME = "username"
+
+
+class TotalHitsChoices(StrEnum):
+    EXACT = "exact"
+    CAPPED = "capped"
+    OFF = "off"
@@ -6,3 +6,59 @@ class InvalidLoggerNameError(Exception):
             f"To add a new logger, Add it to LogChoices enum."
         )
         super().__init__(message)
+
+
+class BulkItemError(Exception):
+    def __init__(self, doc_id: str | None, status: int, reason: str):
+        self.doc_id = doc_id
+        self.status = status
+        self.reason = reason
+        super().__init__(f"Document '{doc_id}' failed with status {status}: {reason}")
+
+
+class NdjsonLineTooLongError(Exception):
+    def __init__(self, line_number: int, max_bytes: int):
+        message = (
+            f"NDJSON line {line_number} exceeds the maximum of {max_bytes} bytes. "
+            f"Split the document or raise INGESTOR_NDJSON_MAX_LINE_BYTES."
+        )
+        super().__init__(message)
+
+
+class IngestOverloadedError(Exception):
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(
+            f"Ingest in-flight budget exhausted, retry after {retry_after} seconds"
+        )
+
+
+class SpoolFullError(Exception):
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(
+            f"Ingest spool reached its disk budget of {max_bytes} bytes"
+        )
+
+
+class InvalidCursorError(Exception):
+    def __init__(self):
+        super().__init__("The pagination cursor is malformed")
+
+
+class CursorExpiredError(Exception):
+    def __init__(self, keep_alive: str):
+        self.keep_alive = keep_alive
+        super().__init__(
+            f"The pagination cursor expired: pages must be requested within {keep_alive} "
+            f"of each other. Start again without a cursor."
+        )
+
+
+class ResultWindowExceededError(Exception):
+    def __init__(self, max_result_window: int):
+        self.max_result_window = max_result_window
+        super().__init__(
+            f"Pages past the first {max_result_window} results are only available "
+            f"with cursor pagination"
+        )
@@ -0,0 +1,22 @@
+import base64
+import binascii
+
+import orjson
+
+from shared.exceptions import InvalidCursorError
+
+
+def encode_cursor(state: dict) -> str:
+    """Opaque, URL-safe cursor for a pagination state."""
+    return base64.urlsafe_b64encode(orjson.dumps(state)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = orjson.loads(raw)
+    except (binascii.Error, ValueError):
+        raise InvalidCursorError()
+    if not isinstance(state, dict):
+        raise InvalidCursorError()
+    return state
@@ -0,0 +1,45 @@
+
+
+def parse_routing_rules(value: str) -> dict[str, str]:
+    """Parse ``index:field,index:field`` into ``{index: field}``."""
+    rules = {}
+    for rule in value.split(","):
+        if not rule.strip():
+            continue
+        index_name, _, field_path = rule.partition(":")
+        if not index_name.strip() or not field_path.strip():
+            raise ValueError(f"Invalid routing rule '{rule}', expected 'index:field'")
+        rules[index_name.strip()] = field_path.strip()
+    return rules
+
+
+class RoutingRules:
+    """
+    Custom shard routing per index: documents of a routed index are stored
+    on the shard picked by one of their own fields (a dotted path), so
+    reads that know that key search a single shard.
+
+    A document without the key, or with a non-scalar one, falls back to
+    the default routing by ``_id``, the same as ``reindex-routed`` does for
+    documents outside any claim family. Routed reads do not find such
+    documents, so producers must set the key on every document that routed
+    reads look up.
+    """
+
+    def __init__(self, rules: dict[str, str]):
+        self.rules = rules
+
+    def field_for(self, index_name: str) -> str | None:
+        return self.rules.get(index_name)
+
+    def routing_for(self, index_name: str, source: dict) -> str | None:
+        field_path = self.rules.get(index_name)
+        if field_path is None:
+            return None
+
+        value = source
+        for part in field_path.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is None or isinstance(value, (dict, list)) or value == "":
+            return None
+        return str(value)
@@ -0,0 +1,63 @@
+import pytest
+
+from apps.analytic.junctions import JunctionIndex
+from shared.enums import ModelTagChoices
+
+
+class JunctionClient:
+    """Serves junction hits as ``(timestamp, source)``, honoring the timestamp range."""
+
+    def __init__(self, junctions: list[tuple[int, dict]]):
+        self.junctions = junctions
+
+    async def open_point_in_time(self, **kwargs):
+        return {"id": "pit"}
+
+    async def close_point_in_time(self, **kwargs):
+        pass
+
+    async def search(self, query, search_after=None, **kwargs):
+        since = next(
+            (clause["range"]["timestamp"]["gte"] for clause in query["bool"]["filter"] if "range" in clause),
+            None,
+        )
+        hits = [
+            {"sort": [timestamp, i], "_source": source}
+            for i, (timestamp, source) in enumerate(sorted(self.junctions, key=lambda j: j[0]))
+            if since is None or timestamp >= since
+        ]
+        if search_after is not None:
+            hits = [hit for hit in hits if hit["sort"] > search_after]
+        return {"hits": {"hits": hits}}
+
+
+def make_index() -> JunctionIndex:
+    index = JunctionIndex(
+        enabled=True,
+        snapshot_dir="",
+        refresh_interval=30,
+        refresh_overlap=60,
+        page_size=100,
+        max_entries=1000,
+        compact_entries=1000,
+    )
+    index.ready = True
+    return index
+
+
+@pytest.mark.anyio
+async def test_refresh_picks_up_junctions_older_than_the_watermark():
+    client = JunctionClient([(100_000, {"health_insured_claim": 1, "health_document": 10})])
+    index = make_index()
+    await index.refresh(client)
+
+    # Becomes searchable after the refresh, behind the watermark but within the overlap.
+    client.junctions.append((70_000, {"health_insured_claim": 2, "health_document": 20}))
+    await index.refresh(client)
+
+    assert index.watermark == 100_000
+    assert index.lookup("health_document", 20) == {
+        "model_tag": ModelTagChoices.CLAIM_JUNCTION,
+        "health_insured_claim": 2,
+        "health_document": 20,
+    }
@@ -0,0 +1,17 @@
+from apps.analytic.query import BackToBackDeduplicator
+
+
+def test_deduplicator_accepts_hit_without_source():
+    deduplicator = BackToBackDeduplicator()
+
+    entry = deduplicator.accept({"_id": "1", "_index": "logs"})
+
+    assert entry == {"id": "1", "index": "logs", "source": {}}
+
+
+def test_deduplicator_drops_back_to_back_state():
+    deduplicator = BackToBackDeduplicator()
+    hit = {"_id": "1", "_index": "logs", "_source": {"model_tag": "claim", "state": "new"}}
+
+    assert deduplicator.accept(hit) is not None
+    assert deduplicator.accept({**hit, "_id": "2"}) is None
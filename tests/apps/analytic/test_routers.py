@@ -0,0 +1,49 @@
+from elasticsearch import ConnectionError
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from apps.analytic.api.v1.dependencies import get_analytic_log_repo
+from apps.analytic.api.v1.routers import v1_router
+
+
+class FlowRepo:
+    def __init__(self, entries: list[dict], fail: bool = False):
+        self.entries = entries
+        self.fail = fail
+
+    async def iter_claim_flow(self, value: int, field_name: str):
+        if self.fail:
+            raise ConnectionError("connection refused")
+        for entry in self.entries:
+            yield entry
+
+
+def make_client(repo: FlowRepo) -> TestClient:
+    app = FastAPI()
+    app.include_router(v1_router)
+    app.dependency_overrides[get_analytic_log_repo] = lambda: repo
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_stream_failing_before_first_entry_is_a_500():
+    response = make_client(FlowRepo([], fail=True)).get(
+        "/analytic/api/v1/claims/flow/stream", params={"claim_id": 1}
+    )
+
+    assert response.status_code == 500
+
+
+def test_stream_encodes_every_entry_as_a_json_array():
+    entries = [{"state": "new"}, {"state": "paid"}]
+    response = make_client(FlowRepo(entries)).get(
+        "/analytic/api/v1/claims/flow/stream", params={"claim_id": 1, "format": "json"}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == entries
+
+
+def test_batch_flow_schema_matches_the_entries_returned():
+    schema = make_client(FlowRepo([])).get("/openapi.json").json()["components"]["schemas"]
+
+    assert set(schema["ClaimFlowEntrySchema"]["properties"]) == {"id", "index", "source"}
@@ -0,0 +1,30 @@
+from datetime import date
+
+import pytest
+
+from apps.analytic.stats import ClaimStatsQry, DayRollupCache
+from config.settings.integrations_config import AnalyticConfig
+
+
+class RecordingClient:
+    def __init__(self):
+        self.aggregations = []
+
+    async def search(self, aggregations, **kwargs):
+        self.aggregations.append(aggregations)
+        return {"aggregations": {"buckets": {"buckets": []}}}
+
+
+@pytest.mark.anyio
+async def test_transition_pages_stay_within_the_hits_budget():
+    client = RecordingClient()
+    stats = ClaimStatsQry(client, DayRollupCache(ttl=60, local_max_entries=10, close_delay=0))
+
+    await stats._compute_transitions(date(2026, 1, 1), date(2026, 1, 2))
+
+    buckets = client.aggregations[0]["buckets"]
+    assert buckets["aggs"]["events"]["top_hits"]["size"] <= 100
+    assert (
+        buckets["composite"]["size"] * buckets["aggs"]["events"]["top_hits"]["size"]
+        <= AnalyticConfig.ANALYTIC_STATS_MAX_HITS_PER_PAGE
+    )
@@ -0,0 +1,53 @@
+import asyncio
+
+import orjson
+import pytest
+
+from apps.ingestor import buffer as buffer_module
+from apps.ingestor.buffer import WriteBehindBuffer
+
+
+class SlowBulkClient:
+    async def bulk(self, operations):
+        await asyncio.sleep(0.05)
+        return {"items": [
+            {"index": {"_id": str(i), "status": 201, **orjson.loads(header)["index"]}}
+            for i, header in enumerate(operations[::2])
+        ]}
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    client = SlowBulkClient()
+
+    async def get_write_client():
+        return client
+
+    monkeypatch.setattr(buffer_module.es_manager, "get_write_client", get_write_client)
+    return WriteBehindBuffer(max_docs=10, max_bytes=1 << 20, max_latency_ms=1, max_queue=100)
+
+
+@pytest.mark.anyio
+async def test_submit_while_closing_is_refused(buffer):
+    await buffer.start()
+    first = asyncio.create_task(buffer.submit({"n": 1}, "logs"))
+    await asyncio.sleep(0.01)  # the first flush is in flight
+    closing = asyncio.create_task(buffer.close())
+    await asyncio.sleep(0)
+
+    assert not buffer.is_running
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(buffer.submit({"n": 2}, "logs"), 1)
+    assert (await first)["_index"] == "logs"
+    await closing
+
+
+@pytest.mark.anyio
+async def test_documents_queued_before_close_are_flushed(buffer):
+    await buffer.start()
+    submits = [asyncio.create_task(buffer.submit({"n": n}, "logs")) for n in range(25)]
+    await asyncio.sleep(0)
+
+    await buffer.close()
+
+    assert len(await asyncio.gather(*submits)) == 25
@@ -0,0 +1,95 @@
+import orjson
+import pytest
+from elasticsearch import ConnectionError
+from fastapi import Response
+
+from apps.ingestor.api.v1.routers import _set_bulk_status_code
+from apps.ingestor.api.v1.schemas import BulkInsertSchema, ErrorDetailSchema, InsertSummarySchema
+from apps.ingestor.query import IngestorElkQry
+from apps.ingestor.spool import Spool
+from shared.enums import SpoolFsyncChoices
+
+
+class UnreachableClient:
+    def __init__(self, answered_chunks: int = 0):
+        self.answered_chunks = answered_chunks
+
+    async def index(self, **kwargs):
+        raise ConnectionError("connection refused")
+
+    async def bulk(self, operations):
+        if self.answered_chunks == 0:
+            raise ConnectionError("connection refused")
+        self.answered_chunks -= 1
+        return {"items": [
+            {"index": {"_id": _id_of(header), "status": 201}} for header in operations[::2]
+        ]}
+
+
+def _id_of(header: bytes) -> str:
+    return orjson.loads(header)["index"]["_id"]
+
+
+@pytest.fixture
+async def spool(tmp_path):
+    spool = Spool(
+        directory=str(tmp_path),
+        segment_bytes=1 << 20,
+        max_bytes=1 << 24,
+        fsync_policy=SpoolFsyncChoices.INTERVAL,
+        fsync_interval_ms=1,
+    )
+    spool.open()
+    yield spool
+    await spool.close()
+
+
+@pytest.mark.anyio
+async def test_insert_doc_spools_on_connection_error(spool):
+    repo = IngestorElkQry(db=UnreachableClient(), spool=spool)
+
+    result = await repo.insert_doc({"message": "hello"}, "logs")
+
+    assert result.result == "spooled"
+    entries, _ = spool.read(10)
+    assert [entry.meta["_id"] for entry in entries] == [result.id]
+
+
+@pytest.mark.anyio
+async def test_bulk_insert_spools_unanswered_actions_on_connection_error(spool):
+    repo = IngestorElkQry(db=UnreachableClient(answered_chunks=1), spool=spool)
+    docs = [{"message": str(i)} for i in range(2000)]
+
+    result = await repo._bulk_insert_actions(
+        ({"_op_type": "index", "_index": "logs", "_source": doc} for doc in docs)
+    )
+
+    assert result.summary.inserted > 0
+    assert result.summary.inserted + result.summary.spooled == len(docs)
+    entries, _ = spool.read(len(docs))
+    assert len(entries) == result.summary.spooled
+
+
+@pytest.mark.anyio
+async def test_writes_queue_behind_a_spool_backlog(spool):
+    await IngestorElkQry(db=UnreachableClient(), spool=spool).insert_doc({"n": 1}, "logs")
+
+    # The client is reachable again, but the backlog has not been replayed yet.
+    repo = IngestorElkQry(db=UnreachableClient(answered_chunks=1), spool=spool)
+    result = await repo.insert_doc({"n": 2}, "logs")
+
+    assert result.result == "spooled"
+    assert spool.pending_records == 2
+
+
+def test_partly_spooled_bulk_with_failures_is_multi_status():
+    response = Response()
+    result = BulkInsertSchema(
+        success=False,
+        summary=InsertSummarySchema(inserted=0, failed=1, spooled=3),
+        errors=[ErrorDetailSchema(id="1", reason="mapper_parsing_exception")],
+    )
+
+    _set_bulk_status_code(response, result)
+
+    assert response.status_code == 207
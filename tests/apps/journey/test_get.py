@@ -0,0 +1,56 @@
+import pytest
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig, ObjectApiResponse
+from elasticsearch import ConnectionError
+
+from apps.journey.cache import JourneyDocCache
+from apps.journey.query import ElasticSearchQry
+
+
+def api_response(body: dict) -> ObjectApiResponse:
+    meta = ApiResponseMeta(
+        status=200,
+        http_version="1.1",
+        headers=HttpHeaders(),
+        duration=0.0,
+        node=NodeConfig("http", "localhost", 9200),
+    )
+    return ObjectApiResponse(body=body, meta=meta)
+
+
+class GetClient:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+
+    async def get(self, index, id):
+        if self.fail:
+            raise ConnectionError("connection refused")
+        return api_response({"_id": id, "_index": index, "_seq_no": 1, "_primary_term": 1, "_source": {"title": "Paris"}})
+
+    async def mget(self, index, ids):
+        return {"docs": [
+            {"_id": id, "_index": index, "found": True, "_seq_no": 1, "_primary_term": 1, "_source": {"title": "Paris"}}
+            for id in ids
+        ]}
+
+
+def make_query(client) -> ElasticSearchQry:
+    return ElasticSearchQry(
+        client, "journey", doc_cache=JourneyDocCache(enabled=True, ttl=60, max_entries=10)
+    )
+
+
+@pytest.mark.anyio
+async def test_get_by_id_raises_on_transport_errors():
+    with pytest.raises(ConnectionError):
+        await make_query(GetClient(fail=True)).get_by_id("a")
+
+
+@pytest.mark.anyio
+async def test_get_by_id_and_get_many_cache_plain_documents():
+    query = make_query(GetClient())
+
+    await query.get_by_id("a")
+    await query.get_many(["b"])
+
+    assert type(query.doc_cache.get("journey", "a")) is dict
+    assert type(query.doc_cache.get("journey", "b")) is dict
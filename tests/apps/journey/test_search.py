@@ -0,0 +1,42 @@
+import pytest
+from elasticsearch import ConnectionError
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from apps.journey.api.v1.routers import v1_router
+from apps.journey.api.v1.schemas import JourneyQuerySchema
+from apps.journey.query import ElasticSearchQry
+from apps.journey.repository import JourneyRepo
+from config.settings.services.elk import get_read_es_client
+from shared.enums import SearchModeChoices
+
+
+class FailingSearchClient:
+    def __init__(self):
+        self.searches = 0
+
+    async def search(self, index, body):
+        self.searches += 1
+        raise ConnectionError("connection refused")
+
+
+@pytest.mark.anyio
+async def test_tiered_search_does_not_fall_back_to_fuzzy_when_the_exact_tier_fails():
+    client = FailingSearchClient()
+    repo = JourneyRepo(ElasticSearchQry(client, "journey"))
+
+    with pytest.raises(ConnectionError):
+        await repo.search_journey(JourneyQuerySchema(title="Paris"), mode=SearchModeChoices.TIERED)
+    assert client.searches == 1
+
+
+@pytest.mark.anyio
+async def test_failed_search_is_a_500():
+    app = FastAPI()
+    app.include_router(v1_router)
+    app.dependency_overrides[get_read_es_client] = FailingSearchClient
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as http:
+        response = await http.post("/journey/api/v1/search", json={"title": "Paris"})
+
+    assert response.status_code == 500
@@ -0,0 +1,75 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from apps.journey.api.v1.routers import v1_router
+from apps.journey.query import ElasticSearchQry
+from config.settings.integrations_config import JourneyConfig
+from config.settings.services.elk import get_read_es_client
+
+
+class MappedIndices:
+    """Indices created from a mapping; searches fail on fields the mapping lacks."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def exists(self, index):
+        return index in self.client.mappings
+
+    async def create(self, index, mappings, settings=None):
+        self.client.mappings[index] = mappings
+        self.client.docs[index] = []
+
+
+class SuggestClient:
+    def __init__(self):
+        self.mappings = {}
+        self.docs = {}
+        self.indices = MappedIndices(self)
+
+    def _is_mapped(self, index: str, path: str) -> bool:
+        field_name, subfield, *shingle = path.split(".")
+        field = self.mappings[index]["properties"].get(field_name, {})
+        suggest = field.get("fields", {}).get(subfield, {})
+        if suggest.get("type") != "search_as_you_type":
+            return False
+        if not shingle:
+            return True
+        return 2 <= int(shingle[0].strip("_gram")) <= suggest.get("max_shingle_size", 3)
+
+    async def search(self, index, body):
+        assert index in self.mappings, f"no such index [{index}]"
+        match = body["query"]["multi_match"]
+        assert all(self._is_mapped(index, path) for path in match["fields"]), match["fields"]
+        field_name = match["fields"][0].split(".")[0]
+        hits = [
+            {"_id": id, "_score": 1.0, "_source": {field_name: doc[field_name]}}
+            for id, doc in self.docs[index]
+            if doc.get(field_name, "").lower().startswith(match["query"].lower())
+        ]
+        return {"hits": {"hits": hits[:body["size"]]}}
+
+
+@pytest.mark.anyio
+async def test_suggest_reads_the_configured_index_created_from_the_journey_template():
+    client = SuggestClient()
+    index_name = JourneyConfig.JOURNEY_INDEX_NAME
+    assert await ElasticSearchQry(client, index_name).create_collection(index_name)
+    client.docs[index_name] = [
+        ("1", {"title": "Paris by night"}),
+        ("2", {"title": "Parisian cafes"}),
+        ("3", {"title": "Rome"}),
+    ]
+    app = FastAPI()
+    app.include_router(v1_router)
+    app.dependency_overrides[get_read_es_client] = lambda: client
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as http:
+        response = await http.get("/journey/api/v1/suggest", params={"q": "pari", "field": "title"})
+
+    assert response.status_code == 200
+    assert [suggestion["text"] for suggestion in response.json()["suggestions"]] == [
+        "Paris by night",
+        "Parisian cafes",
+    ]
@@ -0,0 +1,114 @@
+import orjson
+import pytest
+
+from apps.journey.api.v1.schemas import BulkUpdateItemSchema, UpdateInputSchema
+from apps.journey.query import ElasticSearchQry
+
+
+class JourneyClient:
+    """Journey index honoring ``if_seq_no``; ``conflicts`` fakes concurrent writers per id."""
+
+    def __init__(self, docs: dict[str, dict], conflicts: dict[str, int] | None = None):
+        self.docs = docs
+        self.seq_nos = dict.fromkeys(docs, 1)
+        self.conflicts = conflicts or {}
+        self.histories = {}
+
+    async def get(self, index, id):
+        return {"_id": id, "_source": dict(self.docs[id]), "_seq_no": self.seq_nos[id], "_primary_term": 1}
+
+    async def delete(self, index, id):
+        del self.histories[id]
+
+    async def mget(self, index, ids):
+        return {"docs": [
+            {"_id": id, "found": True, "_source": dict(self.docs[id]), "_seq_no": self.seq_nos[id], "_primary_term": 1}
+            if id in self.docs else {"_id": id, "found": False}
+            for id in ids
+        ]}
+
+    async def bulk(self, operations):
+        operations = [
+            orjson.loads(operation) if isinstance(operation, bytes) else operation
+            for operation in operations
+        ]
+        items = []
+        while operations:
+            op_type, meta = next(iter(operations.pop(0).items()))
+            id = meta["_id"]
+            if op_type == "delete":
+                self.histories.pop(id, None)
+                items.append({"delete": {"_id": id, "status": 200}})
+                continue
+            body = operations.pop(0)
+            if op_type == "create":
+                self.histories[id] = body
+                items.append({"create": {"_id": id, "status": 201}})
+            elif self.conflicts.get(id, 0) > 0 or meta["if_seq_no"] != self.seq_nos[id]:
+                if self.conflicts.get(id, 0) > 0:
+                    self.conflicts[id] -= 1
+                    self.seq_nos[id] += 1
+                items.append({"update": {"_id": id, "status": 409, "error": {"type": "version_conflict_engine_exception", "reason": "conflict"}}})
+            else:
+                self.docs[id].update(body["doc"])
+                self.seq_nos[id] += 1
+                items.append({"update": {"_id": id, "_seq_no": self.seq_nos[id], "status": 200}})
+        return {"errors": False, "items": items}
+
+
+@pytest.mark.anyio
+async def test_update_retries_a_version_conflict_and_drops_its_history():
+    client = JourneyClient({"a": {"step": 0}}, conflicts={"a": 1})
+
+    result = await ElasticSearchQry(client, "journey").update("a", UpdateInputSchema(data={"step": 1}, meta={}))
+
+    assert result.success
+    assert client.docs["a"] == {"step": 1}
+    # The snapshot of the conflicted attempt was deleted, the retry's is kept.
+    assert [history["step"] for history in client.histories.values()] == [0]
+
+
+@pytest.mark.anyio
+async def test_update_fails_once_the_conflict_retries_are_exhausted():
+    client = JourneyClient({"a": {"step": 0}}, conflicts={"a": 100})
+    query = ElasticSearchQry(client, "journey")
+
+    result = await query.update("a", UpdateInputSchema(data={"step": 1}, meta={}))
+
+    assert not result.success
+    assert [(error.id, error.reason) for error in result.errors] == [
+        ("a", "version conflict: the document kept changing"),
+    ]
+    assert client.conflicts["a"] == 100 - (query.update_conflict_retries + 1)
+    assert client.docs["a"] == {"step": 0}
+    assert client.histories == {}
+
+
+@pytest.mark.anyio
+async def test_bulk_update_applies_every_copy_of_a_repeated_id():
+    client = JourneyClient({"a": {"step": 0}})
+    query = ElasticSearchQry(client, "journey")
+    copies = query.update_conflict_retries + 3
+    items = [BulkUpdateItemSchema(id="a", data={"step": step}, meta={}) for step in range(1, copies + 1)]
+
+    result = await query.bulk_update(items)
+
+    assert result.summary.updated == copies
+    assert result.errors is None
+    assert client.docs["a"] == {"step": copies}
+    assert len(client.histories) == copies
+
+
+@pytest.mark.anyio
+async def test_bulk_update_reports_conflicts_after_the_retries():
+    query = ElasticSearchQry(JourneyClient({"a": {}, "b": {}}, conflicts={"a": 100}), "journey")
+
+    result = await query.bulk_update([
+        BulkUpdateItemSchema(id="a", data={"x": 1}, meta={}),
+        BulkUpdateItemSchema(id="b", data={"x": 1}, meta={}),
+    ])
+
+    assert result.summary.updated == 1
+    assert [(error.id, error.reason) for error in result.errors] == [
+        ("a", "version conflict: the document kept changing"),
+    ]
@@ -0,0 +1,14 @@
+import os
+
+# Settings are read at import time; the suite never reaches a real service.
+os.environ.setdefault("ENVIRONMENT", "test")
+os.environ.setdefault("ALLOWED_HOSTS", "*")
+os.environ.setdefault("ELASTIC_HOST", "localhost")
+os.environ.setdefault("GUNICORN_PORT", "8000")
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
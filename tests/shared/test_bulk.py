@@ -0,0 +1,63 @@
+import asyncio
+import random
+
+import pytest
+
+from shared.bulk import AdaptiveChunkSizer, BulkEngine, InFlightBudget
+
+
+class SlowBulkClient:
+    async def bulk(self, operations):
+        await asyncio.sleep(random.uniform(0, 0.003))
+        return {"items": [
+            {"index": {"_id": header.decode(), "status": 201}} for header in operations[::2]
+        ]}
+
+
+class ConsumerAbort(Exception):
+    pass
+
+
+def make_engine(budget: InFlightBudget) -> BulkEngine:
+    return BulkEngine(
+        SlowBulkClient(),
+        concurrency=4,
+        sizer=AdaptiveChunkSizer(initial=5, minimum=5, maximum=5, target_latency_ms=1000),
+        budget=budget,
+        max_retries=0,
+    )
+
+
+def actions(count: int):
+    return ({"_op_type": "index", "_index": "i", "_id": str(i), "_source": {}} for i in range(count))
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("abort", ["raise", "aclose"])
+async def test_aborted_stream_releases_in_flight_budget(abort):
+    budget = InFlightBudget(limit=40, retry_after=1)
+    for trial in range(100):
+        stream = make_engine(budget).stream(actions(100))
+        stop_after = trial % 15 + 1
+        consumed = 0
+        try:
+            async for _ in stream:
+                await asyncio.sleep(0)
+                consumed += 1
+                if consumed == stop_after:
+                    if abort == "raise":
+                        raise ConsumerAbort()
+                    break
+        except ConsumerAbort:
+            pass
+        finally:
+            await stream.aclose()
+        assert budget.in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_completed_stream_releases_in_flight_budget():
+    budget = InFlightBudget(limit=40, retry_after=1)
+    results = [ok async for ok, _ in make_engine(budget).stream(actions(100))]
+    assert len(results) == 100 and all(results)
+    assert budget.in_flight == 0
@@ -0,0 +1,22 @@
+import pytest
+
+from shared.routing import RoutingRules, parse_routing_rules
+
+
+def test_parse_routing_rules():
+    assert parse_routing_rules("historical_claim:claim_key, other:a.b") == {
+        "historical_claim": "claim_key",
+        "other": "a.b",
+    }
+
+
+def test_routing_by_dotted_path():
+    rules = RoutingRules({"claims": "family.key"})
+
+    assert rules.routing_for("claims", {"family": {"key": 42}}) == "42"
+    assert rules.routing_for("other", {"family": {"key": 42}}) is None
+
+
+@pytest.mark.parametrize("source", [{}, {"claim_key": ""}, {"claim_key": {"a": 1}}, {"claim_key": [1]}])
+def test_document_without_routing_key_gets_default_routing(source):
+    assert RoutingRules({"claims": "claim_key"}).routing_for("claims", source) is None